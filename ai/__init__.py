@@ -1,5 +1,24 @@
 # ai/__init__.py
-from .model_loader import ModelLoader
-from .prediction_api import PredictionAPI
-from .training_module import ModelTrainer
-__all__ = ['ModelLoader', 'PredictionAPI']
+import importlib
+
+# Moduly s TensorFlow a FastAPI se načítají až při prvním přístupu (PEP 562)
+_LAZY = {
+    'ModelLoader': '.model_loader',
+    'PredictionAPI': '.prediction_api',
+    'ModelTrainer': '.training_module',
+}
+
+__all__ = ['ModelLoader', 'PredictionAPI', 'ModelTrainer']
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
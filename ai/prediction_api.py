@@ -21,7 +21,17 @@ class PredictionAPI:
     def preprocess(self, raw_data):
         return np.array(raw_data).reshape(1, -1)
 
+_api = None
+
+
+def get_api():
+    """Model se načte při prvním požadavku, ne při importu nebo startu serveru"""
+    global _api
+    if _api is None:
+        _api = PredictionAPI()
+    return _api
+
+
 @app.post("/predict")
 async def predict_endpoint(request: PredictionRequest):
-    api = PredictionAPI()
-    return await api.predict(request.data)
+    return await get_api().predict(request.data)
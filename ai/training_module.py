@@ -3,15 +3,34 @@ import numpy as np
 import pandas as pd
 import tensorflow as tf
 from sklearn.preprocessing import MinMaxScaler
+from core.windowing import sliding_windows, materialize
+from core.history_archive import HistoryArchive
+from core.candle_mmap import CandleMmapStore
+
+class WindowSequence(tf.keras.utils.Sequence):
+    """Dávky klouzavých oken, které se materializují až při tréninku"""
+    def __init__(self, windows, targets, batch_size=32):
+        super().__init__()
+        self.windows = windows
+        self.targets = targets
+        self.batch_size = batch_size
+
+    def __len__(self):
+        return int(np.ceil(len(self.windows) / self.batch_size))
+
+    def __getitem__(self, idx):
+        batch = slice(idx * self.batch_size, (idx + 1) * self.batch_size)
+        return materialize(self.windows[batch]), self.targets[batch]
 
 class ModelTrainer:
-    def __init__(self):
+    def __init__(self, lookback_window=60):
+        self.lookback_window = lookback_window
         self.scaler = MinMaxScaler(feature_range=(0, 1))
         self.model = self.build_model()
 
     def build_model(self):
         model = tf.keras.Sequential([
-            tf.keras.layers.LSTM(64, return_sequences=True, input_shape=(60, 1)),
+            tf.keras.layers.LSTM(64, return_sequences=True, input_shape=(self.lookback_window, 1)),
             tf.keras.layers.Dropout(0.2),
             tf.keras.layers.LSTM(32),
             tf.keras.layers.Dense(1, activation='sigmoid')
@@ -25,16 +44,40 @@ class ModelTrainer:
         return model
 
     def preprocess_data(self, data):
-        scaled = self.scaler.fit_transform(data)
-        X, y = [], []
+        values = np.asarray(data, dtype=np.float64).reshape(len(data), -1)
+        scaled = self.scaler.fit_transform(values)
         
-        for i in range(60, len(scaled)):
-            X.append(scaled[i-60:i])
-            y.append(1 if data.iloc[i] > data.iloc[i-1] else 0)
+        # Okna jako pohledy do škálovaných dat, cíl = růst ceny v další periodě
+        X = sliding_windows(scaled, self.lookback_window, drop_last=True)
+        target = values[:, 0]
+        y = (target[self.lookback_window:] > target[self.lookback_window - 1:-1]).astype(np.int8)
             
-        return np.array(X), np.array(y)
+        return X, y
 
-    def train(self, historical_data, epochs=50):
+    def train(self, historical_data, epochs=50, batch_size=32, validation_split=0.2):
         X, y = self.preprocess_data(historical_data)
-        self.model.fit(X, y, epochs=epochs, validation_split=0.2)
+        split = int(len(X) * (1 - validation_split))
+        self.model.fit(
+            WindowSequence(X[:split], y[:split], batch_size),
+            validation_data=WindowSequence(X[split:], y[split:], batch_size),
+            epochs=epochs
+        )
         self.model.save('ai/models/prod_model_v1.h5')
+
+    def train_from_archive(self, symbol, timeframe, market_type='spot', start=None, end=None,
+                           archive=None, **kwargs):
+        """Natrénuje model na uzavíracích cenách z archivu historie (scripts/backfill.py)"""
+        archive = archive or HistoryArchive()
+        close = archive.load(symbol, timeframe, market_type, start, end)['close']
+        if len(close) <= self.lookback_window:
+            raise ValueError(f"Nedostatek historie pro {symbol} {timeframe}: {len(close)} svíček")
+        return self.train(close, **kwargs)
+
+    def train_from_candle_file(self, symbol, timeframe, market_type='spot', start=None, end=None,
+                               store=None, **kwargs):
+        """Natrénuje model nad memmap souborem svíček sdíleným s botem a dashboardem"""
+        store = store or CandleMmapStore()
+        close = store.range(symbol, timeframe, market_type, start, end)['close']
+        if len(close) <= self.lookback_window:
+            raise ValueError(f"Nedostatek historie pro {symbol} {timeframe}: {len(close)} svíček")
+        return self.train(close, **kwargs)
@@ -1,8 +1,16 @@
 # core/__init__.py
-from .exchange import BinanceConnector
-from .strategy_manager import StrategyManager
-from .risk_management import AdvancedRiskManager
-from .data_processor import DataProcessor
+import importlib
+import sqlite3
+from datetime import datetime
+
+# Třídy se načítají až při prvním přístupu (PEP 562), takže `import core`
+# ani import jednotlivého modulu nenačte ccxt, TensorFlow a další balíčky
+_LAZY = {
+    'BinanceConnector': '.exchange',
+    'StrategyManager': '.strategy_manager',
+    'AdvancedRiskManager': '.risk_management',
+    'DataProcessor': '.data_processor',
+}
 
 __all__ = [
     'BinanceConnector',
@@ -11,22 +19,31 @@ __all__ = [
     'DataProcessor'
 ]
 
-import sqlite3
-from datetime import datetime
 
-# Vlastní adaptéry a konvertory
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+# Vlastní adaptéry a konvertory - čas se ukládá jako INTEGER epoch ms
+# (naivní datetime = místní čas), viz core.database.migrate
 def adapt_datetime(dt):
-    return dt.isoformat()
+    return int(dt.timestamp() * 1000)
 
 def convert_datetime(val):
-    return datetime.fromisoformat(val.decode())
+    val = val.decode()
+    if val.lstrip('-').isdigit():
+        return datetime.fromtimestamp(int(val) / 1000)
+    return datetime.fromisoformat(val)
 
-# Registrace adaptérů a konvertorů
+# Registrace adaptérů a konvertorů (spojení s databází si otevírají moduly až při použití)
 sqlite3.register_adapter(datetime, adapt_datetime)
 sqlite3.register_converter("datetime", convert_datetime)
-
-# Při vytváření spojení s databází přidejte detekci typů
-conn = sqlite3.connect(
-    'data/trading_history.db',
-    detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES
-)
\ No newline at end of file
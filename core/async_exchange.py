@@ -0,0 +1,205 @@
+# core/async_exchange.py
+import asyncio
+import logging
+import threading
+import ccxt.async_support as ccxt_async
+from core.client_pool import CCXT_MARKET_TYPES, rate_limit_bucket
+from core.rate_limiter import request_weights, request_priority, used_weight, retry_after
+
+
+class AsyncBinanceConnector:
+    """Asynchronní konektor pro souběžné dotazy na více symbolů
+
+    Všechny dotazy procházejí jedním semaforem (omezení souběžnosti)
+    a sdíleným ccxt klientem pro daný typ trhu; váhy dotazů se odečítají
+    ze sdíleného limitu (`rate_limiter`) společného s ostatními procesy. Metody `*_many` jsou určeny pro
+    `asyncio.gather` - latence obnovy více párů je max(RTT) místo sum(RTT).
+    """
+
+    def __init__(self, client_config, sandbox=False, max_concurrency=8, rate_limiter=None, market_cache=None):
+        self.client_config = client_config
+        self.sandbox = sandbox
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.market_cache = market_cache
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._clients = {}
+        self._client_locks = {}
+        self._semaphore = None
+
+    def _ensure_primitives(self):
+        """Synchronizační primitiva se vytváří až uvnitř běžící smyčky"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _client(self, market_type):
+        """Vrátí sdíleného asynchronního klienta pro daný typ trhu
+
+        Hotový klient se vrací bez zámku; vytvoření a načtení trhů hlídá
+        zámek daného typu trhu, takže spot a futures se nečekají navzájem.
+        """
+        self._ensure_primitives()
+        client = self._clients.get(market_type)
+        if client is not None:
+            return client
+        lock = self._client_locks.setdefault(market_type, asyncio.Lock())
+        async with lock:
+            client = self._clients.get(market_type)
+            if client is None:
+                config = dict(self.client_config)
+                options = dict(config.get('options', {}))
+                options['defaultType'] = CCXT_MARKET_TYPES.get(market_type, market_type)
+                config['options'] = options
+                config['enableRateLimit'] = True
+
+                client = ccxt_async.binance(config)
+                if self.sandbox:
+                    client.set_sandbox_mode(True)
+                await self._load_markets(market_type, client)
+                self._clients[market_type] = client
+            return client
+
+    async def _load_markets(self, market_type, client):
+        """Trhy z lokální cache (sdílené se synchronními klienty), jinak z burzy"""
+        cached = self.market_cache.load('binance', market_type, self.sandbox) if self.market_cache else None
+        if cached is not None:
+            client.set_markets(*cached)
+            return
+        await self._limited(market_type, client, 'load_markets')
+        if self.market_cache is not None:
+            self.market_cache.save('binance', market_type, client.markets, client.currencies, self.sandbox)
+
+    async def _call(self, market_type, method, *args, **kwargs):
+        """Provede jeden dotaz v rámci limitu souběžnosti"""
+        client = await self._client(market_type)
+        async with self._semaphore:
+            return await self._limited(market_type, client, method, *args, **kwargs)
+
+    async def _limited(self, market_type, client, method, *args, **kwargs):
+        """Provede dotaz po odečtení jeho váhy ze sdíleného limitu"""
+        if self.rate_limiter is None:
+            return await getattr(client, method)(*args, **kwargs)
+
+        bucket = rate_limit_bucket(market_type)
+        weights = request_weights(client, bucket, method, *args, **kwargs)
+        # Čekání na limit blokuje, proto běží mimo smyčku událostí
+        for weight_bucket, weight in weights.items():
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.rate_limiter.acquire, weight, request_priority(method), weight_bucket
+            )
+        try:
+            result = await getattr(client, method)(*args, **kwargs)
+        except ccxt_async.DDoSProtection:
+            self.rate_limiter.penalize(retry_after(client.last_response_headers), bucket)
+            raise
+
+        weight = used_weight(client.last_response_headers) if list(weights) == [bucket] else None
+        if weight is not None:
+            self.rate_limiter.observe(weight, bucket)
+        return result
+
+    async def fetch_ohlcv(self, symbol, timeframe='15m', since=None, limit=100, market_type='spot'):
+        return await self._call(market_type, 'fetch_ohlcv', symbol, timeframe, since=since, limit=limit)
+
+    async def fetch_ticker(self, symbol, market_type='spot'):
+        return await self._call(market_type, 'fetch_ticker', symbol)
+
+    async def fetch_tickers(self, symbols=None, market_type='spot'):
+        return await self._call(market_type, 'fetch_tickers', symbols)
+
+    async def fetch_balance(self, market_type='spot'):
+        return await self._call(market_type, 'fetch_balance')
+
+    async def fetch_open_orders(self, symbol=None, market_type='spot'):
+        return await self._call(market_type, 'fetch_open_orders', symbol)
+
+    async def create_order(self, symbol, order_type, side, amount, price=None, market_type='spot'):
+        return await self._call(market_type, 'create_order', symbol, order_type, side, amount, price)
+
+    async def fetch_ohlcv_many(self, requests, timeframe='15m', market_type='spot'):
+        """Souběžně stáhne OHLCV pro více symbolů
+
+        `requests` je slovník symbol -> (since, limit). Vrací slovník
+        symbol -> svíčky; chybné dotazy vrací prázdný seznam.
+        """
+        symbols = list(requests)
+        results = await asyncio.gather(*[
+            self.fetch_ohlcv(symbol, timeframe, since=requests[symbol][0],
+                             limit=requests[symbol][1], market_type=market_type)
+            for symbol in symbols
+        ], return_exceptions=True)
+        return {
+            symbol: self._result_or_default(symbol, result, [])
+            for symbol, result in zip(symbols, results)
+        }
+
+    async def fetch_tickers_many(self, symbols_by_market):
+        """Souběžně stáhne tickery pro více typů trhů (market_type -> symboly)"""
+        market_types = list(symbols_by_market)
+        results = await asyncio.gather(*[
+            self.fetch_tickers(symbols_by_market[market_type], market_type)
+            for market_type in market_types
+        ], return_exceptions=True)
+        return {
+            market_type: self._result_or_default(market_type, result, {})
+            for market_type, result in zip(market_types, results)
+        }
+
+    async def fetch_balances_many(self, market_types):
+        """Souběžně stáhne zůstatky pro více typů trhů"""
+        results = await asyncio.gather(*[
+            self.fetch_balance(market_type) for market_type in market_types
+        ], return_exceptions=True)
+        return {
+            market_type: self._result_or_default(market_type, result, {})
+            for market_type, result in zip(market_types, results)
+        }
+
+    def _result_or_default(self, key, result, default):
+        if isinstance(result, Exception):
+            self.logger.warning(f"Dotaz pro {key} selhal: {str(result)}")
+            return default
+        return result
+
+    async def close(self):
+        """Uzavře HTTP spojení všech klientů"""
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+
+
+class SyncAsyncFacade:
+    """Synchronní fasáda nad asynchronním konektorem pro stávající volající
+
+    Smyčka událostí běží v samostatném vlákně, volání `facade.metoda(...)`
+    spustí odpovídající korutinu a počká na výsledek.
+    """
+
+    def __init__(self, connector, timeout=60):
+        self.connector = connector
+        self.timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='async-exchange', daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout=None):
+        """Spustí korutinu ve smyčce konektoru a vrátí její výsledek"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return future.result(timeout or self.timeout)
+
+    def __getattr__(self, name):
+        method = getattr(self.connector, name)
+        if not asyncio.iscoroutinefunction(method):
+            return method
+
+        def call(*args, **kwargs):
+            return self.run(method(*args, **kwargs))
+        return call
+
+    def close(self):
+        """Uzavře konektor a zastaví smyčku"""
+        try:
+            self.run(self.connector.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
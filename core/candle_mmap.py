@@ -0,0 +1,302 @@
+# core/candle_mmap.py
+import os
+import time
+import struct
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Windows - zápisy se serializují jen v rámci procesu
+    fcntl = None
+
+# Pevný záznam svíčky: 48 bajtů, little-endian
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+MAGIC = b'QTCANDL2'
+LEGACY_MAGIC = b'QTCANDL1'
+HEADER_SIZE = 64
+
+# Hlavička: magic, počet potvrzených záznamů, čítač přepisů poslední svíčky
+HEADER = struct.Struct('<8sqQ')
+COUNT = struct.Struct('<q')
+COUNT_OFFSET = 8
+SEQ = struct.Struct('<Q')
+SEQ_OFFSET = 16
+
+
+def to_records(candles):
+    """Převede svíčky [ts, o, h, l, c, v] (nebo strukturované pole) na záznamy seřazené podle času"""
+    if isinstance(candles, np.ndarray) and candles.dtype == CANDLE_DTYPE:
+        records = np.array(candles)
+    else:
+        values = np.asarray([list(c[:6]) for c in candles], dtype=np.float64).reshape(-1, 6)
+        records = np.empty(len(values), dtype=CANDLE_DTYPE)
+        records['timestamp'] = values[:, 0].astype(np.int64)
+        for i, name in enumerate(CANDLE_DTYPE.names[1:], start=1):
+            records[name] = values[:, i]
+    return records[np.argsort(records['timestamp'], kind='stable')]
+
+
+def candles_to_frame(candles):
+    """DataFrame ze strukturovaného pole svíček s časovým indexem
+
+    Sloupce vznikají z pohledů na jednotlivá pole záznamu (`copy=False`), ale
+    pandas je může při první blokové operaci sloučit do kopie a časový index
+    se vytváří vždy nově - nejde tedy o čtení bez kopírování. Pro čtení bez
+    kopírování používejte přímo strukturované pole.
+    """
+    df = pd.DataFrame({name: candles[name] for name in CANDLE_DTYPE.names[1:]}, copy=False)
+    df.index = pd.to_datetime(candles['timestamp'], unit='ms')
+    df.index.name = 'timestamp'
+    return df
+
+
+class CandleFile:
+    """Soubor svíček s pevnými záznamy čtený přes numpy memmap
+
+    Záznamy se pouze připojují na konec (poslední, tvořící se svíčku lze
+    přepsat na místě). Čtení vrací pohledy do mapované paměti bez kopírování
+    a bez parsování; rozsah podle času se hledá binárně nad sloupcem timestamp.
+
+    Zápisy i z více procesů serializuje `flock` na souboru `<cesta>.lock`.
+    Čtenáři vidí jen záznamy potvrzené počtem v hlavičce, napůl připojený
+    záznam tedy nikdy nepřečtou. Přepis poslední svíčky na místě ohraničuje
+    čítač v hlavičce (seqlock): pohled může zachytit rozepsaný poslední
+    záznam, konzistentní kopii vrací `latest(copy=True)`, `range(copy=True)`
+    a `stable()`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self._mapped = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._write_lock():
+            if not os.path.exists(path):
+                self._write_file(path, np.empty(0, dtype=CANDLE_DTYPE))
+            else:
+                self._check_header()
+
+    def __len__(self):
+        return len(self.view())
+
+    @contextmanager
+    def _write_lock(self):
+        """Výhradní zámek zápisu - vlákna přes threading.Lock, procesy přes flock"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                # Zavřením deskriptoru se flock uvolní
+                os.close(fd)
+
+    def _check_header(self):
+        """Ověří hlavičku; soubor ve starším formátu doplní o počet záznamů"""
+        with open(self.path, 'r+b') as f:
+            magic = f.read(len(MAGIC))
+            if magic == LEGACY_MAGIC:
+                # Starší formát bez počtu v hlavičce - platí celé záznamy podle velikosti
+                count = (os.fstat(f.fileno()).st_size - HEADER_SIZE) // CANDLE_DTYPE.itemsize
+                os.pwrite(f.fileno(), HEADER.pack(MAGIC, count, 0), 0)
+            elif magic != MAGIC:
+                raise ValueError(f"Neplatný soubor svíček: {self.path}")
+
+    @staticmethod
+    def _write_file(path, records):
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(records), 0).ljust(HEADER_SIZE, b'\0'))
+            f.write(records.tobytes())
+
+    @staticmethod
+    def _read_header(f):
+        """(inode, počet potvrzených záznamů, čítač přepisů konce) otevřeného souboru"""
+        _, count, seq = HEADER.unpack(os.pread(f.fileno(), HEADER.size, 0))
+        return os.fstat(f.fileno()).st_ino, count, seq
+
+    def _version(self):
+        with open(self.path, 'rb') as f:
+            ino, _, seq = self._read_header(f)
+        return ino, seq
+
+    def view(self):
+        """Pohled na potvrzené záznamy (přemapuje se jen při změně počtu nebo souboru)"""
+        with open(self.path, 'rb') as f:
+            ino, count, _ = self._read_header(f)
+            mapped = self._mapped
+            if mapped is None or mapped[0] != (ino, count):
+                if count == 0:
+                    candles = np.empty(0, dtype=CANDLE_DTYPE)
+                else:
+                    candles = np.memmap(f, dtype=CANDLE_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+                mapped = ((ino, count), candles)
+                self._mapped = mapped
+        return mapped[1]
+
+    def stable(self, fn, retries=100):
+        """Vrátí `fn(view)` spočtené bez souběžného přepisu poslední svíčky
+
+        Při opakované kolizi se zapisovatelem se `fn` zavolá pod zámkem zápisu.
+        """
+        for _ in range(retries):
+            before = self._version()
+            if before[1] % 2 == 0:
+                result = fn(self.view())
+                if self._version() == before:
+                    return result
+            time.sleep(0)
+        with self._write_lock():
+            return fn(self.view())
+
+    def last_timestamp(self):
+        candles = self.view()
+        return int(candles['timestamp'][-1]) if len(candles) else None
+
+    def append(self, candles):
+        """Připojí svíčky novější než poslední záznam; stejný čas přepíše poslední záznam"""
+        if not len(candles):
+            return 0
+        records = to_records(candles)
+        with self._write_lock():
+            return self._append_locked(records)
+
+    def _append_locked(self, records):
+        size = CANDLE_DTYPE.itemsize
+        written = 0
+        with open(self.path, 'r+b') as f:
+            fd = f.fileno()
+            _, count, seq = self._read_header(f)
+            if count:
+                last = int(np.frombuffer(os.pread(fd, 8, HEADER_SIZE + (count - 1) * size), dtype='<i8')[0])
+                updates = records[records['timestamp'] == last]
+                if len(updates):
+                    # Lichý čítač po dobu přepisu - čtenáři přes stable() zopakují čtení
+                    os.pwrite(fd, SEQ.pack(seq + 1), SEQ_OFFSET)
+                    os.pwrite(fd, updates[-1:].tobytes(), HEADER_SIZE + (count - 1) * size)
+                    os.pwrite(fd, SEQ.pack(seq + 2), SEQ_OFFSET)
+                    written += 1
+                records = records[records['timestamp'] > last]
+            if len(records):
+                # Duplicitní časy v jedné dávce - platí poslední
+                keep = np.append(records['timestamp'][1:] != records['timestamp'][:-1], True)
+                records = records[keep]
+                # Nejdřív data, potom počet v hlavičce (potvrzení pro čtenáře)
+                os.pwrite(fd, records.tobytes(), HEADER_SIZE + count * size)
+                os.pwrite(fd, COUNT.pack(count + len(records)), COUNT_OFFSET)
+                written += len(records)
+        return written
+
+    def rewrite(self, candles):
+        """Přepíše celý soubor (např. při importu starší historie); čtenáři se přemapují"""
+        with self._write_lock():
+            self._rewrite_locked(np.asarray(candles, dtype=CANDLE_DTYPE))
+
+    def _rewrite_locked(self, records):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self._write_file(tmp_path, records)
+        os.replace(tmp_path, self.path)
+
+    def insert(self, candles):
+        """Sloučí se souborem i starší svíčky (uložené svíčky mají přednost, poslední se přepíše)
+
+        Čtení, sloučení i přepis proběhnou pod jedním zámkem zápisu, takže
+        se neztratí svíčky připojené mezitím jiným vláknem nebo procesem.
+        """
+        records = to_records(candles)
+        if not len(records):
+            return 0
+
+        with self._write_lock():
+            current = self.view()
+            if not len(current):
+                return self._append_locked(records)
+
+            last = current['timestamp'][-1]
+            older = records[records['timestamp'] < last]
+            older = older[~np.isin(older['timestamp'], current['timestamp'])]
+            if len(older):
+                # Starší (i chybějící uprostřed) svíčky vyžadují přepsání souboru
+                merged = np.concatenate([older, np.array(current)])
+                order = np.argsort(merged['timestamp'], kind='stable')
+                merged = merged[order]
+                keep = np.append(merged['timestamp'][1:] != merged['timestamp'][:-1], True)
+                self._rewrite_locked(merged[keep])
+            return len(older) + self._append_locked(records[records['timestamp'] >= last])
+
+    def range(self, start=None, end=None, copy=False):
+        """Svíčky v intervalu [start, end) jako pohled bez kopírování (`copy=True` vrací konzistentní kopii)"""
+        def select(candles):
+            timestamps = candles['timestamp']
+            lo = 0 if start is None else np.searchsorted(timestamps, start, side='left')
+            hi = len(candles) if end is None else np.searchsorted(timestamps, end, side='left')
+            return np.array(candles[lo:hi]) if copy else candles[lo:hi]
+
+        return self.stable(select) if copy else select(self.view())
+
+    def latest(self, limit, copy=False):
+        """Posledních `limit` svíček jako pohled bez kopírování (`copy=True` vrací konzistentní kopii)"""
+        def select(candles):
+            tail = candles[max(0, len(candles) - limit):]
+            return np.array(tail) if copy else tail
+
+        return self.stable(select) if copy else select(self.view())
+
+
+class CandleMmapStore:
+    """Adresář souborů svíček sdílený botem, dashboardem a trénováním
+
+    `<root>/<market_type>/<BASE_QUOTE>/<timeframe>.candles`
+    """
+
+    def __init__(self, root='data/candles'):
+        self.root = root
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def file(self, symbol, timeframe, market_type='spot'):
+        """Vrátí (a otevře) soubor svíček pro daný klíč"""
+        key = (symbol, timeframe, market_type)
+        with self._lock:
+            candle_file = self._files.get(key)
+            if candle_file is None:
+                path = os.path.join(self.root, market_type, symbol.replace('/', '_'), f"{timeframe}.candles")
+                candle_file = CandleFile(path)
+                self._files[key] = candle_file
+            return candle_file
+
+    def append(self, symbol, timeframe, market_type, candles):
+        return self.file(symbol, timeframe, market_type).append(candles)
+
+    def latest(self, symbol, timeframe, market_type='spot', limit=100, copy=False):
+        return self.file(symbol, timeframe, market_type).latest(limit, copy)
+
+    def range(self, symbol, timeframe, market_type='spot', start=None, end=None, copy=False):
+        return self.file(symbol, timeframe, market_type).range(start, end, copy)
+
+    def insert(self, symbol, timeframe, market_type, candles):
+        """Sloučí se souborem i starší svíčky (viz `CandleFile.insert`)"""
+        return self.file(symbol, timeframe, market_type).insert(candles)
+
+    def import_history(self, archive, symbol, timeframe, market_type='spot'):
+        """Doplní soubor o historii z `HistoryArchive`"""
+        history = archive.load(symbol, timeframe, market_type)
+        records = np.empty(len(history['timestamp']), dtype=CANDLE_DTYPE)
+        for name in CANDLE_DTYPE.names:
+            records[name] = history[name]
+        return self.insert(symbol, timeframe, market_type, records)
@@ -0,0 +1,168 @@
+# core/candle_store.py
+import logging
+import threading
+from core.database import get_pool
+
+
+class CandleStore:
+    """Lokální perzistentní úložiště OHLCV svíček pro (symbol, timeframe, market_type)"""
+
+    def __init__(self, db_path='data/market_data.db', memory_limit=1000, page_limit=1000, max_pages=10,
+                 mmap_store=None):
+        self.db_path = db_path
+        self.memory_limit = memory_limit
+        self.page_limit = page_limit
+        self.max_pages = max_pages
+        # Volitelné zrcadlení do memmap souborů pro čtení bez kopírování (CandleMmapStore)
+        self.mmap_store = mmap_store
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        # Paměťová cache posledních svíček: klíč -> seznam [ts, o, h, l, c, v] seřazený podle času
+        self._cache = {}
+        self._lock = threading.RLock()
+        self._init_database()
+
+    def _init_database(self):
+        """Vytvoří tabulku pro uložené svíčky"""
+        with get_pool(self.db_path).transaction() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ohlcv_candles (
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                market_type TEXT NOT NULL DEFAULT 'spot',
+                timestamp INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                PRIMARY KEY (symbol, timeframe, market_type, timestamp)
+            ) WITHOUT ROWID''')
+
+    def _load(self, key, limit):
+        """Načte posledních `limit` svíček z disku"""
+        symbol, timeframe, market_type = key
+        with get_pool(self.db_path).connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT timestamp, open, high, low, close, volume
+                FROM ohlcv_candles
+                WHERE symbol = ? AND timeframe = ? AND market_type = ?
+                ORDER BY timestamp DESC LIMIT ?
+            ''', (symbol, timeframe, market_type, limit))
+            rows = cursor.fetchall()
+        return [list(row) for row in reversed(rows)]
+
+    def _cached(self, key):
+        """Vrátí paměťovou cache klíče, při prvním přístupu ji načte z disku"""
+        if key not in self._cache:
+            self._cache[key] = self._load(key, self.memory_limit)
+        return self._cache[key]
+
+    def last_timestamp(self, symbol, timeframe, market_type='spot'):
+        """Časová značka poslední uložené svíčky (nebo None)"""
+        with self._lock:
+            candles = self._cached((symbol, timeframe, market_type))
+            return candles[-1][0] if candles else None
+
+    def merge(self, symbol, timeframe, market_type, candles, persist=True):
+        """Sloučí nové svíčky s uloženými; poslední (tvořící se) svíčka se přepíše
+
+        S `persist=False` se svíčky uloží jen do paměti (průběžné ticky streamu).
+        """
+        if not candles:
+            return 0
+
+        key = (symbol, timeframe, market_type)
+        candles = [list(c[:6]) for c in candles]
+
+        with self._lock:
+            cached = self._cached(key)
+            if len(candles) == 1 and (not cached or candles[0][0] >= cached[-1][0]):
+                # Rychlá cesta pro stream: aktualizace nebo připojení poslední svíčky
+                if cached and cached[-1][0] == candles[0][0]:
+                    cached[-1] = candles[0]
+                else:
+                    cached.append(candles[0])
+                    del cached[:-self.memory_limit]
+            else:
+                merged = {c[0]: c for c in cached}
+                for candle in candles:
+                    merged[candle[0]] = candle
+                self._cache[key] = [merged[ts] for ts in sorted(merged)][-self.memory_limit:]
+
+            if self.mmap_store is not None:
+                self._mirror(key, candles)
+
+            if not persist:
+                return len(candles)
+
+            with get_pool(self.db_path).transaction() as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO ohlcv_candles
+                    (symbol, timeframe, market_type, timestamp, open, high, low, close, volume)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(symbol, timeframe, market_type, *c) for c in candles])
+
+        return len(candles)
+
+    def _mirror(self, key, candles):
+        """Zrcadlí svíčky do memmap souboru (prázdný soubor se naplní z paměťové cache)
+
+        Starší (doplněné) svíčky se do souboru vloží přepisem, novější se připojí.
+        """
+        try:
+            candle_file = self.mmap_store.file(*key)
+            candle_file.insert(self._cache[key] if len(candle_file) == 0 else candles)
+        except Exception as e:
+            self.logger.error(f"Chyba při zápisu do memmap souboru svíček: {str(e)}")
+
+    def get_window(self, symbol, timeframe, market_type='spot', limit=100):
+        """Vrátí posledních `limit` svíček z lokálního úložiště"""
+        key = (symbol, timeframe, market_type)
+        with self._lock:
+            cached = self._cached(key)
+            if limit <= len(cached):
+                return [list(c) for c in cached[-limit:]]
+        # Delší okno než paměťová cache - čteme přímo z disku
+        return self._load(key, limit)
+
+    def plan(self, symbol, timeframe, market_type, limit=100):
+        """Určí, co je potřeba stáhnout: vrací (since, limit) pro dotaz na burzu"""
+        key = (symbol, timeframe, market_type)
+        with self._lock:
+            cached = self._cached(key)
+            if not cached or len(cached) < min(limit, self.memory_limit):
+                # Studený start nebo nedostatek historie - stáhneme celé okno
+                return None, max(limit, 1)
+            # Inkrementální dotažení od poslední (možná ještě tvořící se) svíčky
+            return cached[-1][0], self.page_limit
+
+    def sync(self, symbol, timeframe, market_type, fetch, limit=100):
+        """Stáhne pouze svíčky novější než poslední uložená a vrátí okno `limit` svíček
+
+        `fetch(since, limit)` volá burzu a vrací seznam OHLCV svíček.
+        """
+        since, fetch_limit = self.plan(symbol, timeframe, market_type, limit)
+
+        if since is None:
+            self.merge(symbol, timeframe, market_type, fetch(None, fetch_limit))
+        else:
+            for _ in range(self.max_pages):
+                batch = fetch(since, fetch_limit)
+                self.merge(symbol, timeframe, market_type, batch)
+                if len(batch) < fetch_limit or batch[-1][0] <= since:
+                    break
+                since = batch[-1][0]
+
+        return self.get_window(symbol, timeframe, market_type, limit)
+
+    def clear(self, symbol=None, timeframe=None, market_type=None):
+        """Vymaže paměťovou cache (disk zůstává zachován)"""
+        with self._lock:
+            if symbol is None:
+                self._cache.clear()
+            else:
+                self._cache.pop((symbol, timeframe, market_type), None)
@@ -0,0 +1,155 @@
+# core/client_pool.py
+import ccxt
+import logging
+import threading
+from core.rate_limiter import request_weights, request_priority, used_weight, retry_after
+
+# Typ trhu v konfiguraci -> hodnota options['defaultType'] v ccxt
+CCXT_MARKET_TYPES = {
+    'spot': 'spot',
+    'margin': 'margin',
+    'futures': 'future',
+    'future': 'future',
+}
+
+
+def rate_limit_bucket(market_type):
+    """Kbelík limitu vah pro daný typ trhu (spot a margin sdílí stejné API)"""
+    return 'future' if CCXT_MARKET_TYPES.get(market_type, market_type) == 'future' else 'spot'
+
+
+class ExchangeClientPool:
+    """Pool předkonfigurovaných ccxt klientů podle typu trhu
+
+    Každý typ trhu má vlastního klienta s pevně nastaveným `defaultType`,
+    takže se konfigurace klienta nikdy nemění za běhu a dotazy na spot
+    a futures mohou běžet souběžně z více vláken. Dotazy přes `call` čerpají
+    ze sdíleného limitu vah (`rate_limiter`). Metadata trhů se při prvním
+    použití berou z lokální cache (`market_cache`), je-li platná.
+    """
+
+    def __init__(self, client_config, sandbox=False, exchange_id='binance', rate_limiter=None, market_cache=None):
+        self.client_config = client_config
+        self.sandbox = sandbox
+        self.exchange_id = exchange_id
+        self.rate_limiter = rate_limiter
+        self.market_cache = market_cache
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._clients = {}
+        self._market_locks = {}
+        self._markets_loaded = set()
+        self._lock = threading.Lock()
+
+    def _create(self, market_type):
+        """Vytvoří nového klienta pro daný typ trhu"""
+        config = dict(self.client_config)
+        options = dict(config.get('options', {}))
+        options['defaultType'] = CCXT_MARKET_TYPES.get(market_type, market_type)
+        config['options'] = options
+
+        client = getattr(ccxt, self.exchange_id)(config)
+        if self.sandbox:
+            client.set_sandbox_mode(True)
+        return client
+
+    def get(self, market_type, load_markets=True):
+        """Vrátí klienta pro daný typ trhu (s již načtenými trhy)
+
+        Ustálený stav (klient existuje, trhy načtené) nebere žádný zámek;
+        zámky se ověřují znovu až uvnitř (double-checked locking).
+        """
+        client = self._clients.get(market_type)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(market_type)
+                if client is None:
+                    client = self._create(market_type)
+                    # Zámek trhů musí existovat dřív, než klienta uvidí rychlá cesta
+                    self._market_locks[market_type] = threading.Lock()
+                    self._clients[market_type] = client
+
+        if load_markets and market_type not in self._markets_loaded:
+            # Trhy se načítají jen jednou, souběžní volající počkají
+            with self._market_locks[market_type]:
+                if market_type not in self._markets_loaded:
+                    self._load_markets(market_type, client)
+                    self._markets_loaded.add(market_type)
+        return client
+
+    def _load_markets(self, market_type, client):
+        """Načte trhy z lokální cache, jinak z burzy (a uloží je do cache)"""
+        cache = self.market_cache
+        if cache is not None:
+            cached = cache.load(self.exchange_id, market_type, self.sandbox)
+            if cached is not None:
+                client.set_markets(*cached)
+                return
+
+        try:
+            self._limited(market_type, client, 'load_markets')
+        except Exception as e:
+            # Burza nedostupná - prošlá metadata jsou lepší než žádná
+            stale = cache.load(self.exchange_id, market_type, self.sandbox, allow_stale=True) if cache else None
+            if stale is None:
+                raise
+            self.logger.warning(f"Použita prošlá cache trhů pro {market_type}: {str(e)}")
+            client.set_markets(*stale)
+            return
+
+        if cache is not None:
+            cache.save(self.exchange_id, market_type, client.markets, client.currencies, self.sandbox)
+
+    def set_markets(self, market_type, markets, currencies=None):
+        """Nastaví klientovi metadata trhů bez dotazu na burzu"""
+        client = self.get(market_type, load_markets=False)
+        with self._market_locks[market_type]:
+            client.set_markets(markets, currencies)
+            self._markets_loaded.add(market_type)
+
+    def refresh_markets(self, market_type):
+        """Vynutí nové stažení trhů z burzy a aktualizuje cache"""
+        client = self.get(market_type, load_markets=False)
+        with self._market_locks[market_type]:
+            self._limited(market_type, client, 'load_markets', True)
+            self._markets_loaded.add(market_type)
+        if self.market_cache is not None:
+            self.market_cache.save(self.exchange_id, market_type, client.markets, client.currencies, self.sandbox)
+        return client.markets
+
+    def call(self, market_type, method, *args, **kwargs):
+        """Provede dotaz na burzu v rámci sdíleného limitu vah"""
+        return self._limited(market_type, self.get(market_type), method, *args, **kwargs)
+
+    def _limited(self, market_type, client, method, *args, **kwargs):
+        if self.rate_limiter is None:
+            return getattr(client, method)(*args, **kwargs)
+
+        bucket = rate_limit_bucket(market_type)
+        weights = request_weights(client, bucket, method, *args, **kwargs)
+        for weight_bucket, weight in weights.items():
+            self.rate_limiter.acquire(weight, request_priority(method), weight_bucket)
+        try:
+            result = getattr(client, method)(*args, **kwargs)
+        except ccxt.DDoSProtection:
+            # 429/418 - blokace platí pro všechny procesy sdílející limit
+            self.rate_limiter.penalize(retry_after(client.last_response_headers), bucket)
+            raise
+
+        # Po více dotazech (load_markets) patří hlavičky poslednímu z nich - nesrovnává se
+        weight = used_weight(client.last_response_headers) if list(weights) == [bucket] else None
+        if weight is not None:
+            self.rate_limiter.observe(weight, bucket)
+        return result
+
+    def preload(self, market_types):
+        """Předem vytvoří klienty a načte trhy pro zadané typy trhů"""
+        for market_type in market_types:
+            try:
+                self.get(market_type)
+            except Exception as e:
+                self.logger.warning(f"Nepodařilo se načíst trhy pro {market_type}: {str(e)}")
+
+    def clients(self):
+        """Vrátí všechny vytvořené klienty"""
+        with self._lock:
+            return dict(self._clients)
@@ -1,29 +1,408 @@
 # core/data_aggregator.py
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+import numpy as np
+import pandas as pd
 import ccxt
-from coinmetrics.api_client import CoinMetricsClient
+from core.client_pool import CCXT_MARKET_TYPES, rate_limit_bucket
 
-class DataAggregator:
-    def __init__(self):
-        self.sources = {
-            'binance': ccxt.binance(),
-            'coinmetrics': CoinMetricsClient(),
-            'kraken': ccxt.kraken()
+logger = logging.getLogger(__name__)
+
+# Škálování MAD na směrodatnou odchylku normálního rozdělení
+MAD_SCALE = 1.4826
+
+
+# Zdroje jen se spotovými cenami - index futures je nepoužívá (cena se liší o bázi)
+SPOT_ONLY_SOURCES = ('coinmetrics', 'kraken')
+
+
+def default_sources(names=None, clients=None, market_type='spot'):
+    """Výchozí zdroje cen pro daný typ trhu (volitelně jen vybrané podle jména)
+
+    S `clients` (ExchangeClientPool) se Binance dotazuje přes sdílený pool,
+    a tedy i sdílený limit vah bota.
+    """
+    if clients is not None:
+        binance = lambda: PooledExchangeSource(clients, market_type)
+    else:
+        binance = lambda: ccxt.binance({
+            'enableRateLimit': True,
+            'options': {'defaultType': CCXT_MARKET_TYPES.get(market_type, market_type)}
+        })
+    factories = {
+        'binance': binance,
+        'coinmetrics': CoinMetricsSource,
+        'kraken': lambda: ccxt.kraken({'enableRateLimit': True}),
+    }
+    spot = rate_limit_bucket(market_type) == 'spot'
+    sources = {}
+    for name in names or factories:
+        if not spot and name in SPOT_ONLY_SOURCES:
+            continue
+        try:
+            sources[name] = factories[name]()
+        except ImportError:
+            logger.warning(f"Balíček pro zdroj {name} není nainstalován, zdroj se vynechá")
+        except KeyError:
+            logger.warning(f"Neznámý zdroj cen: {name}")
+    return sources
+
+
+class PooledExchangeSource:
+    """Svíčky burzy přes sdílený `ExchangeClientPool` (společný limit vah s botem)"""
+
+    def __init__(self, clients, market_type='spot'):
+        self.clients = clients
+        self.market_type = market_type
+
+    def fetch_ohlcv(self, symbol, timeframe='1h', since=None, limit=500):
+        return self.clients.call(self.market_type, 'fetch_ohlcv', symbol, timeframe, since=since, limit=limit)
+
+
+class CoinMetricsSource:
+    """Svíčky z Coin Metrics ve formátu ccxt (volitelná závislost `coinmetrics`)"""
+
+    def __init__(self, exchange='binance', api_key=None):
+        from coinmetrics.api_client import CoinMetricsClient
+        self.client = CoinMetricsClient(api_key) if api_key else CoinMetricsClient()
+        self.exchange = exchange
+
+    def fetch_ohlcv(self, symbol, timeframe='1h', since=None, limit=500):
+        base, quote = symbol.lower().split('/')
+        params = {
+            'markets': f"{self.exchange}-{base}-{quote}-spot",
+            'frequency': timeframe,
+            'page_size': limit,
+            'paging_from': 'start' if since is not None else 'end'
         }
+        if since is not None:
+            params['start_time'] = pd.Timestamp(since, unit='ms', tz='UTC').isoformat()
+
+        candles = [
+            [
+                pd.Timestamp(row['time']).value // 1000000,
+                float(row['price_open']), float(row['price_high']),
+                float(row['price_low']), float(row['price_close']),
+                float(row.get('volume', 0.0))
+            ]
+            for row in islice(self.client.get_market_candles(**params), limit)
+        ]
+        return sorted(candles, key=lambda candle: candle[0])
+
+
+class _AlignedMatrix:
+    """Zarovnaná matice zavíracích cen (čas × zdroj) s inkrementálním forward-fill
+
+    Nové řádky se připojují na konec předalokovaného pole, starší časy se
+    vloží sloučením. Forward-fill se přepočítává vektorově jen od prvního
+    změněného řádku.
+    """
+
+    def __init__(self, sources, capacity=1024):
+        self.sources = list(sources)
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.values = np.full((capacity, len(self.sources)), np.nan)
+        self.filled = np.full((capacity, len(self.sources)), np.nan)
+        self.size = 0
+        self.last = {source: None for source in self.sources}
+        self._dirty = None
+        self._lock = threading.Lock()
+
+    def merge(self, source, candles):
+        """Zapíše zavírací ceny zdroje; vrací počet zapsaných svíček"""
+        if not len(candles):
+            return 0
+        column = self.sources.index(source)
+        timestamps = np.fromiter((candle[0] for candle in candles), dtype=np.int64, count=len(candles))
+        closes = np.fromiter((candle[4] for candle in candles), dtype=np.float64, count=len(candles))
+
+        with self._lock:
+            last = self.last[source]
+            if last is not None:
+                # Jen nové svíčky a přepis poslední (tvořící se) svíčky zdroje
+                mask = timestamps >= last
+                timestamps, closes = timestamps[mask], closes[mask]
+            if not len(timestamps):
+                return 0
+
+            self._insert_rows(np.setdiff1d(timestamps, self.timestamps[:self.size]))
+            rows = np.searchsorted(self.timestamps[:self.size], timestamps)
+            self.values[rows, column] = closes
+            first = int(rows.min())
+            self._dirty = first if self._dirty is None else min(self._dirty, first)
+            self.last[source] = int(timestamps.max()) if last is None else max(last, int(timestamps.max()))
+            return len(timestamps)
+
+    def _insert_rows(self, new):
+        """Přidá nové časy (seřazené, unikátní) do osy matice"""
+        if not len(new):
+            return
+        size = self.size + len(new)
+        if size > len(self.timestamps):
+            self._grow(max(size, 2 * len(self.timestamps)))
+
+        if not self.size or new[0] > self.timestamps[self.size - 1]:
+            # Běžný případ - nové svíčky jsou novější než celá matice
+            self.timestamps[self.size:size] = new
+        else:
+            current = self.timestamps[:self.size].copy()
+            merged = np.union1d(current, new)
+            positions = np.searchsorted(merged, current)
+            values = np.full((size, len(self.sources)), np.nan)
+            values[positions] = self.values[:self.size]
+            self.timestamps[:size] = merged
+            self.values[:size] = values
+            first = int(np.searchsorted(merged, new[0]))
+            self._dirty = first if self._dirty is None else min(self._dirty, first)
+        self.size = size
+
+    def _grow(self, capacity):
+        timestamps = np.empty(capacity, dtype=np.int64)
+        timestamps[:self.size] = self.timestamps[:self.size]
+        values = np.full((capacity, len(self.sources)), np.nan)
+        values[:self.size] = self.values[:self.size]
+        filled = np.full((capacity, len(self.sources)), np.nan)
+        filled[:self.size] = self.filled[:self.size]
+        self.timestamps, self.values, self.filled = timestamps, values, filled
+
+    def _refill(self):
+        """Vektorový forward-fill od prvního změněného řádku"""
+        start = self._dirty
+        if start is None:
+            return
+        seed = self.filled[start - 1:start] if start else np.full((1, len(self.sources)), np.nan)
+        block = np.vstack([seed, self.values[start:self.size]])
+        index = np.where(~np.isnan(block), np.arange(len(block))[:, None], 0)
+        np.maximum.accumulate(index, axis=0, out=index)
+        self.filled[start:self.size] = np.take_along_axis(block, index, axis=0)[1:]
+        self._dirty = None
+
+    def frame(self, limit=None):
+        """Kopie posledních `limit` řádků jako DataFrame (index čas, sloupce zdroje)"""
+        with self._lock:
+            self._refill()
+            start = 0 if limit is None else max(0, self.size - limit)
+            timestamps = self.timestamps[start:self.size].copy()
+            values = self.filled[start:self.size].copy()
+
+        df = pd.DataFrame(values, columns=self.sources)
+        df.index = pd.to_datetime(timestamps, unit='ms')
+        df.index.name = 'timestamp'
+        df.columns.name = 'source'
+        return df
+
+
+class PriceIndex:
+    """Složená referenční cena napříč zdroji (medián nebo VWAP)
+
+    Při každé aktualizaci zdroje se z čerstvých cen spočítá medián a MAD;
+    ceny vzdálené od mediánu víc než `max_deviation` násobků MAD (nejméně
+    však `min_band` relativně) se vyřadí a z ostatních se složí index.
+    Čtení `price()` jen vrací naposledy spočtený stav - bez zámků a dotazů.
+    """
+
+    def __init__(self, sources, method='median', max_deviation=5.0, min_band=0.001, max_age=120):
+        self.sources = list(sources)
+        self.method = method
+        self.max_deviation = max_deviation
+        self.min_band = min_band
+        self.max_age = max_age
+        self._prices = np.full(len(self.sources), np.nan)
+        self._volumes = np.zeros(len(self.sources))
+        self._updated = np.zeros(len(self.sources))
+        self._state = None
+        self._lock = threading.Lock()
+
+    def update(self, source, price, volume=None, updated=None):
+        """Zapracuje novou cenu zdroje (`volume=None` ponechá poslední objem)"""
+        if source not in self.sources or not price or price <= 0:
+            return self._state
+        position = self.sources.index(source)
+        now = updated if updated is not None else time.time()
+        with self._lock:
+            self._prices[position] = price
+            if volume is not None:
+                self._volumes[position] = volume
+            self._updated[position] = now
+            self._state = self._compute(now)
+            return self._state
+
+    def _compute(self, now):
+        fresh = ~np.isnan(self._prices) & (now - self._updated <= self.max_age)
+        if not fresh.any():
+            return None
+
+        prices = self._prices[fresh]
+        median = float(np.median(prices))
+        mad = float(np.median(np.abs(prices - median))) * MAD_SCALE
+        band = max(self.max_deviation * mad, self.min_band * median)
+        accepted = np.abs(prices - median) <= band
+
+        volumes = self._volumes[fresh][accepted]
+        if self.method == 'vwap' and volumes.sum() > 0:
+            price = float(np.average(prices[accepted], weights=volumes))
+        else:
+            price = float(np.median(prices[accepted]))
+
+        names = [source for source, is_fresh in zip(self.sources, fresh) if is_fresh]
+        return {
+            'price': price,
+            'timestamp': int(now * 1000),
+            'sources': [name for name, ok in zip(names, accepted) if ok],
+            'rejected': [name for name, ok in zip(names, accepted) if not ok],
+        }
+
+    def price(self, max_age=None):
+        """Poslední složená cena (None, pokud chybí nebo je starší než `max_age` s)"""
+        state = self._state
+        if state is None:
+            return None
+        max_age = self.max_age if max_age is None else max_age
+        if time.time() - state['timestamp'] / 1000 > max_age:
+            return None
+        return state['price']
+
+    def snapshot(self):
+        """Poslední stav indexu včetně použitých a vyřazených zdrojů"""
+        state = self._state
+        return dict(state) if state is not None else None
+
+
+class DataAggregator:
+    """Konsolidované zavírací ceny z více burz a datových zdrojů
+
+    Zdroje se dotazují souběžně, každý s vlastním časovým limitem. Pomalý
+    zdroj nezdrží čtení - jeho výsledek se do matice zapíše, až dorazí,
+    a do té doby se použijí jeho poslední známé ceny (forward-fill).
+    Při dalších čteních se od každého zdroje stahují jen nové svíčky.
+
+    Každá dorazivší svíčka (a ticker ze streamu `stream_source`) aktualizuje
+    `PriceIndex` symbolu; `price()` pak vrací referenční cenu bez dotazu.
+    """
+
+    def __init__(self, sources=None, timeframe='1h', timeout=10, limit=500,
+                 index_method='median', max_deviation=5.0, max_age=120, stream_source=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.sources = sources if sources is not None else default_sources()
+        self.timeframe = timeframe
+        self.timeout = timeout
+        self.limit = limit
+        self.index_settings = {'method': index_method, 'max_deviation': max_deviation, 'max_age': max_age}
+        self.stream_source = stream_source
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(self.sources)), thread_name_prefix='aggregator'
+        )
+        self._matrices = {}
+        self._indices = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def source_timeout(self, source):
+        """Časový limit zdroje (`timeout` může být číslo nebo slovník podle zdroje)"""
+        if isinstance(self.timeout, dict):
+            return self.timeout.get(source, self.timeout.get('default', 10))
+        return self.timeout
+
+    def get_combined_data(self, symbol='BNB', limit=None):
+        """Zavírací ceny všech zdrojů zarovnané podle času s forward-fill"""
+        matrix = self._matrix(symbol)
+        futures = {source: self._submit(symbol, source, matrix) for source in self.sources}
+
+        started = time.monotonic()
+        for source, future in sorted(futures.items(), key=lambda item: self.source_timeout(item[0])):
+            remaining = self.source_timeout(source) - (time.monotonic() - started)
+            done, _ = wait([future], timeout=max(0.0, remaining))
+            if not done:
+                self.logger.warning(
+                    f"Zdroj {source} neodpověděl do {self.source_timeout(source)}s, použijí se poslední data"
+                )
+        return matrix.frame(limit)
+
+    def refresh(self, symbol):
+        """Spustí stažení ze všech zdrojů bez čekání na výsledek"""
+        matrix = self._matrix(symbol)
+        for source in self.sources:
+            self._submit(symbol, source, matrix)
+
+    def start(self, symbols, interval=10):
+        """Průběžně obnovuje index zadaných symbolů na pozadí"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                for symbol in symbols:
+                    self.refresh(symbol)
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name='price-index', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def price_index(self, symbol):
+        """Index symbolu (vytváří se při prvním použití)"""
+        with self._lock:
+            index = self._indices.get(symbol)
+            if index is None:
+                index = PriceIndex(self.sources, **self.index_settings)
+                self._indices[symbol] = index
+            return index
+
+    def price(self, symbol, max_age=None):
+        """Složená referenční cena symbolu (None, pokud není k dispozici)"""
+        index = self._indices.get(symbol)
+        return index.price(max_age) if index is not None else None
+
+    def on_event(self, event):
+        """Posluchač `MarketDataStream` - ticker aktualizuje cenu zdroje `stream_source`"""
+        if event.get('type') != 'ticker' or self.stream_source is None:
+            return
+        base, _, quote = event['symbol'].partition('/')
+        if quote == 'USDT':
+            self.price_index(base).update(self.stream_source, event['ticker'].get('last'))
+
+    def _matrix(self, symbol):
+        with self._lock:
+            matrix = self._matrices.get(symbol)
+            if matrix is None:
+                matrix = _AlignedMatrix(self.sources)
+                self._matrices[symbol] = matrix
+            return matrix
+
+    def _submit(self, symbol, source, matrix):
+        """Spustí stažení ze zdroje (probíhající dotaz se znovu nespouští)"""
+        key = (symbol, source)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None or future.done():
+                future = self._executor.submit(self._fetch, symbol, source, matrix)
+                self._pending[key] = future
+            return future
+
+    def _fetch(self, symbol, source, matrix):
+        try:
+            candles = self.sources[source].fetch_ohlcv(
+                f'{symbol}/USDT', self.timeframe, since=matrix.last[source], limit=self.limit
+            )
+            merged = matrix.merge(source, candles)
+            if merged:
+                self.price_index(symbol).update(source, candles[-1][4], candles[-1][5])
+            return merged
+        except Exception as e:
+            self.logger.error(f"Chyba při načítání z {source}: {str(e)}")
+            return 0
 
-    def get_combined_data(self, symbol='BNB'):
-        dfs = []
-        for source_name, client in self.sources.items():
-            try:
-                data = client.fetch_ohlcv(f'{symbol}/USDT', '1h')
-                df = pd.DataFrame(data)
-                df['source'] = source_name
-                dfs.append(df)
-            except Exception as e:
-                print(f"Chyba při načítání z {source_name}: {str(e)}")
-        
-        combined_df = pd.concat(dfs)
-        return combined_df.pivot_table(
-            index='timestamp',
-            columns='source',
-            values='close'
-        ).ffill()
+    def close(self):
+        self.stop()
+        self._executor.shutdown(wait=False)
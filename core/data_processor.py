@@ -3,6 +3,10 @@ import talib
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 import logging
+from core.windowing import sliding_windows
+from core.indicators import IndicatorEngine
+from core.candle_mmap import candles_to_frame
+from core.ring_buffer import CandleRingBuffer
 
 class DataProcessor:
     def __init__(self, config=None):
@@ -10,50 +14,124 @@ class DataProcessor:
         self.lookback_window = self.config.get('lookback_window', 60)
         self.scaler = StandardScaler()
         self.logger = logging.getLogger(__name__)
+        self.indicators = IndicatorEngine(history=self.lookback_window)
+        # Předalokované vstupní okno modelu pro živou predikci
+        self._latest_window = np.empty((1, self.lookback_window, 1), dtype=np.float32)
 
     def process_data(self, raw_data):
+        """Zpětně kompatibilní alias pro `process_history`"""
+        return self.process_history(raw_data)
+
+    def process_history(self, raw_data):
+        """Vytvoří všechny klouzavé sekvence pro dávkové použití (trénink, backtest)"""
         try:
-            # Kontrola, že raw_data není prázdné
-            if not raw_data or len(raw_data) == 0:
-                self.logger.warning("Prázdná vstupní data")
+            df = self._build_frame(raw_data)
+            if df is None:
                 return np.array([])
-                
-            # Převod dat na DataFrame
-            df = pd.DataFrame(raw_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
             
             # Technické indikátory
             df['rsi'] = talib.RSI(df['close'], timeperiod=14)
             df['ema_20'] = talib.EMA(df['close'], timeperiod=20)
             df['ema_50'] = talib.EMA(df['close'], timeperiod=50)
             
-            # Normalizace
-            self.scaler.fit(df[['close']])
-            df['scaled_close'] = self.scaler.transform(df[['close']])
-            
             # Kontrola dostatku dat
-            values = df['scaled_close'].values
+            values = self._scale_close(df)
             if len(values) < self.lookback_window:
                 self.logger.warning(f"Nedostatek dat: {len(values)}/{self.lookback_window}")
                 return np.array([])
                 
-            # Vytvoření sekvencí
-            sequences = []
-            for i in range(self.lookback_window, len(values)):
-                sequences.append(values[i-self.lookback_window:i])
+            # Vytvoření sekvencí jako pohledů do pole (bez kopírování oken)
+            sequences = sliding_windows(values, self.lookback_window, drop_last=True)
             
             # Ověření, že máme nějaké sekvence
-            if not sequences:
+            if len(sequences) == 0:
                 return np.array([])
                 
-            return np.array(sequences).reshape(-1, self.lookback_window, 1)
+            return sequences
             
         except Exception as e:
             self.logger.error(f"Chyba při zpracování dat: {str(e)}")
             # Vrátíme prázdné pole místo vyhození výjimky
             return np.array([])
 
+    def process_latest(self, raw_data):
+        """Vytvoří pouze poslední okno `lookback_window` svíček pro živou predikci
+
+        Vrací tenzor tvaru (1, lookback_window, 1), takže model provede
+        jediný dopředný průchod místo predikce nad celou historií.
+        """
+        try:
+            if isinstance(raw_data, CandleRingBuffer):
+                raw_data = raw_data.latest()
+            if isinstance(raw_data, np.ndarray) and raw_data.dtype.names:
+                return self._latest_from_array(raw_data['close'])
+
+            df = self._build_frame(raw_data)
+            if df is None:
+                return np.array([])
+
+            values = self._scale_close(df)
+            if len(values) < self.lookback_window:
+                self.logger.warning(f"Nedostatek dat: {len(values)}/{self.lookback_window}")
+                return np.array([])
+
+            return values[-self.lookback_window:].astype(np.float32).reshape(1, self.lookback_window, 1)
+
+        except Exception as e:
+            self.logger.error(f"Chyba při zpracování posledního okna: {str(e)}")
+            return np.array([])
+
+    def _latest_from_array(self, close):
+        """Standardizace jako StandardScaler přímo nad sloupcem bez DataFrame
+
+        Výsledek se zapisuje do předalokovaného okna, takže ustálený běh
+        nealokuje nová pole. Okno je platné do dalšího volání.
+        """
+        if len(close) < self.lookback_window:
+            self.logger.warning(f"Nedostatek dat: {len(close)}/{self.lookback_window}")
+            return np.array([])
+
+        mean = close.mean()
+        std = close.std()
+        window = self._latest_window[0, :, 0]
+        np.subtract(close[-self.lookback_window:], mean, out=window, casting='same_kind')
+        if std > 0:
+            np.divide(window, std, out=window)
+        return self._latest_window
+
+    def latest_indicators(self, raw_data):
+        """Inkrementálně aktualizuje indikátory a vrátí hodnoty pro poslední svíčku"""
+        try:
+            return self.indicators.ingest(raw_data)
+        except Exception as e:
+            self.logger.error(f"Chyba při aktualizaci indikátorů: {str(e)}")
+            return None
+
+    def _build_frame(self, raw_data):
+        """Převede surová OHLCV data na DataFrame indexovaný časem"""
+        # Kontrola, že raw_data není prázdné
+        if isinstance(raw_data, CandleRingBuffer):
+            raw_data = raw_data.latest()
+        if raw_data is None or len(raw_data) == 0:
+            self.logger.warning("Prázdná vstupní data")
+            return None
+        
+        # Strukturované pole z memmap souboru - sloupce bez parsování řádků
+        if isinstance(raw_data, np.ndarray) and raw_data.dtype.names:
+            return candles_to_frame(raw_data)
+            
+        # Převod dat na DataFrame
+        df = pd.DataFrame(raw_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df.set_index('timestamp', inplace=True)
+        return df
+
+    def _scale_close(self, df):
+        """Normalizuje uzavírací ceny a vrátí je jako 1D pole"""
+        self.scaler.fit(df[['close']])
+        df['scaled_close'] = self.scaler.transform(df[['close']])
+        return df['scaled_close'].values
+
     def create_scaler(self, features):
         self.scaler.fit(features)
         return self.scaler
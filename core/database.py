@@ -0,0 +1,461 @@
+# core/database.py
+import os
+import re
+import time
+import numbers
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+DB_PATH = 'data/trading_history.db'
+
+# Spravované indexy (název, tabulka, sloupce) - dotazy dashboardu a bota
+# nesmí skenovat celé tabulky ani řadit přes dočasný B-strom
+# (kontroluje scripts/check_query_plans.py); vytváří je `migrate()`
+INDEXES = (
+    # Poslední obchody, denní P/L a analytika podle času (pokrývá timestamp, profit)
+    ('idx_trades_timestamp', 'trades', ('timestamp', 'profit')),
+    ('idx_trades_market_time', 'trades', ('market_type', 'timestamp', 'profit')),
+    # Uzavírání otevřených obchodů
+    ('idx_trades_open', 'trades', ('symbol', 'side', 'status')),
+    # Histogram zisků uzavřených obchodů (pokrývá status, timestamp, profit)
+    ('idx_trades_closed', 'trades', ('status', 'timestamp', 'profit')),
+    ('idx_decisions_timestamp', 'decisions', ('timestamp',)),
+    ('idx_decisions_market_time', 'decisions', ('market_type', 'timestamp')),
+    # Poslední signál páru
+    ('idx_decisions_symbol', 'decisions', ('symbol', 'market_type', 'timestamp', 'signal')),
+    ('idx_equity_timestamp', 'equity', ('timestamp', 'equity_value')),
+    ('idx_equity_market', 'equity', ('market_type', 'timestamp', 'equity_value')),
+    ('idx_positions_market', 'active_positions', ('market_type',)),
+    # Souhrny podle trhu (primární klíč začíná dnem)
+    ('idx_rollups_market', 'trade_rollups', ('market_type', 'day')),
+)
+
+# Verze schématu (PRAGMA user_version), zvyšuje se s každou migrací
+SCHEMA_VERSION = 2
+
+# Časové sloupce uložené jako INTEGER epoch ms (od verze 1)
+TIME_COLUMNS = {
+    'trades': ('timestamp',),
+    'equity': ('timestamp',),
+    'decisions': ('timestamp',),
+    'active_positions': ('timestamp',),
+    'model_metrics': ('timestamp',),
+    'model_predictions': ('timestamp',),
+    'risk_metrics': ('timestamp',),
+}
+
+# Převod textu ISO (naivní = místní čas) na epoch ms přímo v SQLite
+_ISO_TO_MS = "CAST(round((julianday({0}, 'utc') - 2440587.5) * 86400000) AS INTEGER)"
+
+DAY_MS = 86400000
+
+# Denní souhrny uzavřených obchodů (den UTC × pár × trh) - dashboardy čtou
+# O(dní) řádků místo celé tabulky trades; aktuální je drží triggery (od verze 2)
+_ROLLUP_TABLE = '''
+CREATE TABLE IF NOT EXISTS trade_rollups (
+    day INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    market_type TEXT NOT NULL,
+    trades INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    gross_profit REAL NOT NULL DEFAULT 0,
+    gross_loss REAL NOT NULL DEFAULT 0,
+    volume REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, symbol, market_type)
+) WITHOUT ROWID'''
+
+# Klíč souhrnu pro řádek obchodu (NEW/OLD v triggeru nebo tabulka při přepočtu)
+_ROLLUP_KEY = (
+    "COALESCE({0}.timestamp, 0) - COALESCE({0}.timestamp, 0) % " + str(DAY_MS),
+    "COALESCE({0}.symbol, '')",
+    "COALESCE({0}.market_type, 'spot')",
+)
+
+# Příspěvek obchodu ke sloupcům souhrnu (NULL profit = ani zisk, ani ztráta)
+_ROLLUP_VALUES = (
+    "1",
+    "COALESCE({0}.profit > 0, 0)",
+    "COALESCE({0}.profit <= 0, 0)",
+    "MAX(COALESCE({0}.profit, 0), 0)",
+    "MAX(-COALESCE({0}.profit, 0), 0)",
+    "COALESCE({0}.amount * {0}.entry_price, 0)",
+)
+
+_ROLLUP_COLUMNS = ('trades', 'wins', 'losses', 'gross_profit', 'gross_loss', 'volume')
+
+# Místní časová zóna pro převod v pandas (zjišťuje se při prvním použití)
+_LOCAL_TZ = None
+
+# Sdílené pooly v rámci procesu (cesta -> ConnectionPool)
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+class ConnectionPool:
+    """Omezený pool SQLite spojení s WAL a laděnými pragmami
+
+    Spojení se vytvářejí až při potřebě, nejvýše `size`. Volající, který
+    nedostane spojení do `timeout` sekund, dostane `TimeoutError`. WAL
+    umožňuje souběžné čtení dashboardu s jedním zapisovatelem (botem)
+    a `synchronous=NORMAL` zkracuje commit bez rizika poškození databáze.
+    """
+
+    def __init__(self, path=DB_PATH, size=5, timeout=30, busy_timeout=30000,
+                 cached_statements=256, mmap_size=268435456):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.mmap_size = mmap_size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Žádné volné spojení s databází {self.path} do {self.timeout}s")
+
+    def _release(self, conn):
+        try:
+            if conn.in_transaction:
+                # Nedokončená transakce se nesmí přenést k dalšímu volajícímu
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Zapůjčí spojení z poolu (po skončení se vrátí, neuzavírá se)"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """Spojení v transakci - commit při úspěchu, rollback při výjimce
+
+        `immediate=True` získá zámek pro zápis hned na začátku (read-modify-write).
+        """
+        with self.connection() as conn:
+            if immediate:
+                conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def execute(self, sql, params=()):
+        """Provede jeden zapisovací příkaz v transakci a vrátí počet změněných řádků"""
+        with self.transaction() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def executemany(self, sql, rows):
+        with self.transaction() as conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def fetchone(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def fetchall(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def close(self):
+        """Uzavře nečinná spojení"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+def ensure_indexes(conn):
+    """Vytvoří spravované indexy a odstraní zastaralé (s prefixem idx_)
+
+    Index se vytvoří jen tehdy, když tabulka existuje a má všechny sloupce
+    (schéma vytváří více modulů), takže volání je bezpečné kdykoli.
+    """
+    columns = {}
+    for name, table, index_columns in INDEXES:
+        if table not in columns:
+            columns[table] = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if set(index_columns) <= columns[table]:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({", ".join(index_columns)})')
+
+    managed = {name for name, _, _ in INDEXES}
+    existing = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx\\_%' ESCAPE '\\'"
+    ).fetchall()
+    for (name,) in existing:
+        if name not in managed:
+            conn.execute(f'DROP INDEX IF EXISTS {name}')
+
+    # Statistiky pro plánovač (analyzuje jen tabulky, kde je to potřeba)
+    conn.execute('PRAGMA optimize')
+
+
+def to_epoch_ms(value):
+    """Převede datetime (naivní = místní čas), ISO řetězec nebo číslo na epoch ms"""
+    if value is None:
+        return None
+    if isinstance(value, numbers.Real):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif hasattr(value, 'to_pydatetime'):
+        # pandas.Timestamp bere naivní čas jako UTC, datetime jako místní
+        value = value.to_pydatetime()
+    return int(value.timestamp() * 1000)
+
+
+def ms_ago(days=0, hours=0):
+    """Epoch ms okamžiku před zadanou dobou (pro filtry `timestamp >= ?`)"""
+    return to_epoch_ms(datetime.now() - timedelta(days=days, hours=hours))
+
+
+def day_start_ms(days=0):
+    """Epoch ms začátku dne UTC před `days` dny (0 = dnešek) - stejné dny jako trade_rollups"""
+    return day_bucket(int(time.time() * 1000)) - days * DAY_MS
+
+
+def _local_timezone():
+    """Místní časová zóna jako ZoneInfo (TZ nebo /etc/localtime), jinak pevný posun"""
+    global _LOCAL_TZ
+    if _LOCAL_TZ is None:
+        from zoneinfo import ZoneInfo
+
+        name = os.environ.get('TZ', '').lstrip(':')
+        if not name and os.path.islink('/etc/localtime'):
+            target = os.path.realpath('/etc/localtime')
+            if '/zoneinfo/' in target:
+                name = target.split('/zoneinfo/', 1)[1]
+        try:
+            _LOCAL_TZ = ZoneInfo(name)
+        except Exception:
+            _LOCAL_TZ = datetime.now().astimezone().tzinfo
+    return _LOCAL_TZ
+
+
+def to_datetime(values):
+    """Vektorový převod sloupce epoch ms na naivní místní čas (pandas)"""
+    import pandas as pd
+
+    times = pd.to_datetime(values, unit='ms', utc=True)
+    if isinstance(times, pd.Series):
+        return times.dt.tz_convert(_local_timezone()).dt.tz_localize(None)
+    return times.tz_convert(_local_timezone()).tz_localize(None)
+
+
+def day_bucket(ms):
+    """Začátek dne UTC (klíč `day` v trade_rollups) pro epoch ms"""
+    return ms - ms % DAY_MS
+
+
+def migrate(conn):
+    """Převede schéma na aktuální verzi (PRAGMA user_version) a obnoví indexy
+
+    Volá se při každé inicializaci databáze; migrace, které už proběhly,
+    se přeskočí.
+    """
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version < 1:
+        _migrate_epoch_ms(conn)
+    _create_rollups(conn)
+    if version < 2:
+        rebuild_rollups(conn)
+    if version < SCHEMA_VERSION:
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    _create_iso_views(conn)
+    ensure_indexes(conn)
+
+
+def _migrate_epoch_ms(conn):
+    """Verze 1: časové sloupce jako INTEGER epoch ms místo textu ISO
+
+    Tabulka s jiným deklarovaným typem se přestaví (nový CREATE TABLE
+    s typem INTEGER a převodem dat), jinak se převedou jen textové hodnoty.
+    """
+    for table, time_columns in TIME_COLUMNS.items():
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        if row is None:
+            continue
+
+        info = conn.execute(f'PRAGMA table_info({table})').fetchall()
+        declared = {col[1]: col[2].upper() for col in info}
+        targets = [col for col in time_columns if col in declared]
+        if not targets:
+            continue
+
+        def convert(col):
+            return (f"CASE WHEN typeof({col}) = 'text' THEN COALESCE({_ISO_TO_MS.format(col)}, 0) "
+                    f"WHEN typeof({col}) = 'real' THEN CAST({col} AS INTEGER) ELSE {col} END")
+
+        if all(declared[col] == 'INTEGER' for col in targets):
+            for col in targets:
+                conn.execute(f"UPDATE {table} SET {col} = {convert(col)} WHERE typeof({col}) IN ('text', 'real')")
+            continue
+
+        create_sql = row[0]
+        for col in targets:
+            create_sql = re.sub(rf'(\b{col}\s+)[A-Za-z]+', r'\g<1>INTEGER', create_sql, count=1)
+        create_sql = re.sub(rf'^CREATE TABLE\s+(IF NOT EXISTS\s+)?["`]?{table}["`]?',
+                            f'CREATE TABLE {table}_migrated', create_sql, count=1, flags=re.IGNORECASE)
+
+        columns = [col[1] for col in info]
+        select = ', '.join(convert(col) if col in targets else col for col in columns)
+        conn.execute(f'DROP TABLE IF EXISTS {table}_migrated')
+        conn.execute(create_sql)
+        conn.execute(f"INSERT INTO {table}_migrated ({', '.join(columns)}) SELECT {select} FROM {table}")
+        conn.execute(f'DROP TABLE {table}')
+        conn.execute(f'ALTER TABLE {table}_migrated RENAME TO {table}')
+
+
+def _rollup_upsert(row, sign, condition):
+    """Příkaz triggeru, který přičte (sign=1) nebo odečte (sign=-1) obchod `row`"""
+    key = ', '.join(expr.format(row) for expr in _ROLLUP_KEY)
+    values = ', '.join(f"{sign} * {expr.format(row)}" for expr in _ROLLUP_VALUES)
+    updates = ', '.join(f"{col} = {col} + excluded.{col}" for col in _ROLLUP_COLUMNS)
+    return (
+        f"INSERT INTO trade_rollups (day, symbol, market_type, {', '.join(_ROLLUP_COLUMNS)}) "
+        f"SELECT {key}, {values} WHERE {condition} "
+        f"ON CONFLICT (day, symbol, market_type) DO UPDATE SET {updates};"
+    )
+
+
+def _rollup_cleanup(row):
+    """Odstraní souhrn, ve kterém po odečtení obchodu nic nezbylo"""
+    key = ' AND '.join(
+        f"{col} = {expr.format(row)}" for col, expr in zip(('day', 'symbol', 'market_type'), _ROLLUP_KEY)
+    )
+    return f"DELETE FROM trade_rollups WHERE {key} AND trades <= 0;"
+
+
+def _create_rollups(conn):
+    """Tabulka trade_rollups a triggery, které ji drží v souladu s trades"""
+    conn.execute(_ROLLUP_TABLE)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trades'").fetchone() is None:
+        return
+
+    closed_new = "NEW.status = 'CLOSED'"
+    closed_old = "OLD.status = 'CLOSED'"
+    watched = 'timestamp, symbol, market_type, status, profit, amount, entry_price'
+    triggers = {
+        'trades_rollup_insert': f"AFTER INSERT ON trades WHEN {closed_new} BEGIN "
+                                f"{_rollup_upsert('NEW', 1, closed_new)} END",
+        'trades_rollup_delete': f"AFTER DELETE ON trades WHEN {closed_old} BEGIN "
+                                f"{_rollup_upsert('OLD', -1, closed_old)} {_rollup_cleanup('OLD')} END",
+        'trades_rollup_update': f"AFTER UPDATE OF {watched} ON trades BEGIN "
+                                f"{_rollup_upsert('OLD', -1, closed_old)} {_rollup_cleanup('OLD')} "
+                                f"{_rollup_upsert('NEW', 1, closed_new)} END",
+    }
+    for name, body in triggers.items():
+        conn.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+
+
+def rebuild_rollups(conn):
+    """Přepočítá trade_rollups z celé tabulky trades (verze 2 a ruční oprava)"""
+    conn.execute('DELETE FROM trade_rollups')
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trades'").fetchone() is None:
+        return
+    key = ', '.join(expr.format('trades') for expr in _ROLLUP_KEY)
+    sums = ', '.join(f"SUM({expr.format('trades')})" for expr in _ROLLUP_VALUES)
+    conn.execute(
+        f"INSERT INTO trade_rollups (day, symbol, market_type, {', '.join(_ROLLUP_COLUMNS)}) "
+        f"SELECT {key}, {sums} FROM trades WHERE status = 'CLOSED' GROUP BY 1, 2, 3"
+    )
+
+
+def _create_iso_views(conn):
+    """Pohledy <tabulka>_iso s časem jako text ISO (místní čas) pro starší nástroje"""
+    for table, time_columns in TIME_COLUMNS.items():
+        columns = [col[1] for col in conn.execute(f'PRAGMA table_info({table})')]
+        current = [col[1] for col in conn.execute(f'PRAGMA table_info({table}_iso)')]
+        if columns == current:
+            continue
+        conn.execute(f'DROP VIEW IF EXISTS {table}_iso')
+        if not columns:
+            continue
+        select = ', '.join(
+            f"strftime('%Y-%m-%dT%H:%M:%f', {col} / 1000.0, 'unixepoch', 'localtime') AS {col}"
+            if col in time_columns else col
+            for col in columns
+        )
+        conn.execute(f'CREATE VIEW {table}_iso AS SELECT {select} FROM {table}')
+
+
+def get_pool(path=DB_PATH, **kwargs):
+    """Sdílený pool pro danou databázi (vytváří se při prvním použití)"""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(path)
+        if pool is None:
+            pool = ConnectionPool(path, **kwargs)
+            _POOLS[path] = pool
+        return pool
+
+
+def connection(path=DB_PATH):
+    """Zkratka pro `get_pool(path).connection()`"""
+    return get_pool(path).connection()
+
+
+def transaction(path=DB_PATH, immediate=False):
+    """Zkratka pro `get_pool(path).transaction()`"""
+    return get_pool(path).transaction(immediate)
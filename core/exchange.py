@@ -2,24 +2,29 @@
 import time
 import ccxt
 import logging
-import sqlite3
+import threading
 import pandas as pd
 from datetime import datetime
 from decouple import config as env_config
+from core.candle_store import CandleStore
+from core.candle_mmap import CandleMmapStore
+from core.resampler import TimeframePyramid, DERIVED_TIMEFRAMES
+from core.ring_buffer import CandleRingBuffer
+from core.timeframes import timeframe_to_ms
+from core.ticker_cache import TickerCache
+from core.client_pool import ExchangeClientPool, rate_limit_bucket
+from core.streaming import MarketDataStream, SPOT_STREAM_URL, FUTURES_STREAM_URL
+from core.order_book import LocalOrderBook, OrderBookManager
+from core.rate_limiter import WeightedRateLimiter
+from core.market_cache import MarketCache
+from core.database import get_pool, migrate, to_datetime
+from core import queries
+from core.async_exchange import AsyncBinanceConnector, SyncAsyncFacade
+from core.data_aggregator import DataAggregator, default_sources
 
-logger = logging.getLogger(__name__)
+# Logování konfigurují vstupní body (bot, dashboard), ne import modulu
 logger = logging.getLogger('dashboard')
 
-# Konfigurace loggeru
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/dashboard.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
-
 
 class BinanceConnector:
     def __init__(self, yaml_config):
@@ -27,87 +32,440 @@ class BinanceConnector:
         self.mode = yaml_config.get('mode', 'dry')
         self.base_currency = yaml_config.get('base_currency', 'BNB')
         self.market_type = yaml_config.get('market_type', 'spot')
+        api_settings = yaml_config.get('api_settings', {})
         
         try:
-            self.client = ccxt.binance({
+            # Samostatný klient pro každý typ trhu místo přepínání defaultType
+            self.client_config = {
                 'apiKey': env_config('BINANCE_API_KEY', default=''),
                 'secret': env_config('BINANCE_API_SECRET', default=''),
                 'enableRateLimit': True,
-                'options': {'defaultType': self.market_type},
                 'timeout': 30000
-            })
+            }
+            # Limit vah sdílený s ostatními procesy (bot, dashboard)
+            self.rate_limiter = WeightedRateLimiter(
+                db_path=api_settings.get('rate_limit_db', 'data/rate_limit.db'),
+                weight_limits=api_settings.get('weight_limits'),
+                order_reserve=api_settings.get('order_weight_reserve', 0.2),
+                max_wait=api_settings.get('rate_limit_wait', 10)
+            )
+            # Metadata trhů z lokální cache - rychlý start bez load_markets
+            self.market_cache = MarketCache(
+                api_settings.get('market_cache_path', 'data/markets'),
+                ttl=api_settings.get('market_cache_ttl', 86400)
+            )
+            self.clients = ExchangeClientPool(
+                self.client_config, sandbox=self.mode == 'dry',
+                rate_limiter=self.rate_limiter, market_cache=self.market_cache
+            )
+            self._async_client = None
             
             if self.mode == 'dry':
-                self.client.set_sandbox_mode(True)
                 self.virtual_balance = 10000.0
                 
             self._init_database()
+            self.candle_archive = CandleMmapStore(
+                yaml_config.get('history', {}).get('mmap_path', 'data/candles')
+            )
+            self.candle_store = CandleStore(mmap_store=self.candle_archive)
+            self._pyramids = {}
+            # Nejvyšší nasazený počet základních svíček: (symbol, timeframe, market_type) -> počet
+            self._seeded = {}
+            self._seeding = set()
+            self._seed_lock = threading.Lock()
+            self._windows = {}
+            self.ticker_cache = TickerCache(ttl=api_settings.get('ticker_ttl', 5))
+            self._symbol_cache = {}
+            self.streams = {}
+            self.order_books = {}
+            self.price_aggregators = self._init_price_indices(yaml_config.get('price_index', {}))
             
         except Exception as e:
             logger.error(f"Chyba při inicializaci: {str(e)}")
             raise
 
+    @property
+    def client(self):
+        """Klient výchozího typu trhu (zpětná kompatibilita)"""
+        return self.clients.get(self.market_type, load_markets=False)
+
+    @property
+    def async_client(self):
+        """Synchronní fasáda nad asynchronním konektorem (vytváří se až při prvním použití)"""
+        if self._async_client is None:
+            self._async_client = SyncAsyncFacade(AsyncBinanceConnector(
+                self.client_config,
+                sandbox=self.mode == 'dry',
+                max_concurrency=self.yaml_config.get('api_settings', {}).get('max_concurrency', 8),
+                rate_limiter=self.rate_limiter,
+                market_cache=self.market_cache
+            ))
+        return self._async_client
+
+    def _init_price_indices(self, settings):
+        """Spustí na pozadí složené cenové indexy napříč burzami, zvlášť pro každý typ trhu (je-li zapnut)"""
+        if not settings.get('enabled', False):
+            return {}
+        aggregators = {}
+        for market_type in settings.get('market_types') or [self.market_type]:
+            # Binance přes sdílený pool klientů a limit vah
+            sources = default_sources(settings.get('sources'), self.clients, market_type)
+            if not sources:
+                logger.warning(f"Cenový index {market_type} nemá žádný zdroj")
+                continue
+            aggregator = DataAggregator(
+                sources,
+                timeframe=settings.get('timeframe', '1m'),
+                timeout=settings.get('timeout', 3),
+                limit=settings.get('limit', 5),
+                index_method=settings.get('method', 'median'),
+                max_deviation=settings.get('max_deviation', 5.0),
+                max_age=settings.get('max_age', 120),
+                stream_source='binance' if 'binance' in sources else None
+            )
+            aggregator.start([self.base_currency], interval=settings.get('interval', 10))
+            aggregators[market_type] = aggregator
+        return aggregators
+
+    def reference_price(self, symbol=None, market_type=None):
+        """Referenční cena ze složeného indexu daného typu trhu; bez indexu poslední cena burzy"""
+        symbol = symbol or f"{self.base_currency}/USDT"
+        aggregator = self.price_aggregators.get(market_type or self.market_type)
+        if aggregator is not None:
+            base, _, quote = symbol.partition('/')
+            price = aggregator.price(base) if quote == 'USDT' else None
+            if price:
+                return price
+        return self.get_current_price(symbol, market_type)
+
+    def close(self):
+        """Uzavře asynchronní spojení, streamy a cenový index"""
+        for aggregator in self.price_aggregators.values():
+            aggregator.close()
+        for stream in self.streams.values():
+            stream.stop()
+        self.streams.clear()
+        if self._async_client is not None:
+            self._async_client.close()
+            self._async_client = None
+
+    def start_stream(self, symbols, timeframes, market_type=None, depth=False):
+        """Spustí WebSocket stream svíček a tickerů (volitelně i hloubky trhu) pro zadané páry"""
+        market_type = market_type or self.market_type
+        settings = self.yaml_config.get('streaming', {})
+        
+        stream = self.streams.get(market_type)
+        if stream is None:
+            if rate_limit_bucket(market_type) == 'future':
+                url = settings.get('futures_url', FUTURES_STREAM_URL)
+            else:
+                url = settings.get('url', SPOT_STREAM_URL)
+            stream = MarketDataStream(
+                self.candle_store, self.ticker_cache,
+                url=url,
+                market_type=market_type,
+                record_path=settings.get('record_path')
+            )
+            aggregator = self.price_aggregators.get(market_type)
+            if aggregator is not None and aggregator.stream_source is not None:
+                stream.add_listener(aggregator.on_event)
+            self.streams[market_type] = stream
+        
+        for symbol in symbols:
+            stream.subscribe(symbol, timeframes, depth=depth)
+        return stream.start()
+
+    def track_order_book(self, symbol, market_type=None):
+        """Začne lokálně udržovat knihu příkazů symbolu ze snapshotu a diff streamu"""
+        market_type = market_type or self.market_type
+        manager = self.order_books.get(market_type)
+        if manager is None:
+            manager = OrderBookManager(
+                lambda s: self._fetch_order_book(s, market_type, 1000), market_type
+            )
+            self.order_books[market_type] = manager
+            self.start_stream([], [], market_type).add_listener(manager.on_event)
+        self.start_stream([symbol], [], market_type, depth=True)
+        return manager.track(symbol)
+
+    def get_order_book(self, symbol=None, market_type=None):
+        """Lokální kniha příkazů; bez streamu se sestaví z jednorázového REST snapshotu"""
+        market_type = market_type or self.market_type
+        symbol = symbol or f"{self.base_currency}/USDT"
+        manager = self.order_books.get(market_type)
+        book = manager.get(symbol) if manager is not None else None
+        if book is not None:
+            return book
+        
+        try:
+            book = LocalOrderBook(symbol)
+            book.apply_snapshot(self._fetch_order_book(
+                symbol, market_type,
+                self.yaml_config.get('risk_management', {}).get('order_book_depth', 100)
+            ))
+            return book
+        except Exception as e:
+            logger.error(f"Chyba při získávání knihy příkazů {symbol}: {str(e)}")
+            return None
+
+    def _fetch_order_book(self, symbol, market_type, limit):
+        """Stáhne snapshot knihy příkazů z burzy"""
+        return self.clients.call(market_type, 'fetch_order_book', symbol, limit)
+
+    def _liquidity_capped_amount(self, symbol, side, amount, market_type):
+        """Omezí množství tržního příkazu na likviditu v rámci max_slippage_bps"""
+        max_slippage_bps = self.yaml_config.get('risk_management', {}).get('max_slippage_bps')
+        book = self.get_order_book(symbol, market_type) if max_slippage_bps else None
+        if book is None:
+            return amount
+        
+        available = book.max_amount(side, max_slippage_bps)
+        if amount > available:
+            logger.warning(
+                f"Množství {amount} {symbol} překračuje likviditu do {max_slippage_bps} bps, "
+                f"omezeno na {available}"
+            )
+            return available
+        return amount
+
     def _init_database(self):
         """Inicializuje databázové schéma s podporou market_type"""
-        conn = sqlite3.connect('data/trading_history.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS trades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME NOT NULL,
-            symbol TEXT NOT NULL,
-            side TEXT NOT NULL,
-            amount REAL NOT NULL,
-            entry_price REAL NOT NULL,
-            exit_price REAL,
-            profit REAL,
-            status TEXT NOT NULL,
-            market_type TEXT NOT NULL DEFAULT 'spot'
-        )''')
+        with get_pool().transaction() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS equity (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME NOT NULL,
-            equity_value REAL NOT NULL,
-            market_type TEXT NOT NULL DEFAULT 'spot'
-        )''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                side TEXT NOT NULL,
+                amount REAL NOT NULL,
+                entry_price REAL NOT NULL,
+                exit_price REAL,
+                profit REAL,
+                status TEXT NOT NULL,
+                market_type TEXT NOT NULL DEFAULT 'spot'
+            )''')
         
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS active_positions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            symbol TEXT NOT NULL,
-            direction TEXT NOT NULL,
-            amount REAL NOT NULL,
-            entry_price REAL NOT NULL,
-            stop_loss REAL,
-            take_profit REAL,
-            timestamp DATETIME NOT NULL,
-            market_type TEXT NOT NULL DEFAULT 'spot'
-        )''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS equity (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                equity_value REAL NOT NULL,
+                market_type TEXT NOT NULL DEFAULT 'spot'
+            )''')
         
-        conn.commit()
-        conn.close()
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS active_positions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                amount REAL NOT NULL,
+                entry_price REAL NOT NULL,
+                stop_loss REAL,
+                take_profit REAL,
+                timestamp INTEGER NOT NULL,
+                market_type TEXT NOT NULL DEFAULT 'spot'
+            )''')
+            
+            migrate(conn)
     
     def get_market_pairs(self):
         """Získání dostupných obchodních párů"""
         try:
             return ['BNB/USDT', 'BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'XRP/USDT', 'ADA/USDT', 'DOGE/USDT']
         except Exception as e:
-            self.logger.error(f"Chyba: {str(e)}")
+            logger.error(f"Chyba: {str(e)}")
             return []
 
     def get_real_time_data(self, symbol, timeframe='15m', limit=100, market_type=None):
-        """Získá OHLCV data s retry mechanismem"""
+        """Získá OHLCV data z lokálního úložiště, z burzy dotahuje jen nové svíčky"""
+        market_type = market_type or self.market_type
+        stream = self._stream_for([symbol], timeframe, market_type)
+        if stream is not None and stream.is_live(symbol, timeframe):
+            # Stream drží svíčky aktuální - bez dotazu na burzu
+            return self.candle_store.get_window(symbol, timeframe, market_type, limit)
+        
+        try:
+            window = self.candle_store.sync(
+                symbol, timeframe, market_type,
+                lambda since, page_limit: self._fetch_ohlcv(symbol, timeframe, since, page_limit, market_type),
+                limit=limit
+            )
+            if stream is not None:
+                stream.mark_backfilled(symbol, timeframe)
+            return window
+        except Exception as e:
+            logger.error(f"Chyba při synchronizaci svíček {symbol} {timeframe}: {str(e)}")
+            return self.candle_store.get_window(symbol, timeframe, market_type, limit)
+
+    def get_candle_array(self, symbol, timeframe='15m', limit=100, market_type=None, sync=True):
+        """Posledních `limit` svíček jako strukturované pole (konzistentní kopie z memmap souboru)"""
+        market_type = market_type or self.market_type
+        if sync:
+            self.get_real_time_data(symbol, timeframe, limit, market_type)
+        return self.candle_archive.latest(symbol, timeframe, market_type, limit, copy=True)
+
+    def get_timeframe(self, symbol, timeframe='15m', limit=100, market_type=None, sync=True):
+        """Svíčky timeframu odvozené lokálně ze základní 1m řady (bez REST dotazu na daný timeframe)
+
+        Vrací kopii - pohledy pyramidy přepisují jiná vlákna. Chybějící starší
+        základní svíčky se dotahují na pozadí; do té doby je okno kratší.
+        """
+        market_type = market_type or self.market_type
+        settings = self.yaml_config.get('resampling', {})
+        pyramid = self._pyramid(symbol, market_type) if settings.get('enabled', True) else None
+        if pyramid is None or not pyramid.supports(timeframe):
+            return self.get_candle_array(symbol, timeframe, limit, market_type, sync)
+        
+        base = pyramid.base_timeframe
+        if sync:
+            # Stačí dotáhnout nové základní svíčky (se streamem bez REST)
+            self.get_real_time_data(symbol, base, 2, market_type)
+        needed = limit * timeframe_to_ms(timeframe) // timeframe_to_ms(base) + 1
+        if pyramid.base_length() < needed:
+            self._seed_base(symbol, base, needed, market_type)
+        return pyramid.get(timeframe, limit, copy=True)
+
+    def live_window(self, symbol, timeframe='15m', limit=200, market_type=None):
+        """Živé okno posledních `limit` svíček v kruhovém bufferu
+        
+        Dokud buffer není plný, čte se celé okno a při delší historii (např.
+        po dotažení základních svíček na pozadí) se buffer naplní znovu. Plný
+        buffer zapisuje jen nové nebo přepsané poslední svíčky - ustálený
+        tick nealokuje nová pole.
+        """
+        market_type = market_type or self.market_type
+        key = (symbol, timeframe, market_type)
+        window = self._windows.get(key)
+        if window is None or window.capacity != limit:
+            window = CandleRingBuffer(limit)
+            self._windows[key] = window
+        
+        if len(window) < window.capacity:
+            candles = self.get_timeframe(symbol, timeframe, limit, market_type)
+            if len(candles) > len(window):
+                # extend neumí doplnit starší svíčky - buffer se plní od začátku
+                window.clear()
+        else:
+            candles = self.get_timeframe(symbol, timeframe, 2, market_type)
+        window.extend(candles)
+        return window
+
+    def _pyramid(self, symbol, market_type):
+        """Pyramida timeframů pro symbol (vytváří se při prvním použití)"""
+        key = (symbol, market_type)
+        if key not in self._pyramids:
+            settings = self.yaml_config.get('resampling', {})
+            base = settings.get('base_timeframe', '1m')
+            self._pyramids[key] = TimeframePyramid(
+                self.candle_archive.file(symbol, base, market_type),
+                base_timeframe=base,
+                timeframes=settings.get('timeframes', DERIVED_TIMEFRAMES)
+            )
+        return self._pyramids[key]
+
+    def _seed_base(self, symbol, timeframe, needed, market_type):
+        """Spustí na pozadí dotažení starších základních svíček potřebných pro vyšší timeframy
+
+        Pro každý klíč se pamatuje nejvyšší dosud požadovaný počet svíček,
+        takže se znovu stahuje jen při požadavku na delší historii.
+        """
+        key = (symbol, timeframe, market_type)
+        with self._seed_lock:
+            if self._seeded.get(key, 0) >= needed or key in self._seeding:
+                return
+            self._seeding.add(key)
+        threading.Thread(
+            target=self._load_base, args=(key, needed), name=f'seed-{symbol}-{timeframe}', daemon=True
+        ).start()
+
+    def _load_base(self, key, needed):
+        """Stránkované stažení základních svíček starších než začátek memmap souboru"""
+        symbol, timeframe, market_type = key
+        try:
+            step = timeframe_to_ms(timeframe)
+            now_ms = int(time.time() * 1000)
+            since = now_ms - now_ms % step - needed * step
+            candle_file = self.candle_archive.file(symbol, timeframe, market_type)
+            stored = candle_file.view()
+            until = int(stored['timestamp'][0]) if len(stored) else now_ms
+            candles = []
+            while since < until:
+                batch = self._fetch_ohlcv(symbol, timeframe, since, 1000, market_type)
+                if not batch:
+                    break
+                candles.extend(batch)
+                if batch[-1][0] + step <= since:
+                    break
+                since = batch[-1][0] + step
+            candle_file.insert(candles)
+        except Exception as e:
+            logger.error(f"Chyba při dotahování historie {symbol} {timeframe}: {str(e)}")
+        finally:
+            with self._seed_lock:
+                # I neúspěšný pokus se zapamatuje - bez opakovaného stahování při každém volání
+                self._seeded[key] = max(self._seeded.get(key, 0), needed)
+                self._seeding.discard(key)
+
+    def get_real_time_data_many(self, symbols, timeframe='15m', limit=100, market_type=None):
+        """Získá OHLCV data pro více symbolů souběžně (latence max(RTT) místo sum(RTT))"""
+        market_type = market_type or self.market_type
+        stream = self._stream_for(symbols, timeframe, market_type)
+        windows = {}
+        if stream is not None:
+            for symbol in symbols:
+                if stream.is_live(symbol, timeframe):
+                    windows[symbol] = self.candle_store.get_window(symbol, timeframe, market_type, limit)
+        
+        requests = {
+            symbol: self.candle_store.plan(symbol, timeframe, market_type, limit)
+            for symbol in symbols if symbol not in windows
+        }
+        if not requests:
+            return windows
+        
+        try:
+            fetched = self.async_client.fetch_ohlcv_many(requests, timeframe, market_type)
+        except Exception as e:
+            logger.error(f"Chyba při souběžném získávání svíček: {str(e)}")
+            fetched = {}
+        
+        for symbol in requests:
+            batch = fetched.get(symbol, [])
+            self.candle_store.merge(symbol, timeframe, market_type, batch)
+            since, page_limit = requests[symbol]
+            if since is not None and len(batch) >= page_limit:
+                # Dlouhý výpadek - zbytek historie se dotáhne stránkováním
+                windows[symbol] = self.get_real_time_data(symbol, timeframe, limit, market_type)
+            else:
+                windows[symbol] = self.candle_store.get_window(symbol, timeframe, market_type, limit)
+                if stream is not None:
+                    stream.mark_backfilled(symbol, timeframe)
+        return windows
+
+    def _stream_for(self, symbols, timeframe, market_type):
+        """Vrátí stream pro daný trh (při zapnutém streamování přihlásí odběr páru)"""
+        if not self.yaml_config.get('streaming', {}).get('enabled', False):
+            return self.streams.get(market_type)
+        try:
+            return self.start_stream(symbols, [timeframe], market_type)
+        except Exception as e:
+            logger.error(f"Chyba při spuštění streamu: {str(e)}")
+            return None
+
+    def _fetch_ohlcv(self, symbol, timeframe, since, limit, market_type):
+        """Stáhne OHLCV data z burzy s retry mechanismem"""
         max_retries = 3
         retry_delay = 2
         
         for attempt in range(max_retries):
             try:
-                # Původní kód volání API
-                data = self.client.fetch_ohlcv(symbol, timeframe, limit=limit)
-                return data
+                return self.clients.call(market_type, 'fetch_ohlcv', symbol, timeframe, since=since, limit=limit)
+            except (ccxt.DDoSProtection, TimeoutError) as e:
+                # Vyčerpaný limit se neřeší čekáním - vrátí se uložená data
+                logger.warning(f"Limit požadavků vyčerpán, použijí se uložené svíčky: {str(e)}")
+                return []
             except Exception as e:
                 logger.warning(f"Pokus {attempt+1}/{max_retries} selhal: {str(e)}")
                 if attempt < max_retries - 1:
@@ -134,70 +492,146 @@ class BinanceConnector:
     
     def get_portfolio_value(self, market_type=None):
         """Získá hodnotu portfolia pro daný trh"""
-        original_type = self.client.options['defaultType']
+        if self.mode == 'dry':
+            return self.virtual_balance
+        return self.get_portfolio_breakdown(market_type)['total']
+
+    def get_portfolio_breakdown(self, market_type=None):
+        """Ocení všechny zůstatky jedním hromadným dotazem na tickery
+
+        Vrací celkovou hodnotu v USDT, rozpad podle aktiv a jedinou časovou
+        značku ocenění. Aktiva bez páru vůči USDT se oceňují přes BTC nebo BNB.
+        """
+        market_type = market_type or self.market_type
+        breakdown = {'total': 0, 'assets': {}, 'timestamp': int(time.time() * 1000)}
+        
         try:
-            market_type = market_type or self.market_type
-            
             if self.mode == 'dry':
-                return self.virtual_balance
-                
-            self.client.options['defaultType'] = market_type
+                breakdown['total'] = self.virtual_balance
+                breakdown['assets']['USDT'] = {
+                    'amount': self.virtual_balance, 'price': 1.0,
+                    'value': self.virtual_balance, 'route': []
+                }
+                return breakdown
+            
+            balance = self.clients.call(market_type, 'fetch_balance')
+            
+            holdings = {
+                currency: amount for currency, amount in balance['total'].items()
+                if amount and amount > 0
+            }
             
-            balance = self.client.fetch_balance()
-            total = balance['total'].get('USDT', 0)
+            # Určení cesty ocenění pro každé aktivum
+            symbols = self._market_symbols(market_type)
+            routes = {}
+            for currency in holdings:
+                if currency == 'USDT':
+                    continue
+                route = self._valuation_route(currency, symbols)
+                if route:
+                    routes[currency] = route
+                else:
+                    logger.warning(f"Chybí cesta pro ocenění {currency}")
+            
+            # Jediný hromadný dotaz na všechny potřebné kurzy
+            needed = sorted({symbol for route in routes.values() for symbol in route})
+            tickers = self.refresh_tickers(needed, market_type) if needed else {}
+            
+            for currency, amount in holdings.items():
+                route = routes.get(currency, [])
+                price = 1.0 if currency == 'USDT' else None
+                if route and all(tickers.get(symbol, {}).get('last') for symbol in route):
+                    price = 1.0
+                    for symbol in route:
+                        price *= tickers[symbol]['last']
+                
+                if price is None:
+                    continue
+                
+                breakdown['assets'][currency] = {
+                    'amount': amount,
+                    'price': price,
+                    'value': amount * price,
+                    'route': route
+                }
+                breakdown['total'] += amount * price
             
-            for currency, amount in balance['total'].items():
-                if currency != 'USDT' and amount > 0:
-                    try:
-                        ticker = self.client.fetch_ticker(f"{currency}/USDT")
-                        total += amount * ticker['last']
-                    except Exception as e:
-                        logger.warning(f"Chyba při hodnotění {currency}: {str(e)}")
-                        continue
-                        
-            return total
+            return breakdown
             
         except Exception as e:
             logger.error(f"Chyba při získávání portfolia: {str(e)}")
-            return 0
-        finally:
-            self.client.options['defaultType'] = original_type
+            return breakdown
+
+    def _market_symbols(self, market_type):
+        """Vrátí (a uloží) množinu obchodovatelných symbolů daného trhu"""
+        if market_type not in self._symbol_cache:
+            self._symbol_cache[market_type] = set(self.clients.get(market_type).markets)
+        return self._symbol_cache[market_type]
+
+    def _valuation_route(self, currency, symbols):
+        """Najde páry, přes které lze aktivum ocenit v USDT"""
+        if f"{currency}/USDT" in symbols:
+            return [f"{currency}/USDT"]
+        for bridge in ('BTC', 'BNB'):
+            if f"{currency}/{bridge}" in symbols and f"{bridge}/USDT" in symbols:
+                return [f"{currency}/{bridge}", f"{bridge}/USDT"]
+        return []
 
     def get_24h_change(self, symbol=None, market_type=None):
         """Získá 24h procentuální změnu ceny"""
-        original_type = self.client.options['defaultType']
         try:
-            market_type = market_type or self.market_type
-            self.client.options['defaultType'] = market_type
-            
-            symbol = symbol or f"{self.base_currency}/USDT"
-            return self.client.fetch_ticker(symbol)['percentage']
-            
+            return self.get_ticker(symbol, market_type)['percentage']
         except Exception as e:
             logger.error(f"Chyba při získávání změny: {str(e)}")
             return 0
-        finally:
-            self.client.options['defaultType'] = original_type
+
+    def get_ticker(self, symbol=None, market_type=None):
+        """Získá ticker ze sdílené cache, při vypršení TTL jej stáhne z burzy"""
+        market_type = market_type or self.market_type
+        symbol = symbol or f"{self.base_currency}/USDT"
+        return self.ticker_cache.get(
+            symbol, market_type,
+            lambda s: self._fetch_ticker(s, market_type)
+        )
+
+    def refresh_tickers(self, symbols, market_type=None):
+        """Hromadně obnoví tickery všech párů jedním voláním fetch_tickers"""
+        market_type = market_type or self.market_type
+        try:
+            return self.ticker_cache.refresh(
+                symbols, market_type,
+                lambda missing: self._fetch_tickers(missing, market_type)
+            )
+        except Exception as e:
+            logger.error(f"Chyba při hromadném získávání tickerů: {str(e)}")
+            return {}
+
+    def _fetch_ticker(self, symbol, market_type):
+        """Stáhne jeden ticker z burzy"""
+        return self.clients.call(market_type, 'fetch_ticker', symbol)
+
+    def _fetch_tickers(self, symbols, market_type):
+        """Stáhne tickery více párů jedním dotazem"""
+        tickers = self.clients.call(market_type, 'fetch_tickers', symbols)
+        if rate_limit_bucket(market_type) != 'future':
+            return tickers
+        # Futures klient vrací klíče s měnou vypořádání ('BTC/USDT:USDT'),
+        # cache a volající pracují s 'BTC/USDT'
+        return {symbol.split(':')[0]: ticker for symbol, ticker in (tickers or {}).items()}
 
     def get_active_positions(self, market_type=None):
         """Získá aktivní pozice pro daný trh"""
         try:
-            conn = sqlite3.connect('data/trading_history.db')
-            query = "SELECT * FROM active_positions"
-            params = []
-            
-            if market_type:
-                query += " WHERE market_type = ?"
-                params.append(market_type)
-                
-            df = pd.read_sql(query, conn, params=params)
-            conn.close()
+            query, params = queries.active_positions_query(market_type)
+            with get_pool().connection() as conn:
+                df = pd.read_sql(query, conn, params=params)
             
             if not df.empty:
                 return []
+            df['timestamp'] = to_datetime(df['timestamp'])
                 
             for i, row in df.iterrows():
-                current_price = self.get_current_price(row['symbol'], row['market_type'])
+                current_price = self.reference_price(row['symbol'], row['market_type'])
                 df.at[i, 'current_price'] = current_price
                 df.at[i, 'pnl'] = self._calculate_pnl(row, current_price)
                 
@@ -209,15 +643,20 @@ class BinanceConnector:
 
     def execute_trade(self, symbol, side, amount, order_type='market', price=None, market_type=None):
         """Provede obchod na daném trhu"""
-        original_type = self.client.options['defaultType']
         try:
             market_type = market_type or self.market_type
-            self.client.options['defaultType'] = market_type
             
             if self.mode == 'dry':
                 return self._simulate_trade(symbol, side, amount, market_type)
+            
+            if order_type.lower() == 'market':
+                amount = self._liquidity_capped_amount(symbol, side, amount, market_type)
+                if amount <= 0:
+                    logger.error(f"Nedostatečná likvidita pro tržní příkaz {symbol}")
+                    return None
                 
-            order = self.client.create_order(
+            order = self.clients.call(
+                market_type, 'create_order',
                 symbol=symbol,
                 type=order_type,
                 side=side,
@@ -231,32 +670,27 @@ class BinanceConnector:
         except Exception as e:
             logger.error(f"Chyba při provádění obchodu: {str(e)}")
             return None
-        finally:
-            self.client.options['defaultType'] = original_type
 
     def _simulate_trade(self, symbol, side, amount, market_type):
         """Simuluje obchod v testovacím režimu"""
         try:
             price = self.get_current_price(symbol, market_type)
-            conn = sqlite3.connect('data/trading_history.db')
-            cursor = conn.cursor()
+            with get_pool().transaction() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute('''
-                INSERT INTO trades 
-                (timestamp, symbol, side, amount, entry_price, status, market_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                datetime.now(),
-                symbol,
-                side,
-                amount,
-                price,
-                'SIMULATED',
-                market_type
-            ))
-            
-            conn.commit()
-            conn.close()
+                cursor.execute('''
+                    INSERT INTO trades 
+                    (timestamp, symbol, side, amount, entry_price, status, market_type)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    datetime.now(),
+                    symbol,
+                    side,
+                    amount,
+                    price,
+                    'SIMULATED',
+                    market_type
+                ))
             return {'status': 'simulated', 'price': price}
             
         except Exception as e:
@@ -265,35 +699,19 @@ class BinanceConnector:
     
     def get_current_price(self, symbol=None, market_type=None):
         """Získá aktuální cenu pro daný trh"""
-        original_type = self.client.options['defaultType']
         try:
-            market_type = market_type or self.market_type
-            self.client.options['defaultType'] = market_type
-            
-            symbol = symbol or f"{self.base_currency}/USDT"
-            return self.client.fetch_ticker(symbol)['last']
+            return self.get_ticker(symbol, market_type)['last']
         except Exception as e:
-            self.logger.error(f"Chyba při získávání ceny: {str(e)}")
+            logger.error(f"Chyba při získávání ceny: {str(e)}")
             return 0
-        finally:
-            self.client.options['defaultType'] = original_type
 
     def get_trade_history(self, market_type=None, limit=100):
         """Získá historii obchodů pro daný trh"""
         try:
-            conn = sqlite3.connect('data/trading_history.db')
-            query = "SELECT * FROM trades"
-            params = []
-            
-            if market_type:
-                query += " WHERE market_type = ?"
-                params.append(market_type)
-                
-            query += " ORDER BY timestamp DESC LIMIT ?"
-            params.append(limit)
-            
-            df = pd.read_sql(query, conn, params=params)
-            conn.close()
+            query, params = queries.trade_history_query(market_type, limit)
+            with get_pool().connection() as conn:
+                df = pd.read_sql(query, conn, params=params)
+            df['timestamp'] = to_datetime(df['timestamp'])
             return df.to_dict('records')
             
         except Exception as e:
@@ -302,18 +720,11 @@ class BinanceConnector:
 
     def get_24h_volume(self, symbol=None, market_type=None):
         """Získá 24h objem obchodů"""
-        original_type = self.client.options['defaultType']
         try:
-            market_type = market_type or self.market_type
-            self.client.options['defaultType'] = market_type
-            
-            symbol = symbol or f"{self.base_currency}/USDT"
-            return self.client.fetch_ticker(symbol)['quoteVolume']
+            return self.get_ticker(symbol, market_type)['quoteVolume']
         except Exception as e:
-            self.logger.error(f"Chyba při získávání objemu: {str(e)}")
+            logger.error(f"Chyba při získávání objemu: {str(e)}")
             return 0
-        finally:
-            self.client.options['defaultType'] = original_type
 
     def _calculate_pnl(self, position, current_price):
         """Vypočítá aktuální zisk/ztrátu pro pozici"""
@@ -324,17 +735,21 @@ class BinanceConnector:
     def close_position(self, position_id):
         """Kompletní implementace uzavření pozice"""
         try:
-            conn = sqlite3.connect('data/trading_history.db')
-            cursor = conn.cursor()
-            
-            # Získání dat o pozici
-            cursor.execute("SELECT * FROM active_positions WHERE id = ?", (position_id,))
-            position = cursor.fetchone()
-            
+            # Převzetí pozice: čtení a smazání v jedné zapisovací transakci, takže
+            # souběžné uzavření téže pozice nepošle na burzu druhý příkaz
+            with get_pool().transaction(immediate=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute(queries.POSITION_BY_ID, (position_id,))
+                position = cursor.fetchone()
+                if position:
+                    cursor.execute(queries.DELETE_POSITION, (position_id,))
+                    if cursor.rowcount == 0:
+                        logger.warning(f"Pozice {position_id} byla mezitím uzavřena jinde")
+                        position = None
+
             if not position:
-                conn.close()
                 return {'error': 'Pozice nenalezena'}
-            
+
             # Rozparsování výsledku dotazu
             position_data = {
                 'id': position[0],
@@ -348,116 +763,102 @@ class BinanceConnector:
                 'market_type': position[8]
             }
 
-            # Získání aktuální ceny
-            current_price = self.get_current_price(
-                position_data['symbol'], 
-                position_data['market_type']
-            )
+            try:
+                # Referenční cena ze složeného indexu (bez dalšího dotazu na burzu)
+                current_price = self.reference_price(
+                    position_data['symbol'],
+                    position_data['market_type']
+                )
 
-            # Výpočet P/L
-            if position_data['direction'] == 'LONG':
-                profit = (current_price - position_data['entry_price']) * position_data['amount']
-                close_side = 'SELL'
-            else:
-                profit = (position_data['entry_price'] - current_price) * position_data['amount']
-                close_side = 'BUY'
+                # Výpočet P/L
+                if position_data['direction'] == 'LONG':
+                    profit = (current_price - position_data['entry_price']) * position_data['amount']
+                    close_side = 'SELL'
+                else:
+                    profit = (position_data['entry_price'] - current_price) * position_data['amount']
+                    close_side = 'BUY'
+
+                if self.mode != 'dry':
+                    # Reálné uzavření pozice (mimo databázovou transakci)
+                    self.clients.call(
+                        position_data['market_type'], 'create_order',
+                        symbol=position_data['symbol'],
+                        type='market',
+                        side=close_side.lower(),
+                        amount=position_data['amount']
+                    )
+            except Exception:
+                # Příkaz se neprovedl - pozice se vrací mezi aktivní
+                with get_pool().transaction() as conn:
+                    conn.execute(queries.RESTORE_POSITION, position)
+                raise
+
+            # Zápis uzavření v jedné krátké transakci
+            with get_pool().transaction() as conn:
+                cursor = conn.cursor()
+
+                # Aktualizace obchodu v databázi
+                cursor.execute(queries.CLOSE_OPEN_TRADES, (current_price, profit, position_data['symbol'], 'BUY'))
+
+                # Záznam o uzavření do historie
+                cursor.execute('''
+                INSERT INTO trades
+                (timestamp, symbol, side, amount, entry_price, exit_price, profit, status, market_type)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    datetime.now(),
+                    position_data['symbol'],
+                    close_side,
+                    position_data['amount'],
+                    position_data['entry_price'],
+                    current_price,
+                    profit,
+                    'CLOSED',
+                    position_data['market_type']
+                ))
 
             if self.mode == 'dry':
                 # Simulace uzavření pozice
                 self.virtual_balance += position_data['entry_price'] * position_data['amount'] + profit
-                
-                cursor.execute('''
-                UPDATE trades 
-                SET exit_price = ?, profit = ?, status = 'CLOSED'
-                WHERE symbol = ? AND side = ? AND status = 'OPEN'
-                ''', (current_price, profit, position_data['symbol'], 'BUY'))
-                
-            else:
-                # Reálné uzavření pozice
-                original_type = self.client.options['defaultType']
-                self.client.options['defaultType'] = position_data['market_type']
-                
-                order = self.client.create_order(
-                    symbol=position_data['symbol'],
-                    type='market',
-                    side=close_side.lower(),
-                    amount=position_data['amount']
-                )
-                
-                self.client.options['defaultType'] = original_type
-                
-                # Aktualizace obchodu v databázi
-                cursor.execute('''
-                UPDATE trades 
-                SET exit_price = ?, profit = ?, status = 'CLOSED'
-                WHERE symbol = ? AND side = ? AND status = 'OPEN'
-                ''', (current_price, profit, position_data['symbol'], 'BUY'))
 
-            # Odstranění z aktivních pozic
-            cursor.execute("DELETE FROM active_positions WHERE id = ?", (position_id,))
-            
-            # Záznam o uzavření do historie
-            cursor.execute('''
-            INSERT INTO trades 
-            (timestamp, symbol, side, amount, entry_price, exit_price, profit, status, market_type)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                datetime.now(),
-                position_data['symbol'],
-                close_side,
-                position_data['amount'],
-                position_data['entry_price'],
-                current_price,
-                profit,
-                'CLOSED',
-                position_data['market_type']
-            ))
-            
-            conn.commit()
-            conn.close()
-            
             return {
                 'status': 'success',
                 'profit': profit,
                 'closed_price': current_price,
                 'position_id': position_id
             }
-            
+
         except Exception as e:
-            self.logger.error(f"Chyba při uzavírání pozice {position_id}: {str(e)}")
+            logger.error(f"Chyba při uzavírání pozice {position_id}: {str(e)}")
             return {'error': str(e)}
 
     def update_bot_status(self, is_running):
         """Aktualizuje stav bota v databázi"""
         try:
-            conn = sqlite3.connect('data/trading_history.db')
-            cursor = conn.cursor()
+            with get_pool().transaction() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute('''
-            INSERT OR REPLACE INTO bot_config (id, key, value)
-            VALUES (1, 'is_running', ?)
-            ''', ('true' if is_running else 'false',))
-            
-            conn.commit()
-            conn.close()
+                cursor.execute('''
+                INSERT OR REPLACE INTO bot_config (id, key, value)
+                VALUES (1, 'is_running', ?)
+                ''', ('true' if is_running else 'false',))
             
         except Exception as e:
-            self.logger.error(f"Chyba při aktualizaci stavu bota: {str(e)}")
+            logger.error(f"Chyba při aktualizaci stavu bota: {str(e)}")
 
     def get_bot_status(self):
         """Získá aktuální stav bota z databáze"""
         try:
-            conn = sqlite3.connect('data/trading_history.db')
-            cursor = conn.cursor()
+            with get_pool().connection() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute("SELECT value FROM bot_config WHERE key = 'is_running'")
-            result = cursor.fetchone()
-            conn.close()
+                cursor.execute(queries.BOT_STATUS)
+                result = cursor.fetchone()
             
             return result[0] == 'true' if result else False
             
         except Exception as e:
-            self.logger.error(f"Chyba při získávání stavu bota: {str(e)}")
+            logger.error(f"Chyba při získávání stavu bota: {str(e)}")
             return False
 
     def update_risk_parameters(self, stop_loss, take_profit, max_trade_size):
@@ -468,34 +869,30 @@ class BinanceConnector:
             self.yaml_config['risk_management']['max_trade_size'] = max_trade_size
             
             # Uložení do databáze
-            conn = sqlite3.connect('data/trading_history.db')
-            cursor = conn.cursor()
+            with get_pool().transaction() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute('''
-            INSERT OR REPLACE INTO bot_config (id, key, value)
-            VALUES 
-                (2, 'stop_loss', ?),
-                (3, 'take_profit', ?),
-                (4, 'max_trade_size', ?)
-            ''', (stop_loss, take_profit, max_trade_size))
-            
-            conn.commit()
-            conn.close()
+                cursor.execute('''
+                INSERT OR REPLACE INTO bot_config (id, key, value)
+                VALUES 
+                    (2, 'stop_loss', ?),
+                    (3, 'take_profit', ?),
+                    (4, 'max_trade_size', ?)
+                ''', (stop_loss, take_profit, max_trade_size))
             
             return True
         except Exception as e:
-            self.logger.error(f"Chyba při aktualizaci parametrů: {str(e)}")
+            logger.error(f"Chyba při aktualizaci parametrů: {str(e)}")
             return False
 
     def get_risk_parameters(self):
         """Získá aktuální parametry rizikového managementu"""
         try:
-            conn = sqlite3.connect('data/trading_history.db')
-            cursor = conn.cursor()
+            with get_pool().connection() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute("SELECT key, value FROM bot_config WHERE key IN ('stop_loss', 'take_profit', 'max_trade_size')")
-            results = cursor.fetchall()
-            conn.close()
+                cursor.execute("SELECT key, value FROM bot_config WHERE key IN ('stop_loss', 'take_profit', 'max_trade_size')")
+                results = cursor.fetchall()
             
             params = {row[0]: row[1] for row in results}
             return {
@@ -505,7 +902,7 @@ class BinanceConnector:
             }
             
         except Exception as e:
-            self.logger.error(f"Chyba při získávání parametrů: {str(e)}")
+            logger.error(f"Chyba při získávání parametrů: {str(e)}")
             return self.yaml_config['risk_management']
         
 
@@ -0,0 +1,215 @@
+# core/history_archive.py
+import os
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from core.timeframes import timeframe_to_ms
+
+COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+def _month_keys(timestamps):
+    """Měsíc (YYYY-MM) pro každou časovou značku v ms"""
+    return np.datetime_as_string(timestamps.astype('datetime64[ms]').astype('datetime64[M]'), unit='M')
+
+
+class HistoryArchive:
+    """Archiv historických svíček ve sloupcových komprimovaných souborech npz
+
+    Jeden soubor na symbol/timeframe/měsíc:
+    `<root>/<market_type>/<BASE_QUOTE>/<timeframe>/<YYYY-MM>.npz` se sloupci
+    timestamp (int64) a open/high/low/close/volume (float64).
+    """
+
+    def __init__(self, root='data/history'):
+        self.root = root
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _dir(self, symbol, timeframe, market_type):
+        return os.path.join(self.root, market_type, symbol.replace('/', '_'), timeframe)
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def months(self, symbol, timeframe, market_type='spot'):
+        """Seznam uložených měsíců (YYYY-MM) seřazený vzestupně"""
+        directory = self._dir(symbol, timeframe, market_type)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.npz'))
+
+    def _read(self, path):
+        with np.load(path) as data:
+            return {column: data[column] for column in COLUMNS}
+
+    def _write(self, path, columns):
+        """Atomický zápis souboru (dočasný soubor + přejmenování)"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **columns)
+        os.replace(tmp_path, path)
+
+    def write(self, symbol, timeframe, market_type, candles):
+        """Sloučí svíčky [ts, o, h, l, c, v] s archivem (novější hodnoty přepíší starší)"""
+        if not len(candles):
+            return 0
+
+        values = np.asarray(candles, dtype=np.float64)
+        timestamps = values[:, 0].astype(np.int64)
+        months = _month_keys(timestamps)
+        directory = self._dir(symbol, timeframe, market_type)
+        os.makedirs(directory, exist_ok=True)
+
+        with self._key_lock((symbol, timeframe, market_type)):
+            for month in np.unique(months):
+                mask = months == month
+                columns = {'timestamp': timestamps[mask]}
+                for i, column in enumerate(COLUMNS[1:], start=1):
+                    columns[column] = values[mask, i]
+
+                path = os.path.join(directory, f"{month}.npz")
+                if os.path.exists(path):
+                    existing = self._read(path)
+                    columns = {c: np.concatenate([existing[c], columns[c]]) for c in COLUMNS}
+
+                # Seřazení a odstranění duplicit (platí poslední zapsaná hodnota)
+                reversed_ts = columns['timestamp'][::-1]
+                _, index = np.unique(reversed_ts, return_index=True)
+                index = len(reversed_ts) - 1 - index
+                self._write(path, {c: columns[c][index] for c in COLUMNS})
+
+        return len(values)
+
+    def load(self, symbol, timeframe, market_type='spot', start=None, end=None):
+        """Načte sloupce svíček v intervalu [start, end) (časové značky v ms)"""
+        months = self.months(symbol, timeframe, market_type)
+        if start is not None:
+            months = [m for m in months if m >= _month_keys(np.array([start]))[0]]
+        if end is not None:
+            months = [m for m in months if m <= _month_keys(np.array([end]))[0]]
+
+        directory = self._dir(symbol, timeframe, market_type)
+        parts = [self._read(os.path.join(directory, f"{month}.npz")) for month in months]
+        if not parts:
+            return {c: np.empty(0, dtype=np.int64 if c == 'timestamp' else np.float64) for c in COLUMNS}
+
+        columns = {c: np.concatenate([part[c] for part in parts]) for c in COLUMNS}
+        mask = np.ones(len(columns['timestamp']), dtype=bool)
+        if start is not None:
+            mask &= columns['timestamp'] >= start
+        if end is not None:
+            mask &= columns['timestamp'] < end
+        return {c: columns[c][mask] for c in COLUMNS}
+
+    def load_frame(self, symbol, timeframe, market_type='spot', start=None, end=None):
+        """Načte svíčky jako DataFrame s indexem podle času"""
+        columns = self.load(symbol, timeframe, market_type, start, end)
+        df = pd.DataFrame(columns)
+        df.index = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def time_range(self, symbol, timeframe, market_type='spot'):
+        """Časová značka první a poslední uložené svíčky (nebo (None, None))"""
+        months = self.months(symbol, timeframe, market_type)
+        if not months:
+            return None, None
+        directory = self._dir(symbol, timeframe, market_type)
+        first = self._read(os.path.join(directory, f"{months[0]}.npz"))['timestamp']
+        last = self._read(os.path.join(directory, f"{months[-1]}.npz"))['timestamp']
+        return int(first[0]), int(last[-1])
+
+
+class Backfiller:
+    """Paralelní stránkované stažení historie do `HistoryArchive`
+
+    Každý pár (symbol, timeframe) se stahuje v samostatném vlákně přes
+    `clients.call(market_type, 'fetch_ohlcv', ...)`, takže dotazy čerpají
+    ze sdíleného limitu vah. Historie se stránkuje od nejnovějších svíček
+    zpět; po přerušení se pokračuje od nejstarší uložené svíčky a chybějící
+    nejnovější svíčky se dotáhnou dopředu.
+    """
+
+    def __init__(self, clients, archive, market_type='spot', page_limit=1000, workers=4, flush_pages=10):
+        self.clients = clients
+        self.archive = archive
+        self.market_type = market_type
+        self.page_limit = page_limit
+        self.workers = workers
+        self.flush_pages = flush_pages
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def run(self, symbols, timeframes, start_ms, end_ms=None):
+        """Stáhne historii všech kombinací symbol x timeframe; vrací počty nových svíček"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self.backfill, symbol, timeframe, start_ms, end_ms): (symbol, timeframe)
+                for symbol in symbols for timeframe in timeframes
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Chyba při stahování historie {key[0]} {key[1]}: {str(e)}")
+                    results[key] = None
+        return results
+
+    def backfill(self, symbol, timeframe, start_ms, end_ms=None):
+        """Doplní archiv jednoho páru o interval [start_ms, end_ms)"""
+        step = timeframe_to_ms(timeframe)
+        now_ms = int(time.time() * 1000)
+        # Ukládají se jen uzavřené svíčky
+        end_ms = min(end_ms or now_ms, now_ms - now_ms % step)
+
+        first, last = self.archive.time_range(symbol, timeframe, self.market_type)
+        total = 0
+        if last is not None and last + step < end_ms:
+            total += self._forward(symbol, timeframe, last + step, end_ms)
+        total += self._backward(symbol, timeframe, start_ms, first if first is not None else end_ms)
+
+        self.logger.info(f"Historie {symbol} {timeframe}: {total} nových svíček")
+        return total
+
+    def _fetch(self, symbol, timeframe, since):
+        return self.clients.call(
+            self.market_type, 'fetch_ohlcv', symbol, timeframe, since=since, limit=self.page_limit
+        )
+
+    def _backward(self, symbol, timeframe, start_ms, cursor):
+        """Stránkuje od `cursor` zpět do `start_ms` (nebo do začátku obchodování páru)"""
+        step = timeframe_to_ms(timeframe)
+        pending, pages, total = [], 0, 0
+
+        while cursor > start_ms:
+            since = max(start_ms, cursor - self.page_limit * step)
+            batch = [c for c in self._fetch(symbol, timeframe, since) if since <= c[0] < cursor]
+            if not batch:
+                break
+            pending = batch + pending
+            cursor = batch[0][0]
+            pages += 1
+
+            # Průběžný zápis - souvislý úsek navazuje na uložená data, takže
+            # po přerušení lze pokračovat od nejstarší uložené svíčky
+            if pages % self.flush_pages == 0:
+                total += self.archive.write(symbol, timeframe, self.market_type, pending)
+                pending = []
+
+        return total + self.archive.write(symbol, timeframe, self.market_type, pending)
+
+    def _forward(self, symbol, timeframe, since, end_ms):
+        """Dotáhne svíčky novější než poslední uložená"""
+        total = 0
+        while since < end_ms:
+            batch = [c for c in self._fetch(symbol, timeframe, since) if since <= c[0] < end_ms]
+            if not batch:
+                break
+            total += self.archive.write(symbol, timeframe, self.market_type, batch)
+            since = batch[-1][0] + timeframe_to_ms(timeframe)
+        return total
@@ -0,0 +1,274 @@
+# core/indicators.py
+import math
+from collections import deque
+
+NAN = float('nan')
+
+
+def _is_zero(value):
+    """Stejná tolerance nuly jako TA_IS_ZERO v talib"""
+    return -0.00000001 < value < 0.00000001
+
+
+class StreamingSMA:
+    """Klouzavý průměr aktualizovaný v O(1) (stejné pořadí operací jako talib.SMA)"""
+    def __init__(self, period):
+        self.period = period
+        self.total = 0.0
+        self.window = deque()
+        self.value = NAN
+
+    def peek(self, x):
+        """Hodnota indikátoru, pokud by `x` byla další hodnota (bez uložení stavu)"""
+        if len(self.window) < self.period - 1:
+            return NAN
+        return (self.total + x) / self.period
+
+    def update(self, x):
+        """Zapracuje novou hodnotu a vrátí aktuální výstup"""
+        if len(self.window) < self.period - 1:
+            self.total += x
+            self.window.append(x)
+            return NAN
+
+        period_total = self.total + x
+        trailing = self.window[0] if self.window else x
+        self.total = period_total - trailing
+        self.window.append(x)
+        if len(self.window) > self.period - 1:
+            self.window.popleft()
+
+        self.value = period_total / self.period
+        return self.value
+
+
+class StreamingEMA:
+    """Exponenciální průměr s inicializací SMA (kompatibilní s talib.EMA)
+
+    `skip` udává počet prvních hodnot, které se ignorují - talib.MACD takto
+    zarovnává začátek rychlého EMA se začátkem pomalého.
+    """
+    def __init__(self, period, skip=0):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.skip = skip
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = NAN
+
+    def peek(self, x):
+        """Hodnota indikátoru, pokud by `x` byla další hodnota (bez uložení stavu)"""
+        n = self.count - self.skip
+        if n < self.period - 1:
+            return NAN
+        if n == self.period - 1:
+            return (self.seed_total + x) / self.period
+        return ((x - self.value) * self.k) + self.value
+
+    def update(self, x):
+        """Zapracuje novou hodnotu a vrátí aktuální výstup"""
+        out = self.peek(x)
+        n = self.count - self.skip
+        if 0 <= n < self.period - 1:
+            self.seed_total += x
+        self.count += 1
+        if not math.isnan(out):
+            self.value = out
+        return out
+
+
+class StreamingRSI:
+    """Wilderovo RSI aktualizované v O(1) (kompatibilní s talib.RSI)"""
+    def __init__(self, period=14):
+        self.period = period
+        self.count = 0
+        self.prev_value = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.value = NAN
+
+    def _step(self, x):
+        """Vypočítá nový stav (zisk, ztráta, výstup) bez jeho uložení"""
+        if self.count == 0:
+            return 0.0, 0.0, NAN
+
+        diff = x - self.prev_value
+        gain, loss = self.avg_gain, self.avg_loss
+
+        if self.count <= self.period:
+            # Akumulace první periody
+            if diff < 0:
+                loss -= diff
+            else:
+                gain += diff
+            if self.count < self.period:
+                return gain, loss, NAN
+        else:
+            # Wilderovo vyhlazení
+            loss *= self.period - 1
+            gain *= self.period - 1
+            if diff < 0:
+                loss -= diff
+            else:
+                gain += diff
+
+        loss /= self.period
+        gain /= self.period
+        total = gain + loss
+        return gain, loss, (100.0 * (gain / total) if not _is_zero(total) else 0.0)
+
+    def peek(self, x):
+        """Hodnota indikátoru, pokud by `x` byla další hodnota (bez uložení stavu)"""
+        return self._step(x)[2]
+
+    def update(self, x):
+        """Zapracuje novou hodnotu a vrátí aktuální výstup"""
+        self.avg_gain, self.avg_loss, out = self._step(x)
+        self.prev_value = x
+        self.count += 1
+        if not math.isnan(out):
+            self.value = out
+        return out
+
+
+class StreamingMACD:
+    """MACD (linie, signál, histogram) kompatibilní s talib.MACD"""
+    def __init__(self, fast=12, slow=26, signal=9):
+        if slow < fast:
+            fast, slow = slow, fast
+        self.fast_ema = StreamingEMA(fast, skip=slow - fast)
+        self.slow_ema = StreamingEMA(slow)
+        self.signal_ema = StreamingEMA(signal)
+        self.value = (NAN, NAN, NAN)
+
+    def peek(self, x):
+        """Hodnota indikátoru, pokud by `x` byla další hodnota (bez uložení stavu)"""
+        slow = self.slow_ema.peek(x)
+        if math.isnan(slow):
+            return (NAN, NAN, NAN)
+        macd = self.fast_ema.peek(x) - slow
+        signal = self.signal_ema.peek(macd)
+        if math.isnan(signal):
+            return (NAN, NAN, NAN)
+        return (macd, signal, macd - signal)
+
+    def update(self, x):
+        """Zapracuje novou hodnotu a vrátí aktuální výstup"""
+        fast = self.fast_ema.update(x)
+        slow = self.slow_ema.update(x)
+        if math.isnan(slow):
+            return self.value
+        macd = fast - slow
+        signal = self.signal_ema.update(macd)
+        if math.isnan(signal):
+            return self.value
+        self.value = (macd, signal, macd - signal)
+        return self.value
+
+
+class IndicatorEngine:
+    """Inkrementální výpočet indikátorů nad proudem svíček
+
+    Uzavřené svíčky se zapracují do stavu indikátorů (O(1) na svíčku),
+    poslední tvořící se svíčka se pouze "nahlédne" bez změny stavu. Výsledky
+    odpovídají přepočtu talib nad stejnou řadou svíček.
+    """
+    def __init__(self, rsi_period=14, ema_periods=(20, 50), volume_sma_period=20,
+                 macd_periods=(12, 26, 9), history=100):
+        self.rsi_period = rsi_period
+        self.ema_periods = tuple(ema_periods)
+        self.volume_sma_period = volume_sma_period
+        self.macd_periods = tuple(macd_periods)
+        self.history = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        """Vynuluje stav všech indikátorů"""
+        self.rsi = StreamingRSI(self.rsi_period)
+        self.emas = {period: StreamingEMA(period) for period in self.ema_periods}
+        self.volume_sma = StreamingSMA(self.volume_sma_period)
+        self.macd = StreamingMACD(*self.macd_periods)
+        self.last_timestamp = None
+        self.history.clear()
+
+    def _snapshot(self, candle, rsi, emas, volume_sma, macd):
+        snapshot = {
+            'timestamp': candle[0],
+            'close': candle[4],
+            'volume': candle[5],
+            'rsi': rsi,
+            'volume_sma': volume_sma,
+            'macd': macd[0],
+            'macd_signal': macd[1],
+            'macd_hist': macd[2],
+        }
+        for period, value in emas.items():
+            snapshot[f'ema_{period}'] = value
+        return snapshot
+
+    def update(self, candle):
+        """Zapracuje uzavřenou svíčku [ts, o, h, l, c, v] a vrátí hodnoty indikátorů"""
+        close, volume = float(candle[4]), float(candle[5])
+        snapshot = self._snapshot(
+            candle,
+            self.rsi.update(close),
+            {period: ema.update(close) for period, ema in self.emas.items()},
+            self.volume_sma.update(volume),
+            self.macd.update(close)
+        )
+        self.last_timestamp = candle[0]
+        self.history.append(snapshot)
+        return snapshot
+
+    def peek(self, candle):
+        """Hodnoty indikátorů pro tvořící se svíčku bez změny stavu"""
+        close, volume = float(candle[4]), float(candle[5])
+        return self._snapshot(
+            candle,
+            self.rsi.peek(close),
+            {period: ema.peek(close) for period, ema in self.emas.items()},
+            self.volume_sma.peek(volume),
+            self.macd.peek(close)
+        )
+
+    def ingest(self, candles, closed_timestamp=None):
+        """Zapracuje nové uzavřené svíčky a vrátí hodnoty pro nejnovější svíčku
+
+        Pokud `closed_timestamp` není zadán, považuje se poslední svíčka
+        za tvořící se a všechny předchozí za uzavřené.
+        """
+        if candles is None or len(candles) == 0:
+            return None
+        if closed_timestamp is None:
+            closed_timestamp = candles[-2][0] if len(candles) > 1 else None
+
+        if getattr(candles, 'dtype', None) is not None and candles.dtype.names and self.last_timestamp is not None:
+            # Strukturované pole - již zapracované svíčky se přeskočí binárně
+            candles = candles[int(candles['timestamp'].searchsorted(self.last_timestamp, side='left')):]
+            if len(candles) == 0:
+                return self.history[-1] if self.history else None
+
+        for candle in candles:
+            if closed_timestamp is None or candle[0] > closed_timestamp:
+                break
+            if self.last_timestamp is None or candle[0] > self.last_timestamp:
+                self.update(candle)
+
+        latest = candles[-1]
+        if self.last_timestamp is not None and latest[0] <= self.last_timestamp:
+            return self.history[-1] if self.history else None
+        return self.peek(latest)
+
+    def restore(self, candles):
+        """Obnoví stav indikátorů z historie uzavřených svíček"""
+        self.reset()
+        for candle in candles:
+            self.update(candle)
+        return self
+
+    @classmethod
+    def from_candle_store(cls, store, symbol, timeframe, market_type='spot', limit=1000, **kwargs):
+        """Vytvoří engine a obnoví jeho stav z lokálního úložiště svíček"""
+        candles = store.get_window(symbol, timeframe, market_type, limit)
+        # Poslední uložená svíčka může být ještě tvořící se
+        return cls(**kwargs).restore(candles[:-1])
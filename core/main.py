@@ -2,12 +2,13 @@
 import time
 import yaml
 import logging
-import sqlite3
 import pandas as pd
 from datetime import datetime
 from core.exchange import BinanceConnector
 from core.strategy_manager import StrategyManager
 from core.risk_management import AdvancedRiskManager
+from core.database import get_pool
+from core.write_behind import get_writer, close_writers
 
 class TradingBot:
     def __init__(self):
@@ -27,26 +28,47 @@ class TradingBot:
 
     def _init_components(self):
         """Inicializuje hlavní komponenty"""
+        # Odložený zápis metrik, predikcí a rozhodnutí (mimo kritickou cestu)
+        self.writer = get_writer(**self.config.get('write_behind', {}))
         self.exchange = BinanceConnector(self.config)
         self.strategy_manager = StrategyManager(self.config)
         self.risk_manager = AdvancedRiskManager(self.config, self.exchange)
         self.strategy = self.strategy_manager.get_strategy()
+        
+        # Obnovení stavu inkrementálních indikátorů z lokálního úložiště svíček
+        if hasattr(self.strategy, 'warm_up'):
+            self.strategy.warm_up(
+                self.exchange.candle_store,
+                f"{self.base_currency}/USDT",
+                self.config['strategies']['ml_strategy']['timeframe'],
+                self.market_type
+            )
+        
+        # Stream svíček a tickerů místo periodického dotazování REST API
+        streaming = self.config.get('streaming', {})
+        if streaming.get('enabled', False):
+            self.exchange.start_stream(
+                [f"{self.base_currency}/USDT"],
+                [self.config['strategies']['ml_strategy']['timeframe']],
+                self.market_type
+            )
+            if streaming.get('order_book', False):
+                self.exchange.track_order_book(f"{self.base_currency}/USDT", self.market_type)
 
     def _init_database(self):
         """Vytvoří chybějící databázové tabulky"""
-        with sqlite3.connect('data/trading_history.db') as conn:
+        with get_pool().transaction() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS model_metrics (
                     id INTEGER PRIMARY KEY,
-                    timestamp DATETIME,
+                    timestamp INTEGER,
                     accuracy REAL,
                     precision REAL,
                     recall REAL,
                     f1_score REAL
                 )
             ''')
-            conn.commit()
 
     def run(self):
         """Hlavní smyčka obchodního bota"""
@@ -56,13 +78,14 @@ class TradingBot:
         while self.running:
             try:
                 # 1. Získání dat
-                ohlcv_data = self.exchange.get_real_time_data(
+                ohlcv_data = self.exchange.live_window(
                     symbol=symbol,
-                    timeframe=self.config['strategies']['ml_strategy']['timeframe']
+                    timeframe=self.config['strategies']['ml_strategy']['timeframe'],
+                    limit=self.config['strategies']['ml_strategy'].get('history_limit', 200)
                 )
                 
                 # 2. AI analýza
-                analysis_report = self.strategy.analyze(ohlcv_data)
+                analysis_report = self.strategy.analyze(ohlcv_data, symbol=symbol)
                 
                 # 3. Risk management
                 risk_assessment = self.risk_manager.evaluate(
@@ -81,7 +104,7 @@ class TradingBot:
                 # 5. Aktualizace metrik
                 self._update_metrics(analysis_report)
                 
-                time.sleep(self.config['api_settings']['refresh_interval'])
+                self._wait_for_data(symbol)
                 
             except KeyboardInterrupt:
                 self.shutdown()
@@ -89,6 +112,17 @@ class TradingBot:
                 self.logger.error(f"Critical path failure: {str(e)}", exc_info=True)
                 time.sleep(10)
 
+    def _wait_for_data(self, symbol):
+        """Počká na uzavření další svíčky ze streamu, nejdéle refresh_interval"""
+        refresh_interval = self.config['api_settings']['refresh_interval']
+        stream = self.exchange.streams.get(self.market_type)
+        if stream is not None and stream.connected:
+            stream.wait_for_candle(
+                symbol, self.config['strategies']['ml_strategy']['timeframe'], timeout=refresh_interval
+            )
+        else:
+            time.sleep(refresh_interval)
+
     def _execute_trade(self, signal, amount, symbol):
         """Provádí obchod s rozšířeným loggingem"""
         try:
@@ -96,7 +130,7 @@ class TradingBot:
                 self.logger.info(f"🔮 [SIMULATION] {signal} {amount} {symbol}")
                 return
 
-            order_result = self.exchange.execute_order(
+            order_result = self.exchange.execute_trade(
                 symbol=symbol,
                 side=signal.lower(),
                 amount=amount,
@@ -111,23 +145,24 @@ class TradingBot:
 
     def _update_metrics(self, analysis):
         """Ukládá metriky AI modelu"""
-        with sqlite3.connect('data/trading_history.db') as conn:
-            conn.execute('''
-                INSERT INTO model_metrics 
-                (timestamp, accuracy, precision, recall, f1_score)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                datetime.now(),
-                analysis.get('accuracy', 0),
-                analysis.get('precision', 0),
-                analysis.get('recall', 0),
-                analysis.get('f1_score', 0)
-            ))
+        self.writer.put('''
+            INSERT INTO model_metrics 
+            (timestamp, accuracy, precision, recall, f1_score)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (
+            datetime.now(),
+            analysis.get('accuracy', 0),
+            analysis.get('precision', 0),
+            analysis.get('recall', 0),
+            analysis.get('f1_score', 0)
+        ))
 
     def shutdown(self):
         """Elegantní vypnutí systému"""
         self.running = False
         self.logger.info("🛑 QuantumTrader shutting down...")
+        self.logger.info(f"Fronta zápisu: {self.writer.stats()}")
+        close_writers()
         self.exchange.close()
         self._cleanup_resources()
 
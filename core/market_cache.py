@@ -0,0 +1,92 @@
+# core/market_cache.py
+import os
+import json
+import time
+import logging
+import threading
+import ccxt
+
+# Zvýšit při změně formátu souboru - starší soubory se ignorují
+CACHE_VERSION = 1
+
+# Naparsovaná metadata sdílená instancemi v rámci procesu (cesta -> (mtime, data))
+_MEMORY = {}
+_MEMORY_LOCK = threading.Lock()
+
+
+class MarketCache:
+    """Lokální cache metadat trhů (výsledek ccxt `load_markets`)
+
+    Metadata se ukládají do JSON souboru pro každou burzu a typ trhu
+    a platí `ttl` sekund. Soubor nese verzi formátu i verzi ccxt; při
+    nesouladu se považuje za neplatný. Restart bota, dashboard i obnova
+    spojení tak nemusí stahovat několik MB metadat z burzy.
+    """
+
+    def __init__(self, root='data/markets', ttl=86400):
+        self.root = root
+        self.ttl = ttl
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def path(self, exchange_id, market_type, sandbox=False):
+        suffix = '_sandbox' if sandbox else ''
+        return os.path.join(self.root, f"{exchange_id}_{market_type}{suffix}.json")
+
+    def load(self, exchange_id, market_type, sandbox=False, allow_stale=False):
+        """Vrátí (markets, currencies) z cache, nebo None (chybí, vypršela, jiná verze)"""
+        path = self.path(exchange_id, market_type, sandbox)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        try:
+            with _MEMORY_LOCK:
+                cached = _MEMORY.get(path)
+            if cached is not None and cached[0] == mtime:
+                payload = cached[1]
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+                with _MEMORY_LOCK:
+                    _MEMORY[path] = (mtime, payload)
+        except Exception as e:
+            self.logger.warning(f"Nelze načíst cache trhů {path}: {str(e)}")
+            return None
+
+        if payload.get('version') != CACHE_VERSION or payload.get('ccxt_version') != ccxt.__version__:
+            return None
+        if not allow_stale and time.time() - payload.get('saved_at', 0) > self.ttl:
+            return None
+        return payload['markets'], payload.get('currencies')
+
+    def save(self, exchange_id, market_type, markets, currencies=None, sandbox=False):
+        """Atomicky uloží metadata trhů"""
+        path = self.path(exchange_id, market_type, sandbox)
+        payload = {
+            'version': CACHE_VERSION,
+            'ccxt_version': ccxt.__version__,
+            'exchange': exchange_id,
+            'market_type': market_type,
+            'sandbox': sandbox,
+            'saved_at': time.time(),
+            'markets': markets,
+            'currencies': currencies,
+        }
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+            with _MEMORY_LOCK:
+                _MEMORY[path] = (os.path.getmtime(path), payload)
+        except Exception as e:
+            self.logger.warning(f"Nelze uložit cache trhů {path}: {str(e)}")
+
+    def invalidate(self, exchange_id, market_type, sandbox=False):
+        path = self.path(exchange_id, market_type, sandbox)
+        with _MEMORY_LOCK:
+            _MEMORY.pop(path, None)
+        if os.path.exists(path):
+            os.remove(path)
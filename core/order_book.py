@@ -0,0 +1,409 @@
+# core/order_book.py
+import logging
+import threading
+from bisect import bisect_right
+
+
+def _build_tree(values):
+    """Fenwickův strom (binary indexed tree) nad hodnotami slotů v čase O(n)"""
+    tree = [0] + list(values)
+    size = len(values)
+    for i in range(1, size + 1):
+        j = i + (i & -i)
+        if j <= size:
+            tree[j] += tree[i]
+    return tree
+
+
+def _tree_add(tree, i, delta):
+    i += 1
+    while i < len(tree):
+        tree[i] += delta
+        i += i & -i
+
+
+def _tree_prefix(tree, i):
+    """Součet prvních `i` slotů"""
+    total = 0
+    while i > 0:
+        total += tree[i]
+        i -= i & -i
+    return total
+
+
+class _BookSide:
+    """Jedna strana knihy seřazená od nejlepší ceny s prefixovými součty ve Fenwickových stromech
+
+    Ceny se ukládají jako klíče slotů seřazené vzestupně - u bidů záporné,
+    takže nižší slot je vždy lepší úroveň. Množství, objem a počet živých
+    úrovní drží Fenwickovy stromy: změna známé úrovně i dotazy (nejlepší
+    cena, vyplnění, hloubka, maximální množství) stojí O(log n).
+
+    Odstraněná úroveň zůstává jako prázdný slot pro opětovné použití. Nová,
+    dosud neviděná cena vyžaduje přestavbu slotů v O(n); provede se líně,
+    jednou před prvním dotazem po dávce změn. Prázdné sloty se při
+    přestavbě zahodí, když jich je víc než živých úrovní.
+    """
+
+    def __init__(self, is_bid):
+        self.sign = -1.0 if is_bid else 1.0
+        self.keys = []
+        self.sizes = {}
+        self._slots = {}
+        self._pending = set()
+        self._dirty = True
+        self._updates = 0
+        self._count = []
+        self._qty = []
+        self._notional = []
+        self._top = 0
+
+    def set(self, price, amount):
+        """Nastaví množství na cenové úrovni (0 úroveň odstraní)"""
+        key = self.sign * price
+        old = self.sizes.get(key, 0.0)
+        if amount > 0:
+            self.sizes[key] = amount
+        elif key in self.sizes:
+            del self.sizes[key]
+        else:
+            return
+
+        if self._dirty:
+            if amount > 0 and key not in self._slots:
+                self._pending.add(key)
+            elif amount <= 0:
+                self._pending.discard(key)
+            return
+        slot = self._slots.get(key)
+        if slot is None:
+            # Neviděná cena - sloty se přestaví před dalším dotazem
+            self._pending.add(key)
+            self._dirty = True
+            return
+
+        new = amount if amount > 0 else 0.0
+        _tree_add(self._count, slot, (new > 0) - (old > 0))
+        _tree_add(self._qty, slot, new - old)
+        _tree_add(self._notional, slot, (new - old) * price)
+        self._updates += 1
+        if self._updates > 8 * len(self.keys) + 1024:
+            # Občasná přestavba odstraní nasčítanou chybu plovoucí čárky
+            self._dirty = True
+
+    def clear(self):
+        self.keys = []
+        self.sizes = {}
+        self._slots = {}
+        self._pending = set()
+        self._dirty = True
+
+    def _rebuild(self):
+        """Přestaví sloty a stromy ze `sizes` (jen po nové ceně nebo po mnoha změnách)"""
+        keys = set(self.keys) | self._pending
+        if len(keys) > 2 * len(self.sizes):
+            keys = set(self.sizes)
+        self.keys = sorted(keys)
+        self._slots = {key: i for i, key in enumerate(self.keys)}
+        sizes = [self.sizes.get(key, 0.0) for key in self.keys]
+        self._count = _build_tree([1 if size > 0 else 0 for size in sizes])
+        self._qty = _build_tree(sizes)
+        self._notional = _build_tree([size * self.sign * key for size, key in zip(sizes, self.keys)])
+        self._top = 1 << (len(self.keys).bit_length() - 1) if self.keys else 0
+        self._pending = set()
+        self._updates = 0
+        self._dirty = False
+
+    def _ensure(self):
+        if self._dirty:
+            self._rebuild()
+
+    def _search(self, accept):
+        """Nejdelší prefix slotů, pro který platí monotónní `accept(počet, množství, objem)`
+
+        Vrací (délka prefixu, počet, množství, objem) - sestup Fenwickovým stromem v O(log n).
+        """
+        pos, count, qty, notional = 0, 0, 0.0, 0.0
+        step = self._top
+        while step:
+            nxt = pos + step
+            if nxt <= len(self.keys):
+                c = count + self._count[nxt]
+                q = qty + self._qty[nxt]
+                n = notional + self._notional[nxt]
+                if accept(c, q, n):
+                    pos, count, qty, notional = nxt, c, q, n
+            step >>= 1
+        return pos, count, qty, notional
+
+    def _live_slot(self, pos, count):
+        """První živý slot od `pos` (chrání před zbytkovou chybou součtů v prázdném slotu)"""
+        if pos < len(self.keys) and self.keys[pos] not in self.sizes:
+            pos = self._search(lambda c, q, n: c <= count)[0]
+        return pos
+
+    def best(self):
+        if not self.sizes:
+            return None
+        self._ensure()
+        pos = self._search(lambda c, q, n: c == 0)[0]
+        return self.sign * self.keys[pos]
+
+    def levels(self, limit=None):
+        """Úrovně [cena, množství] od nejlepší"""
+        self._ensure()
+        levels = []
+        for key in self.keys:
+            if limit is not None and len(levels) >= limit:
+                break
+            amount = self.sizes.get(key)
+            if amount:
+                levels.append([self.sign * key, amount])
+        return levels
+
+    def fill(self, amount):
+        """Průměrná cena a vyplněné množství při spotřebování `amount` z této strany"""
+        if not self.sizes or amount <= 0:
+            return None, 0.0
+        self._ensure()
+        pos, count, qty, notional = self._search(lambda c, q, n: q < amount)
+        pos = self._live_slot(pos, count)
+        if pos >= len(self.keys):
+            total_qty = _tree_prefix(self._qty, len(self.keys))
+            return _tree_prefix(self._notional, len(self.keys)) / total_qty, total_qty
+        notional += (amount - qty) * self.sign * self.keys[pos]
+        return notional / amount, amount
+
+    def depth_to(self, bound):
+        """Množství a objem dostupné do ceny `bound` (včetně)"""
+        self._ensure()
+        i = bisect_right(self.keys, self.sign * bound)
+        return _tree_prefix(self._qty, i), _tree_prefix(self._notional, i)
+
+    def max_amount(self, limit_price):
+        """Největší množství, jehož průměrná cena nepřekročí `limit_price`"""
+        if not self.sizes:
+            return 0.0
+        self._ensure()
+
+        # Průměrná cena roste s množstvím monotónně - sestup přes prefixy (N - limit * Q <= 0)
+        sign = self.sign
+        pos, count, qty, notional = self._search(lambda c, q, n: sign * (n - limit_price * q) <= 0)
+        pos = self._live_slot(pos, count)
+        if pos >= len(self.keys):
+            return qty
+
+        # Částečné vyplnění úrovně `pos`: (N + x*p) / (Q + x) = limit
+        price = sign * self.keys[pos]
+        if price == limit_price:
+            return qty + self.sizes[self.keys[pos]]
+        return qty + max(0.0, (limit_price * qty - notional) / (price - limit_price))
+
+
+class LocalOrderBook:
+    """Lokálně udržovaná L2 kniha z REST snapshotu a diff streamu Binance
+
+    Aktualizace se řídí pravidly Binance: zprávy s `u` <= lastUpdateId se
+    zahazují, první zpráva musí pokrýt lastUpdateId + 1 a každá další musí
+    navazovat (`U` == předchozí `u` + 1, u futures `pu` == předchozí `u`).
+    Při mezeře se kniha označí jako nesynchronizovaná a čeká na nový snapshot.
+    """
+
+    def __init__(self, symbol, max_buffer=1000):
+        self.symbol = symbol
+        self.max_buffer = max_buffer
+        self.bids = _BookSide(is_bid=True)
+        self.asks = _BookSide(is_bid=False)
+        self.last_update_id = None
+        self.synced = False
+        self.timestamp = None
+        self._continuous = False
+        self._buffer = []
+        self._lock = threading.RLock()
+
+    def apply_snapshot(self, snapshot):
+        """Načte REST snapshot (ccxt `fetch_order_book` nebo /depth) a přehraje buffer"""
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            for price, amount in snapshot['bids']:
+                self.bids.set(float(price), float(amount))
+            for price, amount in snapshot['asks']:
+                self.asks.set(float(price), float(amount))
+            self.last_update_id = snapshot.get('lastUpdateId', snapshot.get('nonce'))
+            self.timestamp = snapshot.get('timestamp')
+            self.synced = True
+            # První událost po snapshotu se posuzuje podle rozsahu U..u
+            self._continuous = False
+
+            buffered, self._buffer = self._buffer, []
+            for i, event in enumerate(buffered):
+                if not self.apply_diff(event):
+                    # Snapshot je starší než buffer - zbytek počká na další snapshot
+                    self._buffer.extend(buffered[i + 1:])
+                    return False
+            return True
+
+    def apply_diff(self, event):
+        """Zapracuje diff událost streamu `depth`; vrací False při ztrátě návaznosti"""
+        with self._lock:
+            if not self.synced:
+                self._buffer.append(event)
+                del self._buffer[:-self.max_buffer]
+                return True
+
+            first, last = event['U'], event['u']
+            if last <= self.last_update_id:
+                return True
+
+            if 'pu' in event and self._continuous:
+                in_sequence = event['pu'] == self.last_update_id
+            elif self._continuous:
+                in_sequence = first == self.last_update_id + 1
+            else:
+                in_sequence = first <= self.last_update_id + 1 <= last
+
+            if not in_sequence:
+                self.synced = False
+                self._buffer = [event]
+                return False
+
+            for price, amount in event.get('b', []):
+                self.bids.set(float(price), float(amount))
+            for price, amount in event.get('a', []):
+                self.asks.set(float(price), float(amount))
+            self.last_update_id = last
+            self.timestamp = event.get('E', self.timestamp)
+            self._continuous = True
+            return True
+
+    def best_bid(self):
+        return self.bids.best()
+
+    def best_ask(self):
+        return self.asks.best()
+
+    def mid_price(self):
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def spread_bps(self):
+        mid = self.mid_price()
+        if not mid:
+            return None
+        return (self.best_ask() - self.best_bid()) / mid * 10000
+
+    def _side(self, side):
+        """Strana knihy, kterou spotřebuje tržní příkaz (buy -> asks, sell -> bids)"""
+        return self.asks if side.lower() == 'buy' else self.bids
+
+    def expected_fill(self, side, amount):
+        """Očekávaná průměrná cena tržního příkazu
+
+        Vrací slovník s průměrnou cenou, vyplněným množstvím a skluzem
+        vůči nejlepší ceně v bps.
+        """
+        with self._lock:
+            book_side = self._side(side)
+            best = book_side.best()
+            price, filled = book_side.fill(amount)
+            slippage = abs(price - best) / best * 10000 if price is not None and best else None
+            return {'price': price, 'filled': filled, 'best': best, 'slippage_bps': slippage}
+
+    def depth_within(self, side, bps):
+        """Množství (a objem v kotované měně) dostupné do `bps` od nejlepší ceny"""
+        with self._lock:
+            book_side = self._side(side)
+            best = book_side.best()
+            if best is None:
+                return 0.0, 0.0
+            offset = best * bps / 10000
+            return book_side.depth_to(best + offset if book_side is self.asks else best - offset)
+
+    def max_amount(self, side, max_slippage_bps):
+        """Největší množství, jehož průměrný skluz nepřekročí `max_slippage_bps`"""
+        with self._lock:
+            book_side = self._side(side)
+            best = book_side.best()
+            if best is None:
+                return 0.0
+            offset = best * max_slippage_bps / 10000
+            return book_side.max_amount(best + offset if book_side is self.asks else best - offset)
+
+    def snapshot(self, limit=20):
+        """Horních `limit` úrovní obou stran knihy"""
+        with self._lock:
+            return {
+                'symbol': self.symbol,
+                'bids': self.bids.levels(limit),
+                'asks': self.asks.levels(limit),
+                'lastUpdateId': self.last_update_id,
+                'timestamp': self.timestamp
+            }
+
+
+class OrderBookManager:
+    """Správa lokálních knih pro více symbolů napájená diff streamem
+
+    Registruje se jako posluchač `MarketDataStream`; při ztrátě návaznosti
+    stáhne nový snapshot přes `fetch_snapshot(symbol)` v samostatném vlákně,
+    aby neblokoval příjem streamu.
+    """
+
+    def __init__(self, fetch_snapshot, market_type='spot'):
+        self.fetch_snapshot = fetch_snapshot
+        self.market_type = market_type
+        self.books = {}
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._resyncing = set()
+        self._lock = threading.Lock()
+
+    def track(self, symbol):
+        """Začne udržovat knihu pro symbol a stáhne první snapshot"""
+        with self._lock:
+            if symbol in self.books:
+                return self.books[symbol]
+            book = LocalOrderBook(symbol)
+            self.books[symbol] = book
+        self._resync(symbol)
+        return book
+
+    def get(self, symbol):
+        """Synchronizovaná kniha symbolu (nebo None)"""
+        book = self.books.get(symbol)
+        return book if book is not None and book.synced else None
+
+    def on_event(self, event):
+        """Posluchač streamu - zpracuje události typu `depth`"""
+        if event.get('type') != 'depth' or event.get('market_type') != self.market_type:
+            return
+        symbol = event['symbol']
+        book = self.books.get(symbol)
+        if book is None:
+            return
+        if not book.apply_diff(event['data']):
+            self.logger.warning(f"Ztráta návaznosti knihy {symbol}, nový snapshot")
+            self._resync(symbol)
+        elif not book.synced:
+            # Předchozí snapshot nenavázal na stream - zkusí se další
+            self._resync(symbol)
+
+    def _resync(self, symbol):
+        with self._lock:
+            if symbol in self._resyncing:
+                return
+            self._resyncing.add(symbol)
+        threading.Thread(target=self._load_snapshot, args=(symbol,), name=f'book-{symbol}', daemon=True).start()
+
+    def _load_snapshot(self, symbol):
+        try:
+            snapshot = self.fetch_snapshot(symbol)
+            if not self.books[symbol].apply_snapshot(snapshot):
+                self.logger.warning(f"Snapshot knihy {symbol} nenavazuje na stream")
+        except Exception as e:
+            self.logger.error(f"Chyba při načítání knihy {symbol}: {str(e)}")
+        finally:
+            with self._lock:
+                self._resyncing.discard(symbol)
@@ -0,0 +1,132 @@
+# core/queries.py
+# Sdílené SQL dotazy dashboardu a bota. Aplikace i regresní kontrola plánů
+# (scripts/check_query_plans.py) používají stejné texty, takže kontrola
+# hlídá skutečně spouštěné dotazy. Funkce vracejí dvojici (sql, parametry).
+
+# Posledních N obchodů pro přehled dashboardu (parametr: limit)
+TRADE_HISTORY = """
+    SELECT timestamp, side, symbol, amount, entry_price, profit, market_type
+    FROM trades ORDER BY timestamp DESC LIMIT ?"""
+
+# Equity od zadaného času (parametr: od kdy v epoch ms)
+EQUITY_RANGE = """
+    SELECT timestamp, equity_value FROM equity
+    WHERE timestamp >= ? ORDER BY timestamp"""
+
+EQUITY_CURVE = "SELECT timestamp, equity_value FROM equity ORDER BY timestamp ASC"
+
+EQUITY_MARKET = "SELECT timestamp, equity_value FROM equity WHERE market_type = ?"
+
+# Poslední signál páru (parametry: symbol, typ trhu)
+LAST_SIGNAL = """
+    SELECT signal FROM decisions WHERE symbol = ? AND market_type = ?
+    ORDER BY timestamp DESC LIMIT 1"""
+
+# Denní P&L ze souhrnů pro výkonnostní dashboard
+DAILY_ROLLUPS = """
+    SELECT day AS timestamp, SUM(gross_profit - gross_loss) AS profit,
+           SUM(trades) AS trades, SUM(wins) AS wins
+    FROM trade_rollups GROUP BY day ORDER BY day"""
+
+POSITION_BY_ID = "SELECT * FROM active_positions WHERE id = ?"
+
+DELETE_POSITION = "DELETE FROM active_positions WHERE id = ?"
+
+# Vrácení převzaté pozice, pokud se uzavírací příkaz nepodařil (řádek z POSITION_BY_ID)
+RESTORE_POSITION = """
+    INSERT INTO active_positions
+    (id, symbol, direction, amount, entry_price, stop_loss, take_profit, timestamp, market_type)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+# Uzavření otevřených obchodů páru (parametry: exit_price, profit, symbol, side)
+CLOSE_OPEN_TRADES = """
+    UPDATE trades SET exit_price = ?, profit = ?, status = 'CLOSED'
+    WHERE symbol = ? AND side = ? AND status = 'OPEN'"""
+
+BOT_STATUS = "SELECT value FROM bot_config WHERE key = 'is_running'"
+
+
+def _where(conditions):
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def trade_history_query(market_type=None, limit=100):
+    """Obchody od nejnovějšího (volitelně jen jednoho typu trhu)"""
+    conditions, params = [], []
+    if market_type:
+        conditions.append("market_type = ?")
+        params.append(market_type)
+    return f"SELECT * FROM trades{_where(conditions)} ORDER BY timestamp DESC LIMIT ?", params + [limit]
+
+
+def active_positions_query(market_type=None):
+    """Aktivní pozice (volitelně jen jednoho typu trhu)"""
+    conditions, params = [], []
+    if market_type:
+        conditions.append("market_type = ?")
+        params.append(market_type)
+    return f"SELECT * FROM active_positions{_where(conditions)}", params
+
+
+def bot_decisions_query(market_type=None, limit=10):
+    """Poslední rozhodnutí bota (volitelně jen jednoho typu trhu)"""
+    conditions, params = [], []
+    if market_type:
+        conditions.append("market_type = ?")
+        params.append(market_type)
+    sql = f"""
+    SELECT timestamp, symbol, signal, confidence, action_taken, market_type
+    FROM decisions{_where(conditions)} ORDER BY timestamp DESC LIMIT ?"""
+    return sql, params + [limit]
+
+
+def rollup_totals_query(market_type=None):
+    """Součty uzavřených obchodů z denních souhrnů"""
+    conditions, params = [], []
+    if market_type:
+        conditions.append("market_type = ?")
+        params.append(market_type)
+    sql = f"""
+    SELECT SUM(trades), SUM(wins), SUM(losses), SUM(gross_profit), SUM(gross_loss)
+    FROM trade_rollups{_where(conditions)}"""
+    return sql, params
+
+
+def daily_profit_query(since, market_type=None):
+    """Součet zisku od `since` (klouzavé okno, rozsah nad indexem)"""
+    conditions, params = ["timestamp >= ?"], [since]
+    if market_type:
+        conditions.append("market_type = ?")
+        params.append(market_type)
+    return f"SELECT SUM(profit) AS daily_profit FROM trades{_where(conditions)}", params
+
+
+def performance_analytics_query(since=None, symbol=None, market_type=None):
+    """Dotazy analytiky výkonu: (sql souhrnů, parametry, sql histogramu zisků, parametry)
+
+    Souhrny filtrují podle dne UTC (`since` musí být začátek dne), histogram
+    podle času; oba jen uzavřené obchody.
+    """
+    rollup_conditions, rollup_params = [], []
+    conditions, params = ["status = 'CLOSED'"], []
+    if since is not None:
+        rollup_conditions.append("day >= ?")
+        rollup_params.append(since)
+        conditions.append("timestamp >= ?")
+        params.append(since)
+    if symbol:
+        rollup_conditions.append("symbol = ?")
+        rollup_params.append(symbol)
+        conditions.append("symbol = ?")
+        params.append(symbol)
+    if market_type:
+        rollup_conditions.append("market_type = ?")
+        rollup_params.append(market_type)
+        conditions.append("market_type = ?")
+        params.append(market_type)
+
+    rollup_sql = f"""
+    SELECT day, symbol, trades, wins, losses, gross_profit, gross_loss
+    FROM trade_rollups{_where(rollup_conditions)} ORDER BY day"""
+    histogram_sql = f"SELECT profit FROM trades{_where(conditions)}"
+    return rollup_sql, rollup_params, histogram_sql, params
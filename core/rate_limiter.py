@@ -0,0 +1,245 @@
+# core/rate_limiter.py
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+PRIORITY_ORDER = 'order'
+PRIORITY_READ = 'read'
+
+# Váhy požadavků Binance REST API podle ccxt metody
+ENDPOINT_WEIGHTS = {
+    'fetch_ohlcv': 2,
+    'fetch_ticker': 2,
+    'fetch_balance': 20,
+    'fetch_status': 1,
+    'load_markets': 20,
+    'fetch_markets': 20,
+    'create_order': 1,
+    'cancel_order': 1,
+    'fetch_order': 4,
+    'fetch_my_trades': 20,
+}
+
+# Váha exchangeInfo podle typu trhu ccxt a kbelík, ze kterého čerpá (coin-M
+# futures mají vlastní limit mimo sledované kbelíky)
+MARKET_INFO_WEIGHTS = {
+    'spot': ('spot', 20),
+    'linear': ('future', 1),
+}
+
+# Metody, které mají přednost před čtením dat pro dashboard
+ORDER_ENDPOINTS = {'create_order', 'cancel_order', 'fetch_order'}
+
+# Limity vah za minutu (spot a margin sdílí api.binance.com, futures fapi)
+DEFAULT_WEIGHT_LIMITS = {
+    'spot': 6000,
+    'future': 2400,
+}
+
+
+def request_weight(endpoint, *args, **kwargs):
+    """Vrátí váhu požadavku podle endpointu a jeho parametrů"""
+    if endpoint == 'fetch_tickers':
+        symbols = args[0] if args else kwargs.get('symbols')
+        if not symbols:
+            return 80
+        return 2 if len(symbols) <= 20 else 40 if len(symbols) <= 100 else 80
+    if endpoint == 'fetch_order_book':
+        limit = kwargs.get('limit') or (args[1] if len(args) > 1 else None) or 100
+        return 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+    if endpoint == 'fetch_open_orders':
+        symbol = args[0] if args else kwargs.get('symbol')
+        return 6 if symbol else 80
+    return ENDPOINT_WEIGHTS.get(endpoint, 1)
+
+
+def market_info_weights(client):
+    """Váhy dotazů `load_markets` podle kbelíku
+
+    ccxt při načtení trhů stahuje exchangeInfo všech typů z
+    options['fetchMarkets'] bez ohledu na `defaultType` klienta.
+    """
+    options = client.options.get('fetchMarkets')
+    if isinstance(options, dict):
+        types = options.get('types', ['spot', 'linear', 'inverse'])
+    else:
+        types = options or ['spot', 'linear', 'inverse']
+    weights = {}
+    for market_type in types:
+        if market_type in MARKET_INFO_WEIGHTS:
+            bucket, weight = MARKET_INFO_WEIGHTS[market_type]
+            weights[bucket] = weights.get(bucket, 0) + weight
+    return weights
+
+
+def request_weights(client, bucket, endpoint, *args, **kwargs):
+    """Váhy požadavku podle kbelíku (`load_markets` čerpá i z kbelíků jiných trhů)"""
+    if endpoint == 'load_markets':
+        return market_info_weights(client)
+    return {bucket: request_weight(endpoint, *args, **kwargs)}
+
+
+def request_priority(endpoint):
+    """Priorita požadavku - obchodní endpointy mají přednost"""
+    return PRIORITY_ORDER if endpoint in ORDER_ENDPOINTS else PRIORITY_READ
+
+
+class WeightedRateLimiter:
+    """Token bucket podle vah požadavků sdílený mezi procesy přes SQLite
+
+    Bot i dashboard čerpají ze stejného kbelíku (soubor `db_path`), takže
+    společně nepřekročí limit burzy. Čtecí požadavky mohou vyčerpat kbelík
+    jen do rezervy `order_reserve`, zbytek je vyhrazen pro obchodní příkazy.
+    Po odpovědi 429/418 se kbelík zablokuje pro všechny procesy.
+    """
+
+    def __init__(self, db_path='data/rate_limit.db', weight_limits=None, interval=60.0,
+                 order_reserve=0.2, max_wait=30.0):
+        self.db_path = db_path
+        self.weight_limits = dict(DEFAULT_WEIGHT_LIMITS)
+        self.weight_limits.update(weight_limits or {})
+        self.interval = interval
+        self.order_reserve = order_reserve
+        self.max_wait = max_wait
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._init_database()
+
+    def _connection(self):
+        """Spojení pro aktuální vlákno (v autocommit režimu pro BEGIN IMMEDIATE)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _init_database(self):
+        """Vytvoří tabulku sdílených kbelíků"""
+        conn = self._connection()
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            blocked_until REAL NOT NULL DEFAULT 0
+        )''')
+
+    def capacity(self, bucket):
+        """Kapacita kbelíku (limit vah za interval)"""
+        return float(self.weight_limits.get(bucket, DEFAULT_WEIGHT_LIMITS['spot']))
+
+    def _load(self, conn, bucket, now):
+        """Načte stav kbelíku a doplní tokeny za uplynulý čas"""
+        capacity = self.capacity(bucket)
+        row = conn.execute(
+            "SELECT tokens, updated_at, blocked_until FROM rate_limit_buckets WHERE name = ?",
+            (bucket,)
+        ).fetchone()
+        if row is None:
+            conn.execute(
+                "INSERT INTO rate_limit_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (bucket, capacity, now)
+            )
+            return capacity, 0.0
+        tokens, updated_at, blocked_until = row
+        tokens = min(capacity, tokens + max(0.0, now - updated_at) * capacity / self.interval)
+        return tokens, blocked_until
+
+    def try_acquire(self, weight, priority=PRIORITY_READ, bucket='spot'):
+        """Pokusí se odebrat `weight` tokenů; vrací 0 při úspěchu, jinak dobu čekání v sekundách"""
+        capacity = self.capacity(bucket)
+        floor = 0.0 if priority == PRIORITY_ORDER else capacity * self.order_reserve
+        conn = self._connection()
+        now = time.time()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, blocked_until = self._load(conn, bucket, now)
+            if blocked_until > now:
+                wait = blocked_until - now
+            elif tokens - weight >= floor or tokens >= capacity:
+                tokens -= weight
+                wait = 0.0
+            else:
+                wait = (weight + floor - tokens) * self.interval / capacity
+            conn.execute(
+                "UPDATE rate_limit_buckets SET tokens = ?, updated_at = ? WHERE name = ?",
+                (tokens, now, bucket)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, weight, priority=PRIORITY_READ, bucket='spot'):
+        """Blokuje, dokud není k dispozici dostatek vah pro požadavek"""
+        deadline = time.time() + self.max_wait
+        while True:
+            wait = self.try_acquire(weight, priority, bucket)
+            if wait <= 0:
+                return
+            if time.time() + wait > deadline:
+                raise TimeoutError(f"Limit požadavků vyčerpán ({bucket}), čekání by trvalo {wait:.1f}s")
+            time.sleep(min(wait, 1.0))
+
+    def observe(self, used_weight, bucket='spot'):
+        """Srovná stav kbelíku s váhou hlášenou burzou (x-mbx-used-weight-1m)"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, _ = self._load(conn, bucket, now)
+            tokens = min(tokens, self.capacity(bucket) - float(used_weight))
+            conn.execute(
+                "UPDATE rate_limit_buckets SET tokens = ?, updated_at = ? WHERE name = ?",
+                (tokens, now, bucket)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def penalize(self, retry_after, bucket='spot'):
+        """Zablokuje kbelík pro všechny procesy po odpovědi 429/418"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._load(conn, bucket, now)
+            conn.execute(
+                "UPDATE rate_limit_buckets SET tokens = 0, updated_at = ?, "
+                "blocked_until = MAX(blocked_until, ?) WHERE name = ?",
+                (now, now + retry_after, bucket)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.logger.warning(f"Limit požadavků překročen, pozastaveno na {retry_after}s ({bucket})")
+
+
+def _header(headers, name):
+    """Vyhledá hlavičku odpovědi bez ohledu na velikost písmen"""
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def used_weight(headers):
+    """Váha využitá za poslední minutu podle odpovědi burzy"""
+    value = _header(headers, 'x-mbx-used-weight-1m')
+    return float(value) if value is not None else None
+
+
+def retry_after(headers, default=60.0):
+    """Doba blokace v sekundách z hlavičky Retry-After"""
+    value = _header(headers, 'retry-after')
+    try:
+        return float(value) if value is not None else default
+    except ValueError:
+        return default
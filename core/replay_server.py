@@ -0,0 +1,136 @@
+# core/replay_server.py
+import json
+import asyncio
+import logging
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+import websockets
+
+
+class ReplayServer:
+    """Lokální WebSocket server přehrávající nahrané zprávy streamu
+
+    Napodobuje kombinovaný stream Binance (`/stream?streams=a/b` i přihlášení
+    dalších streamů zprávou SUBSCRIBE), takže
+    `MarketDataStream` lze testovat offline nastavením URL na
+    `ws://localhost:<port>`. Záznam je JSONL s řádky {ts, stream, data},
+    jak jej ukládá `MarketDataStream(record_path=...)`.
+    """
+
+    def __init__(self, path, host='localhost', port=8765, speed=1.0, repeat=False):
+        self.path = path
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.repeat = repeat
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.records = self._load(path)
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    def _load(self, path):
+        """Načte nahrané zprávy ze souboru"""
+        records = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+        return records
+
+    def _requested_streams(self, path):
+        query = parse_qs(urlparse(path or '').query)
+        streams = query.get('streams', [''])[0]
+        return set(filter(None, streams.split('/')))
+
+    async def _handler(self, websocket, path=None):
+        """Přehraje záznam jednomu klientovi (filtrovaný podle požadovaných streamů)"""
+        if path is None:
+            request = getattr(websocket, 'request', None)
+            path = request.path if request is not None else getattr(websocket, 'path', '')
+        streams = self._requested_streams(path)
+        listener = asyncio.ensure_future(self._listen(websocket, streams))
+
+        try:
+            while True:
+                previous = None
+                for record in self.records:
+                    if streams and record['stream'] not in streams:
+                        continue
+                    if self.speed > 0 and previous is not None:
+                        await asyncio.sleep(max(0.0, (record['ts'] - previous) / 1000.0 / self.speed))
+                    previous = record['ts']
+                    await websocket.send(json.dumps({'stream': record['stream'], 'data': record['data']}))
+                if not self.repeat:
+                    break
+            # Spojení zůstává otevřené jako u skutečné burzy
+            await websocket.wait_closed()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            listener.cancel()
+
+    async def _listen(self, websocket, streams):
+        """Zpracuje požadavky klienta SUBSCRIBE/UNSUBSCRIBE (mění filtr přehrávání)"""
+        try:
+            async for message in websocket:
+                request = json.loads(message)
+                params = request.get('params', [])
+                if request.get('method') == 'SUBSCRIBE':
+                    streams.update(params)
+                elif request.get('method') == 'UNSUBSCRIBE':
+                    streams.difference_update(params)
+                await websocket.send(json.dumps({'result': None, 'id': request.get('id')}))
+        except (websockets.ConnectionClosed, ValueError):
+            pass
+
+    async def serve(self):
+        """Spustí server a běží, dokud není ukončen"""
+        async with websockets.serve(self._handler, self.host, self.port):
+            self.logger.info(f"Přehrávání {self.path} na ws://{self.host}:{self.port}")
+            await asyncio.Future()
+
+    def start(self):
+        """Spustí server na pozadí (pro testy ve stejném procesu)"""
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(self._start_server())
+        self._thread = threading.Thread(target=self._loop.run_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        return self
+
+    async def _start_server(self):
+        return await websockets.serve(self._handler, self.host, self.port)
+
+    def stop(self):
+        """Zastaví server spuštěný přes `start`"""
+        if self._server is None:
+            return
+
+        async def _close():
+            self._server.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(_close(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lokální přehrávání nahraného streamu Binance')
+    parser.add_argument('path', help='JSONL záznam streamu')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=1.0, help='Násobek rychlosti (0 = bez prodlev)')
+    parser.add_argument('--repeat', action='store_true', help='Přehrávat záznam stále dokola')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = ReplayServer(args.path, args.host, args.port, args.speed, args.repeat)
+    asyncio.run(server.serve())
+
+
+if __name__ == '__main__':
+    main()
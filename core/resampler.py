@@ -0,0 +1,140 @@
+# core/resampler.py
+import threading
+import numpy as np
+from core.candle_mmap import CANDLE_DTYPE
+from core.timeframes import timeframe_to_ms
+
+DERIVED_TIMEFRAMES = ('5m', '15m', '30m', '1h', '4h', '1d')
+
+
+def resample(candles, timeframe_ms):
+    """Agreguje seřazené svíčky do delšího timeframu vektorově (numpy reduceat)
+
+    Svíčky se seskupí podle začátku periody (ts - ts % timeframe_ms, tj. UTC
+    zarovnání jako na burze): open = první, high = max, low = min,
+    close = poslední, volume = součet.
+    """
+    if not len(candles):
+        return np.empty(0, dtype=CANDLE_DTYPE)
+
+    buckets = candles['timestamp'] - candles['timestamp'] % timeframe_ms
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.append(starts[1:], len(candles)) - 1
+
+    result = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    result['timestamp'] = buckets[starts]
+    result['open'] = candles['open'][starts]
+    result['high'] = np.maximum.reduceat(candles['high'], starts)
+    result['low'] = np.minimum.reduceat(candles['low'], starts)
+    result['close'] = candles['close'][ends]
+    result['volume'] = np.add.reduceat(candles['volume'], starts)
+    return result
+
+
+class _Series:
+    """Rostoucí předalokované pole agregovaných svíček s přepisem konce"""
+
+    def __init__(self, capacity=256):
+        self.data = np.empty(capacity, dtype=CANDLE_DTYPE)
+        self.size = 0
+
+    def view(self):
+        return self.data[:self.size]
+
+    def replace_tail(self, keep, rows):
+        """Ponechá prvních `keep` svíček a za ně zapíše `rows`"""
+        size = keep + len(rows)
+        if size > len(self.data):
+            data = np.empty(max(size, len(self.data) * 2), dtype=CANDLE_DTYPE)
+            data[:keep] = self.data[:keep]
+            self.data = data
+        self.data[keep:size] = rows
+        self.size = size
+
+
+class TimeframePyramid:
+    """Vyšší timeframy odvozené z jediné základní (1m) řady v memmap souboru
+
+    Základní svíčky se ukládají jen jednou (`CandleFile`). Po každé změně
+    základní řady se přepočítá pouze poslední, dotčená perioda každého
+    vyššího timeframu - náklad aktualizace je úměrný délce jedné periody,
+    nikoli celé historii.
+    """
+
+    def __init__(self, candle_file, base_timeframe='1m', timeframes=DERIVED_TIMEFRAMES):
+        self.candle_file = candle_file
+        self.base_timeframe = base_timeframe
+        self.base_ms = timeframe_to_ms(base_timeframe)
+        self.timeframes = tuple(
+            tf for tf in timeframes
+            if timeframe_to_ms(tf) > self.base_ms and timeframe_to_ms(tf) % self.base_ms == 0
+        )
+        self._series = {tf: _Series() for tf in self.timeframes}
+        self._base_count = 0
+        self._base_first = None
+        self._base_last = None
+        self._base_last_ts = None
+        self._lock = threading.Lock()
+
+    def supports(self, timeframe):
+        return timeframe == self.base_timeframe or timeframe in self._series
+
+    def base_length(self):
+        return len(self.candle_file.view())
+
+    def update(self):
+        """Zapracuje nové (nebo přepsané poslední) základní svíčky"""
+        with self._lock:
+            # Souběžný přepis poslední svíčky vynutí nové čtení (seqlock souboru)
+            self.candle_file.stable(self._update)
+
+    def _update(self, base):
+        """Přepočítá dotčené periody vyšších timeframů z pohledu `base`"""
+        count = len(base)
+        if not count:
+            return
+
+        rebuild = (
+            self._base_first is None
+            or count < self._base_count
+            or base['timestamp'][0] != self._base_first
+            # Doplněné svíčky uprostřed posunou dříve poslední záznam
+            or base['timestamp'][self._base_count - 1] != self._base_last_ts
+        )
+        if rebuild:
+            start = 0
+        else:
+            # Poslední základní svíčka mohla být přepsána na místě (tvořící se svíčka)
+            start = self._base_count - 1
+            if count == self._base_count and base[-1].tobytes() == self._base_last:
+                return
+
+        first_changed = base['timestamp'][start]
+        for timeframe, series in self._series.items():
+            tf_ms = timeframe_to_ms(timeframe)
+            bucket_start = first_changed - first_changed % tf_ms
+            keep = 0 if rebuild else int(np.searchsorted(series.view()['timestamp'], bucket_start, side='left'))
+            i0 = int(np.searchsorted(base['timestamp'], bucket_start, side='left'))
+            series.replace_tail(keep, resample(base[i0:], tf_ms))
+
+        self._base_count = count
+        self._base_first = base['timestamp'][0]
+        self._base_last = base[-1].tobytes()
+        self._base_last_ts = base['timestamp'][-1]
+
+    def get(self, timeframe, limit=None, copy=False):
+        """Posledních `limit` svíček daného timeframu (pohled bez kopírování, `copy=True` vrací kopii)
+
+        Pohled na odvozenou řadu může další `update()` přepsat; kopie se
+        pořizuje pod zámkem pyramidy.
+        """
+        self.update()
+        if timeframe == self.base_timeframe:
+            if limit is None:
+                return self.candle_file.range(copy=copy)
+            return self.candle_file.latest(limit, copy)
+        with self._lock:
+            candles = self._series[timeframe].view()
+            if limit is not None:
+                candles = candles[max(0, len(candles) - limit):]
+            return np.array(candles) if copy else candles
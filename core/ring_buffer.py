@@ -0,0 +1,100 @@
+# core/ring_buffer.py
+import numpy as np
+from core.candle_mmap import CANDLE_DTYPE, to_records
+
+
+class CandleRingBuffer:
+    """Kruhový buffer posledních svíček s předalokovanou pamětí
+
+    Každá svíčka se zapisuje dvakrát (na pozici i a i + capacity), takže
+    posledních N svíček tvoří vždy souvislý úsek pole a `latest(n)` vrací
+    pohled bez kopírování. Přidání nebo přepsání svíčky nealokuje paměť.
+    Buffer je určen pro jednoho zapisovatele; čtenář, který potřebuje
+    stabilní data i po dalším zápisu, si pohled zkopíruje.
+    """
+
+    __slots__ = ('capacity', '_data', '_head', '_size')
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=CANDLE_DTYPE)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def last_timestamp(self):
+        if not self._size:
+            return None
+        return int(self._data['timestamp'][self._head - 1 + self.capacity])
+
+    def _write(self, position, candle):
+        record = self._data[position]
+        record['timestamp'] = candle[0]
+        record['open'] = candle[1]
+        record['high'] = candle[2]
+        record['low'] = candle[3]
+        record['close'] = candle[4]
+        record['volume'] = candle[5]
+        self._data[position + self.capacity] = record
+
+    def push(self, candle):
+        """Přidá novější svíčku, svíčku se stejným časem přepíše (starší ignoruje)"""
+        last = self.last_timestamp
+        if last is not None and candle[0] < last:
+            return False
+        if last is not None and candle[0] == last:
+            self._write((self._head - 1) % self.capacity, candle)
+            return True
+
+        self._write(self._head, candle)
+        self._head = (self._head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+        return True
+
+    def extend(self, candles):
+        """Přidá svíčky (seznam nebo strukturované pole); zapisuje se jen posledních `capacity`"""
+        count = len(candles)
+        if not count:
+            return 0
+        last = self.last_timestamp
+        if last is not None and candles[count - 1][0] < last:
+            return 0
+
+        start = max(0, count - self.capacity)
+        if last is not None:
+            # Přeskočení již uložených svíček (binárně pro pole)
+            if isinstance(candles, np.ndarray):
+                start = max(start, int(np.searchsorted(candles['timestamp'], last, side='left')))
+            else:
+                while start < count and candles[start][0] < last:
+                    start += 1
+
+        for i in range(start, count):
+            self.push(candles[i])
+        return count - start
+
+    def latest(self, n=None):
+        """Posledních `n` svíček jako souvislý pohled bez kopírování"""
+        n = self._size if n is None else min(n, self._size)
+        end = self._head + self.capacity
+        return self._data[end - n:end]
+
+    def column(self, name, n=None):
+        """Sloupec posledních `n` svíček (např. 'close') jako pohled"""
+        return self.latest(n)[name]
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    @classmethod
+    def from_candles(cls, candles, capacity=None):
+        """Vytvoří buffer naplněný svíčkami"""
+        records = to_records(candles)
+        buffer = cls(capacity or max(1, len(records)))
+        buffer.extend(records)
+        return buffer
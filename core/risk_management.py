@@ -1,8 +1,9 @@
 # core/risk_management.py
-import sqlite3
 import logging
 from datetime import datetime
 import numpy as np
+from core.database import get_pool
+from core.write_behind import get_writer
 
 class AdvancedRiskManager:
     def __init__(self, config, exchange):
@@ -16,31 +17,28 @@ class AdvancedRiskManager:
     @classmethod
     def _init_database(cls):
         """Inicializuje databázové tabulky pro risk management"""
-        conn = sqlite3.connect('data/trading_history.db')
-        cursor = conn.cursor()
-        
-        # Opravený SQL dotaz bez neplatného komentáře
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS risk_metrics (
-            id INTEGER PRIMARY KEY,
-            timestamp DATETIME,  -- Platný SQL komentář
-            current_balance REAL,
-            peak_balance REAL,
-            drawdown REAL,
-            risk_score REAL
-        )
-        ''')
+        with get_pool().transaction() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS risk_config (
-            id INTEGER PRIMARY KEY,
-            param_name TEXT UNIQUE,
-            param_value TEXT
-        )
-        ''')
+            # Opravený SQL dotaz bez neplatného komentáře
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS risk_metrics (
+                id INTEGER PRIMARY KEY,
+                timestamp INTEGER,  -- Platný SQL komentář
+                current_balance REAL,
+                peak_balance REAL,
+                drawdown REAL,
+                risk_score REAL
+            )
+            ''')
         
-        conn.commit()
-        conn.close()
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS risk_config (
+                id INTEGER PRIMARY KEY,
+                param_name TEXT UNIQUE,
+                param_value TEXT
+            )
+            ''')
 
 
 
@@ -75,10 +73,22 @@ class AdvancedRiskManager:
                 return risk_assessment
 
             # 4. Výpočet velikosti pozice
-            current_price = self.exchange.get_current_price(f"{self.config['base_currency']}/USDT")
+            symbol = f"{self.config['base_currency']}/USDT"
+            current_price = self.exchange.reference_price(symbol)
             position_size = self._calculate_position_size(current_balance, current_price)
             
-            # 5. Nastavení stop-loss a take-profit
+            # 5. Omezení velikosti dostupnou likviditou v knize příkazů
+            position_size, expected_fill = self._cap_by_liquidity(symbol, signal, position_size)
+            if position_size <= 0:
+                risk_assessment['reason'] = 'Nedostatečná likvidita v knize příkazů'
+                return risk_assessment
+            if expected_fill:
+                risk_assessment.update({
+                    'expected_price': expected_fill['price'],
+                    'slippage_bps': expected_fill['slippage_bps']
+                })
+            
+            # 6. Nastavení stop-loss a take-profit
             stop_loss_pct = float(self.config['risk_management']['stop_loss'].strip('%')) / 100
             take_profit_pct = float(self.config['risk_management']['take_profit'].strip('%')) / 100
             
@@ -89,7 +99,7 @@ class AdvancedRiskManager:
                 'take_profit': current_price * (1 + take_profit_pct)
             })
             
-            # 6. Záznam metrik do databáze
+            # 7. Záznam metrik do databáze
             self._log_risk_metrics(current_balance)
             
         except Exception as e:
@@ -103,21 +113,31 @@ class AdvancedRiskManager:
         max_risk = float(self.config['risk_management']['max_trade_size'])
         return min(balance * max_risk / price, balance * max_risk)
 
+    def _cap_by_liquidity(self, symbol, signal, amount):
+        """Omezí velikost pozice tak, aby skluz tržního příkazu nepřekročil max_slippage_bps"""
+        max_slippage_bps = self.config['risk_management'].get('max_slippage_bps')
+        if not max_slippage_bps or signal not in ('BUY', 'SELL'):
+            return amount, None
+        
+        book = self.exchange.get_order_book(symbol)
+        if book is None:
+            return amount, None
+        
+        side = signal.lower()
+        capped = min(amount, book.max_amount(side, max_slippage_bps))
+        if capped < amount:
+            self.logger.info(f"Velikost pozice omezena likviditou: {amount:.6f} -> {capped:.6f}")
+        return capped, book.expected_fill(side, capped) if capped > 0 else None
+
     def _update_drawdown(self, current_balance):
         """Aktualizuje hodnotu maximálního drawdownu"""
         self.peak_balance = max(self.peak_balance, current_balance)
         self.current_drawdown = abs(self.peak_balance - current_balance) / self.peak_balance
 
     def _log_risk_metrics(self, current_balance):
-        """Ukládá metriky rizik do databáze"""
+        """Ukládá metriky rizik do databáze (odloženě, mimo hodnocení rizika)"""
         try:
-            conn = sqlite3.connect(
-                'data/trading_history.db',
-                detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES
-            )
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            get_writer().put('''
             INSERT INTO risk_metrics 
             (timestamp, current_balance, peak_balance, drawdown)
             VALUES (?, ?, ?, ?)
@@ -127,9 +147,6 @@ class AdvancedRiskManager:
                 self.peak_balance,
                 self.current_drawdown
             ))
-            
-            conn.commit()
-            conn.close()
         except Exception as e:
             self.logger.error(f"Chyba při ukládání metrik: {str(e)}")
 
@@ -0,0 +1,314 @@
+# core/streaming.py
+import json
+import time
+import asyncio
+import logging
+import threading
+import websockets
+
+SPOT_STREAM_URL = 'wss://stream.binance.com:9443'
+FUTURES_STREAM_URL = 'wss://fstream.binance.com'
+
+
+def stream_symbol(symbol):
+    """Převede symbol ccxt (BNB/USDT) na název pro stream (bnbusdt)"""
+    return symbol.replace('/', '').lower()
+
+
+class MarketDataStream:
+    """WebSocket stream svíček (kline), tickerů (bookTicker, miniTicker) a hloubky trhu
+
+    Zprávy se zapisují přímo do sdíleného úložiště svíček a cache tickerů
+    a rozesílají se registrovaným posluchačům ve stejném procesu. Stream běží
+    ve vlastním vlákně se smyčkou událostí a po výpadku se znovu připojí.
+    Nové streamy se na otevřeném spojení přihlásí zprávou SUBSCRIBE, bez
+    nového připojení; bez jediného streamu se stream nepřipojuje.
+    Volitelně ukládá přijaté zprávy do JSONL (`record_path`) pro přehrání
+    přes `core.replay_server`.
+    """
+
+    def __init__(self, candle_store, ticker_cache, url=SPOT_STREAM_URL, market_type='spot',
+                 record_path=None, reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.candle_store = candle_store
+        self.ticker_cache = ticker_cache
+        self.url = url.rstrip('/')
+        self.market_type = market_type
+        self.record_path = record_path
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._streams = {}
+        self._tickers = {}
+        self._listeners = []
+        self._closed = {}
+        self._backfilled = set()
+        self._condition = threading.Condition()
+        self._lock = threading.Lock()
+
+        self._loop = None
+        self._thread = None
+        self._ws = None
+        self._wakeup = None
+        self._subscribed = set()
+        self._request_id = 0
+        self._record = None
+        self._running = False
+
+        self.connected = False
+        self.messages = 0
+        self.last_message = None
+        self.last_latency_ms = None
+
+    def subscribe(self, symbol, timeframes=(), tickers=True, depth=False):
+        """Přihlásí odběr svíček zadaných timeframů, tickerů a diff streamu knihy páru"""
+        name = stream_symbol(symbol)
+        with self._lock:
+            before = set(self._streams)
+            for timeframe in timeframes:
+                self._streams[f"{name}@kline_{timeframe}"] = ('kline', symbol, timeframe)
+            if tickers:
+                self._streams[f"{name}@bookTicker"] = ('book', symbol, None)
+                self._streams[f"{name}@miniTicker"] = ('ticker', symbol, None)
+            if depth:
+                self._streams[f"{name}@depth@100ms"] = ('depth', symbol, None)
+            changed = set(self._streams) != before
+
+        if changed and self._loop is not None:
+            # Otevřené spojení dostane SUBSCRIBE, nepřipojená smyčka se probudí
+            self._loop.call_soon_threadsafe(self._notify)
+
+    def add_listener(self, callback):
+        """Zaregistruje posluchače; volá se `callback(event)` pro každou aktualizaci"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def start(self):
+        """Spustí stream v samostatném vlákně (opakované volání nic nedělá)"""
+        if self._running:
+            return self
+        self._running = True
+        if self.record_path:
+            self._record = open(self.record_path, 'a', encoding='utf-8')
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=f'stream-{self.market_type}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Zastaví stream a uzavře spojení"""
+        self._running = False
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        if self._ws is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop).result(5)
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._record is not None:
+            self._record.close()
+            self._record = None
+
+    def is_live(self, symbol, timeframe):
+        """True, pokud stream drží svíčky páru aktuální bez dotazů přes REST"""
+        return self.connected and (symbol, timeframe) in self._backfilled
+
+    def mark_backfilled(self, symbol, timeframe):
+        """Označí pár jako dorovnaný přes REST od posledního připojení"""
+        if self.connected and f"{stream_symbol(symbol)}@kline_{timeframe}" in self._streams:
+            self._backfilled.add((symbol, timeframe))
+
+    def wait_for_candle(self, symbol, timeframe, timeout=None):
+        """Počká na uzavření další svíčky; vrací False po vypršení `timeout`"""
+        key = (symbol, timeframe)
+        with self._condition:
+            seen = self._closed.get(key, 0)
+            return self._condition.wait_for(lambda: self._closed.get(key, 0) != seen, timeout)
+
+    def _url(self, streams):
+        return f"{self.url}/stream?streams={'/'.join(sorted(streams))}"
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._ws is not None:
+            asyncio.ensure_future(self._sync_subscriptions(self._ws))
+
+    async def _sync_subscriptions(self, ws):
+        """Přihlásí na otevřeném spojení streamy přidané od připojení (metoda SUBSCRIBE)"""
+        with self._lock:
+            added = sorted(set(self._streams) - self._subscribed)
+            if not added:
+                return
+            self._subscribed.update(added)
+            self._request_id += 1
+            request_id = self._request_id
+        try:
+            await ws.send(json.dumps({'method': 'SUBSCRIBE', 'params': added, 'id': request_id}))
+        except Exception as e:
+            # Neodeslané streamy se přihlásí při dalším připojení (jsou v URL)
+            self.logger.warning(f"Přihlášení streamů selhalo: {str(e)}")
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._consume())
+        finally:
+            self._loop.close()
+
+    async def _consume(self):
+        """Přijímá zprávy a po výpadku se znovu připojuje s rostoucím zpožděním"""
+        delay = self.reconnect_delay
+        self._wakeup = asyncio.Event()
+        while self._running:
+            with self._lock:
+                streams = set(self._streams)
+            if not streams:
+                # Bez streamů se nepřipojuje - čeká se na první subscribe (nebo stop)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            was_connected = False
+            try:
+                async with websockets.connect(self._url(streams), ping_interval=20) as ws:
+                    with self._lock:
+                        self._subscribed = streams
+                    self._ws = ws
+                    self.connected = was_connected = True
+                    delay = self.reconnect_delay
+                    self.logger.info(f"Stream připojen: {self.market_type}")
+                    # Streamy přidané během připojování
+                    await self._sync_subscriptions(ws)
+                    async for message in ws:
+                        self._handle(message)
+            except Exception as e:
+                if self._running:
+                    self.logger.warning(f"Spojení se streamem přerušeno: {str(e)}")
+            finally:
+                self._ws = None
+                self.connected = False
+                if was_connected:
+                    # Během výpadku mohly chybět svíčky - je potřeba je dorovnat přes REST
+                    self._backfilled.clear()
+
+            if self._running:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _handle(self, message):
+        """Zpracuje jednu zprávu kombinovaného streamu"""
+        try:
+            payload = json.loads(message)
+            if 'id' in payload and 'stream' not in payload:
+                # Odpověď na SUBSCRIBE
+                if payload.get('error'):
+                    self.logger.error(f"Burza odmítla přihlášení streamů: {payload['error']}")
+                return
+            stream = payload.get('stream')
+            data = payload.get('data', payload)
+            received = time.time()
+            self.messages += 1
+            self.last_message = received
+
+            if self._record is not None:
+                self._record.write(json.dumps({'ts': int(received * 1000), 'stream': stream, 'data': data}) + '\n')
+
+            kind = self._streams.get(stream)
+            if kind is None:
+                return
+            if kind[0] == 'kline':
+                self._on_kline(kind[1], kind[2], data, received)
+            elif kind[0] == 'book':
+                self._on_book(kind[1], data)
+            elif kind[0] == 'depth':
+                # Diff knihy zpracovává OrderBookManager přes posluchače
+                self._publish({'type': 'depth', 'symbol': kind[1], 'market_type': self.market_type, 'data': data})
+            else:
+                self._on_ticker(kind[1], data)
+        except Exception as e:
+            self.logger.error(f"Chyba při zpracování zprávy streamu: {str(e)}")
+
+    def _on_kline(self, symbol, timeframe, data, received):
+        k = data['k']
+        candle = [int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])]
+        closed = bool(k['x'])
+
+        # Tvořící se svíčka se drží jen v paměti, na disk jde až uzavřená
+        self.candle_store.merge(symbol, timeframe, self.market_type, [candle], persist=closed)
+        if 'E' in data:
+            self.last_latency_ms = received * 1000 - data['E']
+
+        if closed:
+            with self._condition:
+                key = (symbol, timeframe)
+                self._closed[key] = self._closed.get(key, 0) + 1
+                self._condition.notify_all()
+
+        self._publish({
+            'type': 'kline',
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'market_type': self.market_type,
+            'candle': candle,
+            'closed': closed
+        })
+
+    def _on_book(self, symbol, data):
+        ticker = self._tickers.setdefault(symbol, {'symbol': symbol})
+        ticker.update({
+            'bid': float(data['b']),
+            'bidVolume': float(data['B']),
+            'ask': float(data['a']),
+            'askVolume': float(data['A'])
+        })
+        self._put_ticker(symbol, ticker)
+
+    def _on_ticker(self, symbol, data):
+        close, open_ = float(data['c']), float(data['o'])
+        ticker = self._tickers.setdefault(symbol, {'symbol': symbol})
+        ticker.update({
+            'timestamp': data.get('E'),
+            'last': close,
+            'close': close,
+            'open': open_,
+            'high': float(data['h']),
+            'low': float(data['l']),
+            'baseVolume': float(data['v']),
+            'quoteVolume': float(data['q']),
+            'change': close - open_,
+            'percentage': (close - open_) / open_ * 100 if open_ else 0.0
+        })
+        self._put_ticker(symbol, ticker)
+
+    def _put_ticker(self, symbol, ticker):
+        # Do cache jde až ticker s poslední cenou (po první zprávě miniTicker)
+        if 'last' not in ticker:
+            return
+        snapshot = dict(ticker)
+        self.ticker_cache.put(symbol, self.market_type, snapshot)
+        self._publish({
+            'type': 'ticker',
+            'symbol': symbol,
+            'market_type': self.market_type,
+            'ticker': snapshot
+        })
+
+    def _publish(self, event):
+        """Rozešle událost posluchačům (chyba posluchače neukončí stream)"""
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                self.logger.error(f"Chyba posluchače streamu: {str(e)}")
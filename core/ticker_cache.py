@@ -0,0 +1,137 @@
+# core/ticker_cache.py
+import time
+import threading
+
+
+class _PendingRequest:
+    """Probíhající dotaz na burzu, na který mohou čekat další volající"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = {}
+        self.error = None
+
+
+class TickerCache:
+    """Sdílená cache tickerů s TTL a slučováním souběžných dotazů
+
+    Souběžní volající pro stejný (market_type, symbol) sdílí jediný dotaz
+    na burzu. Hromadné obnovení přes `refresh` obslouží všechny páry
+    jedním voláním `fetch_tickers`.
+    """
+
+    def __init__(self, ttl=5.0, wait_timeout=30.0):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._tickers = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def _fresh(self, key, now):
+        entry = self._tickers.get(key)
+        if entry and now - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    def put(self, symbol, market_type, ticker, fetched_at=None):
+        """Uloží ticker (např. ze streamu) do cache"""
+        with self._lock:
+            self._tickers[(market_type, symbol)] = (fetched_at or time.time(), ticker)
+
+    def get(self, symbol, market_type, fetch):
+        """Vrátí ticker z cache nebo jej stáhne přes `fetch(symbol)`"""
+        key = (market_type, symbol)
+        with self._lock:
+            ticker = self._fresh(key, time.time())
+            if ticker is not None:
+                return ticker
+            pending = self._pending.get(key)
+            leader = pending is None
+            if leader:
+                pending = _PendingRequest()
+                self._pending[key] = pending
+
+        if not leader:
+            return self._wait(pending, symbol)
+
+        try:
+            self.requests += 1
+            pending.result = {symbol: fetch(symbol)}
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            self._complete([key], pending)
+        return pending.result[symbol]
+
+    def refresh(self, symbols, market_type, fetch_many):
+        """Hromadně obnoví tickery, které nejsou v cache čerstvé
+
+        `fetch_many(symbols)` vrací slovník symbol -> ticker.
+        """
+        now = time.time()
+        result = {}
+        waiting = []
+        keys = []
+        pending = _PendingRequest()
+
+        with self._lock:
+            for symbol in symbols:
+                key = (market_type, symbol)
+                ticker = self._fresh(key, now)
+                if ticker is not None:
+                    result[symbol] = ticker
+                elif key in self._pending:
+                    waiting.append((symbol, self._pending[key]))
+                else:
+                    self._pending[key] = pending
+                    keys.append(key)
+
+        if keys:
+            try:
+                self.requests += 1
+                pending.result = fetch_many([symbol for _, symbol in keys]) or {}
+            except Exception as e:
+                pending.error = e
+                raise
+            finally:
+                self._complete(keys, pending)
+            result.update(pending.result)
+
+        for symbol, other in waiting:
+            try:
+                result[symbol] = self._wait(other, symbol)
+            except Exception:
+                continue
+
+        return result
+
+    def _wait(self, pending, symbol):
+        """Počká na výsledek dotazu, který zahájil jiný volající"""
+        if not pending.event.wait(self.wait_timeout):
+            raise TimeoutError(f"Vypršel čas čekání na ticker {symbol}")
+        if pending.error is not None:
+            raise pending.error
+        if symbol not in pending.result:
+            raise KeyError(f"Ticker {symbol} nebyl vrácen burzou")
+        return pending.result[symbol]
+
+    def _complete(self, keys, pending):
+        """Uloží výsledek do cache a probudí čekající volající"""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                self._pending.pop(key, None)
+                ticker = pending.result.get(key[1])
+                if ticker is not None:
+                    self._tickers[key] = (now, ticker)
+        pending.event.set()
+
+    def invalidate(self, market_type=None):
+        """Zneplatní uložené tickery"""
+        with self._lock:
+            if market_type is None:
+                self._tickers.clear()
+            else:
+                for key in [k for k in self._tickers if k[0] == market_type]:
+                    del self._tickers[key]
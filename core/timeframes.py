@@ -0,0 +1,32 @@
+# core/timeframes.py
+import time
+
+TIMEFRAME_UNITS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+
+def timeframe_to_ms(timeframe):
+    """Převede timeframe ve formátu burzy (např. '15m', '4h') na milisekundy"""
+    try:
+        amount, unit = int(timeframe[:-1]), timeframe[-1]
+        return amount * TIMEFRAME_UNITS[unit]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Neplatný timeframe: {timeframe}")
+
+
+def last_closed_timestamp(candles, timeframe, now_ms=None):
+    """Vrátí časovou značku poslední uzavřené svíčky (nebo None)"""
+    if candles is None or len(candles) == 0:
+        return None
+
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    duration = timeframe_to_ms(timeframe)
+
+    for candle in reversed(candles):
+        if candle[0] + duration <= now_ms:
+            return candle[0]
+    return None
@@ -0,0 +1,43 @@
+# core/windowing.py
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def sliding_windows(values, window, dtype=np.float32, drop_last=False):
+    """Vrátí klouzavá okna jako pohled bez kopírování dat
+
+    `values` může být 1D (jedna veličina) nebo 2D (řádky = čas, sloupce =
+    veličiny). Výsledek má tvar (počet_oken, window, počet_veličin) a sdílí
+    paměť se vstupem převedeným na `dtype` - nová paměť se alokuje pouze při
+    převodu typu, nikoli pro každé okno.
+
+    `drop_last=True` vynechá okno končící posledním řádkem (okno `i` pak
+    odpovídá `values[i:i+window]` s cílem na řádku `i+window`).
+    """
+    arr = np.asarray(values, dtype=dtype)
+    if arr.ndim == 1:
+        arr = arr.reshape(-1, 1)
+
+    if len(arr) < window:
+        return np.empty((0, window, arr.shape[1]), dtype=dtype)
+
+    # sliding_window_view vrací tvar (N-window+1, veličiny, window)
+    windows = sliding_window_view(arr, window, axis=0).transpose(0, 2, 1)
+    if drop_last:
+        windows = windows[:-1]
+    return windows
+
+
+def materialize(windows):
+    """Zkopíruje okna do souvislého pole (např. pro predikci modelu)"""
+    return np.ascontiguousarray(windows)
+
+
+def iter_batches(windows, batch_size, targets=None):
+    """Postupně materializuje okna po dávkách, aby se nekopírovala celá historie"""
+    for start in range(0, len(windows), batch_size):
+        batch = materialize(windows[start:start + batch_size])
+        if targets is None:
+            yield batch
+        else:
+            yield batch, targets[start:start + batch_size]
@@ -0,0 +1,215 @@
+# core/write_behind.py
+import time
+import queue
+import atexit
+import logging
+import sqlite3
+import threading
+from itertools import groupby
+
+from core.database import DB_PATH, get_pool
+
+# Sdílené fronty v rámci procesu (cesta -> WriteBehindQueue)
+_WRITERS = {}
+_WRITERS_LOCK = threading.Lock()
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Odložený dávkový zápis do SQLite mimo kritickou cestu obchodování
+
+    `put()` jen vloží příkaz do omezené fronty; vlákno na pozadí sbírá
+    příkazy nejvýše `flush_interval` sekund (nebo do `batch_size`)
+    a zapíše je v jedné transakci přes `executemany`. Plná fronta zdrží
+    volajícího nejvýše `block_timeout` sekund, potom se záznam zahodí.
+    Zdržení i zahozené záznamy jsou vidět ve `stats()`.
+    """
+
+    def __init__(self, pool=None, max_size=10000, batch_size=500, flush_interval=0.5, block_timeout=1.0):
+        self.pool = pool or get_pool()
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._queue = queue.Queue(max_size)
+        self._pending = 0
+        self._done = threading.Condition()
+        self._running = True
+
+        # Metriky zpětného tlaku
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self.batches = 0
+        self.max_depth = 0
+        self.last_batch_ms = None
+
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def put(self, sql, params=()):
+        """Zařadí zapisovací příkaz; vrací False, pokud byl záznam zahozen"""
+        if not self._running:
+            # Po uzavření fronty se zapisuje přímo
+            try:
+                self.pool.execute(sql, params)
+                return True
+            except Exception as e:
+                self.logger.error(f"Chyba při zápisu do databáze: {str(e)}")
+                return False
+
+        with self._done:
+            self._pending += 1
+        item = (sql, params)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            started = time.monotonic()
+            try:
+                self._queue.put(item, timeout=self.block_timeout)
+            except queue.Full:
+                self._finish(1)
+                self.dropped += 1
+                self.logger.warning(f"Fronta zápisu je plná ({self.max_size}), záznam zahozen")
+                return False
+            finally:
+                self.blocked += 1
+                self.blocked_seconds += time.monotonic() - started
+
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _finish(self, count):
+        with self._done:
+            self._pending -= count
+            if self._pending <= 0:
+                self._done.notify_all()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                break
+
+            # Sběr dávky do batch_size nebo uplynutí flush_interval
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            self._finish(len(batch))
+
+    def _write(self, batch):
+        """Zapíše dávku v jedné transakci (souvislé běhy stejného SQL přes executemany)"""
+        started = time.monotonic()
+        try:
+            with self.pool.transaction() as conn:
+                for sql, rows in groupby(batch, key=lambda item: item[0]):
+                    conn.executemany(sql, [params for _, params in rows])
+            self.written += len(batch)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Dávkový zápis selhal, zapisuji po záznamech: {str(e)}")
+            self._write_each(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            self.logger.error(f"Chyba při dávkovém zápisu: {str(e)}")
+        self.batches += 1
+        self.last_batch_ms = (time.monotonic() - started) * 1000
+
+    def _write_each(self, batch):
+        """Záložní zápis po jednom - chybný záznam neshodí zbytek dávky"""
+        try:
+            with self.pool.transaction() as conn:
+                for sql, params in batch:
+                    try:
+                        conn.execute(sql, params)
+                        self.written += 1
+                    except sqlite3.Error as e:
+                        self.failed += 1
+                        self.logger.error(f"Chyba při zápisu do databáze: {str(e)}")
+        except Exception as e:
+            self.logger.error(f"Chyba při zápisu do databáze: {str(e)}")
+
+    def flush(self, timeout=None):
+        """Počká na zapsání všech zařazených záznamů; vrací False po vypršení `timeout`"""
+        with self._done:
+            return self._done.wait_for(lambda: self._pending <= 0, timeout)
+
+    def close(self, timeout=10):
+        """Zapíše zbytek fronty a ukončí vlákno (další `put` zapisuje přímo)"""
+        if not self._running:
+            return True
+        flushed = self.flush(timeout)
+        self._running = False
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if not flushed:
+            self.logger.warning(f"Fronta zápisu nebyla vyprázdněna, nezapsáno: {self._pending}")
+        return flushed
+
+    def stats(self):
+        """Metriky fronty (hloubka, propustnost, zdržení a ztráty)"""
+        return {
+            'depth': self._queue.qsize(),
+            'max_depth': self.max_depth,
+            'max_size': self.max_size,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'blocked': self.blocked,
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            'batches': self.batches,
+            'avg_batch': round(self.written / self.batches, 1) if self.batches else 0.0,
+            'last_batch_ms': self.last_batch_ms,
+        }
+
+
+def get_writer(path=DB_PATH, **kwargs):
+    """Sdílená fronta zápisu pro danou databázi (při ukončení procesu se vyprázdní)"""
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(path)
+        if writer is None:
+            writer = WriteBehindQueue(get_pool(path), **kwargs)
+            _WRITERS[path] = writer
+        return writer
+
+
+def close_writers(timeout=10):
+    """Vyprázdní a ukončí všechny sdílené fronty zápisu"""
+    with _WRITERS_LOCK:
+        writers = list(_WRITERS.values())
+        _WRITERS.clear()
+    for writer in writers:
+        writer.close(timeout)
+
+
+atexit.register(close_writers)
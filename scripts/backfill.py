@@ -0,0 +1,102 @@
+# scripts/backfill.py
+import os
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.history_archive import HistoryArchive, Backfiller
+from core.rate_limiter import WeightedRateLimiter
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('backfill')
+
+
+def parse_date(value):
+    """Datum YYYY-MM-DD (UTC) na časovou značku v ms"""
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def load_config():
+    with open("config/config.yaml", "r", encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def build_clients(config, args):
+    """Klienti burzy (nebo syntetická burza) se sdíleným limitem vah"""
+    api_settings = config.get('api_settings', {})
+    rate_limiter = WeightedRateLimiter(
+        db_path=api_settings.get('rate_limit_db', 'data/rate_limit.db'),
+        weight_limits=api_settings.get('weight_limits'),
+        order_reserve=api_settings.get('order_weight_reserve', 0.2),
+        max_wait=120
+    )
+
+    if args.synthetic:
+        from core.synthetic_exchange import SyntheticExchange
+        return SyntheticExchange(rate_limiter=rate_limiter if args.synthetic_limits else None)
+
+    from decouple import config as env_config
+    from core.client_pool import ExchangeClientPool
+    from core.market_cache import MarketCache
+    client_config = {
+        'apiKey': env_config('BINANCE_API_KEY', default=''),
+        'secret': env_config('BINANCE_API_SECRET', default=''),
+        'enableRateLimit': True,
+        'timeout': 30000
+    }
+    market_cache = MarketCache(
+        api_settings.get('market_cache_path', 'data/markets'),
+        ttl=api_settings.get('market_cache_ttl', 86400)
+    )
+    return ExchangeClientPool(client_config, rate_limiter=rate_limiter, market_cache=market_cache)
+
+
+def main():
+    config = load_config()
+    history = config.get('history', {})
+
+    parser = argparse.ArgumentParser(description='Stažení historických svíček do archivu')
+    parser.add_argument('--symbols', nargs='+', default=history.get('symbols', [f"{config['base_currency']}/USDT"]))
+    parser.add_argument('--timeframes', nargs='+', default=history.get('timeframes', ['15m']))
+    parser.add_argument('--start', default=history.get('start', '2023-01-01'), help='Počáteční datum YYYY-MM-DD')
+    parser.add_argument('--end', default=None, help='Koncové datum YYYY-MM-DD (výchozí: teď)')
+    parser.add_argument('--market-type', default=config.get('market_type', 'spot'))
+    parser.add_argument('--archive', default=history.get('archive_path', 'data/history'))
+    parser.add_argument('--workers', type=int, default=history.get('workers', 4))
+    parser.add_argument('--page-limit', type=int, default=1000)
+    parser.add_argument('--synthetic', action='store_true', help='Offline režim se syntetickou burzou')
+    parser.add_argument('--synthetic-limits', action='store_true', help='Syntetická burza čerpá ze sdíleného limitu vah')
+    args = parser.parse_args()
+
+    backfiller = Backfiller(
+        build_clients(config, args),
+        HistoryArchive(args.archive),
+        market_type=args.market_type,
+        page_limit=args.page_limit,
+        workers=args.workers
+    )
+
+    started = time.time()
+    results = backfiller.run(
+        args.symbols, args.timeframes,
+        parse_date(args.start),
+        parse_date(args.end) if args.end else None
+    )
+
+    for (symbol, timeframe), count in sorted(results.items()):
+        status = 'chyba' if count is None else f"{count} svíček"
+        logger.info(f"{symbol} {timeframe}: {status}")
+    logger.info(f"Hotovo za {time.time() - started:.1f}s")
+    return 0 if all(count is not None for count in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+# scripts/check_live_window.py
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.exchange import BinanceConnector
+from core.synthetic_exchange import SyntheticExchange
+
+
+def check(exchange, symbol, timeframe, limit, timeout):
+    """Studený start: živé okno se musí doplnit, jakmile doběhne dotažení historie na pozadí
+
+    Vrací (délka okna, délka okna get_timeframe) po posledním pokusu.
+    """
+    deadline = time.time() + timeout
+    while True:
+        window = exchange.live_window(symbol, timeframe, limit=limit)
+        source = exchange.get_timeframe(symbol, timeframe, limit, sync=False)
+        if len(window) >= limit or time.time() > deadline:
+            return len(window), len(source)
+        time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regresní kontrola živého okna při studeném startu (syntetická burza)')
+    parser.add_argument('--symbol', default='BTC/USDT')
+    parser.add_argument('--timeframe', default='15m')
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--timeout', type=float, default=30.0, help='Nejdelší čekání na dotažení historie (s)')
+    args = parser.parse_args()
+
+    # Prázdný adresář - základní řada ještě neexistuje a nasazuje se na pozadí
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            exchange = BinanceConnector({'mode': 'dry'})
+            exchange.clients = SyntheticExchange()
+            try:
+                window, source = check(exchange, args.symbol, args.timeframe, args.limit, args.timeout)
+            finally:
+                exchange.close()
+        finally:
+            os.chdir(cwd)
+
+    status = 'OK' if window >= args.limit else 'CHYBA'
+    print(f"{status:5} live_window {args.symbol} {args.timeframe}: {window}/{args.limit} (get_timeframe: {source})")
+    return 0 if window >= args.limit else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
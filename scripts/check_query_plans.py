@@ -0,0 +1,157 @@
+# scripts/check_query_plans.py
+import os
+import re
+import sys
+import random
+import itertools
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import queries
+from core.database import ConnectionPool, migrate, ms_ago, day_start_ms
+
+# Úplný sken tabulky je v pořádku jen přes pokrývající index, u malých tabulek
+# nebo jako průchod indexem pro ORDER BY ... LIMIT bez WHERE (skončí po LIMIT řádcích)
+SCAN = re.compile(r'^SCAN (\w+)(.*)$')
+TOP_N = re.compile(r'\bORDER BY\b.*\bLIMIT\b', re.S)
+TEMP_SORT = 'USE TEMP B-TREE'
+
+# Tabulky, jejichž celý sken je v pořádku (denní souhrny mají O(dní) řádků,
+# aktivních pozic je jen několik)
+SCAN_ALLOWED = ('trade_rollups', 'active_positions')
+
+
+def cases():
+    """Dotazy aplikace ze sdíleného modulu core.queries jako (název, SQL, parametry)
+
+    Dotazy s volitelnými filtry se kontrolují ve všech kombinacích.
+    """
+    checked = [
+        ('trade_history', queries.TRADE_HISTORY, (10,)),
+        ('equity_range', queries.EQUITY_RANGE, (ms_ago(days=7),)),
+        ('equity_curve', queries.EQUITY_CURVE, ()),
+        ('equity_market', queries.EQUITY_MARKET, ('spot',)),
+        ('last_signal', queries.LAST_SIGNAL, ('BTC/USDT', 'spot')),
+        ('performance_dashboard', queries.DAILY_ROLLUPS, ()),
+        ('position_by_id', queries.POSITION_BY_ID, (1,)),
+        ('delete_position', queries.DELETE_POSITION, (1,)),
+        ('close_open_trade', queries.CLOSE_OPEN_TRADES, (1.0, 0.0, 'BTC/USDT', 'BUY')),
+        ('bot_status', queries.BOT_STATUS, ()),
+    ]
+    for market in (None, 'spot'):
+        suffix = '_market' if market else ''
+        checked += [
+            ('trade_page' + suffix, *queries.trade_history_query(market)),
+            ('positions' + suffix, *queries.active_positions_query(market)),
+            ('bot_decisions' + suffix, *queries.bot_decisions_query(market)),
+            ('rollup_totals' + suffix, *queries.rollup_totals_query(market)),
+            ('daily_profit' + suffix, *queries.daily_profit_query(ms_ago(days=1), market)),
+        ]
+    for since, symbol, market in itertools.product((None, day_start_ms(7)), (None, 'BTC/USDT'), (None, 'spot')):
+        suffix = ('_since' if since else '') + ('_symbol' if symbol else '') + ('_market' if market else '')
+        rollup_sql, rollup_params, histogram_sql, params = queries.performance_analytics_query(since, symbol, market)
+        checked += [
+            ('performance_analytics' + suffix, rollup_sql, rollup_params),
+            ('profit_histogram' + suffix, histogram_sql, params),
+        ]
+    return checked
+
+
+def populate(pool, rows):
+    """Naplní tabulky náhodnými daty, aby plánovač pracoval s realistickými statistikami"""
+    symbols = ['BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'SOL/USDT']
+    markets = ['spot', 'futures']
+    now = datetime.now()
+    random.seed(42)
+
+    def when():
+        return now - timedelta(minutes=random.randint(0, 365 * 24 * 60))
+
+    with pool.transaction() as conn:
+        conn.executemany(
+            """INSERT INTO trades (timestamp, symbol, side, amount, entry_price, exit_price, profit, status, market_type)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (when(), random.choice(symbols), random.choice(['BUY', 'SELL']), 1.0, 100.0, 101.0,
+                 random.uniform(-5, 5), random.choice(['CLOSED'] * 9 + ['OPEN']), random.choice(markets))
+                for _ in range(rows)
+            ]
+        )
+        conn.executemany(
+            """INSERT INTO decisions (timestamp, symbol, signal, confidence, action_taken, market_type)
+            VALUES (?, ?, ?, ?, ?, ?)""",
+            [
+                (when(), random.choice(symbols), random.choice(['BUY', 'SELL', 'HOLD']), 0.5, 'Pending',
+                 random.choice(markets))
+                for _ in range(rows)
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO equity (timestamp, equity_value, market_type) VALUES (?, ?, ?)",
+            [(when(), 10000.0, random.choice(markets)) for _ in range(rows // 10)]
+        )
+        conn.execute('ANALYZE')
+
+
+def _is_bad_scan(detail, sql):
+    match = SCAN.match(detail)
+    if match is None:
+        return False
+    table, access = match.groups()
+    if table in SCAN_ALLOWED or 'USING COVERING INDEX' in access:
+        return False
+    # Průchod indexem v pořadí ORDER BY s LIMIT a bez filtru přečte jen LIMIT řádků
+    return not ('USING INDEX' in access and TOP_N.search(sql) and not re.search(r'\bWHERE\b', sql))
+
+
+def check(pool):
+    """Vrátí seznam (název, problémy, plán) pro dotazy s nepokrytým skenem nebo dočasným řazením"""
+    failures = []
+    with pool.connection() as conn:
+        for name, sql, params in cases():
+            plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+            problems = [
+                detail for detail in plan
+                if _is_bad_scan(detail, sql) or detail.startswith(TEMP_SORT)
+            ]
+            status = 'CHYBA' if problems else 'OK'
+            print(f"{status:5} {name:40} {' | '.join(plan)}")
+            if problems:
+                failures.append((name, problems, plan))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regresní kontrola plánů dotazů (EXPLAIN QUERY PLAN)')
+    parser.add_argument('--db', help='Zkontrolovat existující databázi (výchozí: nová dočasná databáze)')
+    parser.add_argument('--rows', type=int, default=20000, help='Počet vygenerovaných obchodů a rozhodnutí')
+    args = parser.parse_args()
+
+    if args.db:
+        pool = ConnectionPool(args.db, size=1)
+        with pool.transaction() as conn:
+            migrate(conn)
+        return 1 if check(pool) else 0
+
+    # Schéma vytvoří skutečná inicializace databáze v prázdném adresáři
+    # (import až po změně adresáře, aby se nepsalo do logů projektu)
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            from scripts.init_database import init_database
+            init_database()
+            pool = ConnectionPool(os.path.join(workdir, 'data', 'trading_history.db'), size=1)
+            populate(pool, args.rows)
+            failures = check(pool)
+            pool.close()
+        finally:
+            os.chdir(cwd)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# scripts/import_budget.py
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Maximální kumulativní doba importu v ms
+BUDGETS = {
+    'core': 50,
+    'strategies': 50,
+    'ai': 50,
+    'core.exchange': 1500,
+    'ai.prediction_api': 1500,
+}
+
+# Moduly, které se při importu balíčku nesmí načíst
+FORBIDDEN = ('tensorflow', 'keras', 'sklearn', 'talib')
+
+
+def measure(module):
+    """Změří import modulu přes `python -X importtime` v čistém procesu
+
+    Proces běží v prázdném dočasném adresáři - jakýkoli vytvořený soubor
+    (databáze, log) znamená I/O při importu.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=cwd, env=env, capture_output=True, text=True
+        )
+        created = sorted(os.listdir(cwd))
+
+    imported = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = [part.strip() for part in line[len('import time:'):].split('|')]
+        if parts[0].isdigit():
+            imported[parts[2]] = int(parts[1]) / 1000
+
+    return {
+        'ok': result.returncode == 0,
+        'error': result.stderr.strip().splitlines()[-1] if result.returncode else None,
+        'ms': imported.get(module),
+        'forbidden': sorted(name for name in imported if name.split('.')[0] in FORBIDDEN),
+        'created': created,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kontrola doby importu balíčků (python -X importtime)')
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS))
+    parser.add_argument('--repeat', type=int, default=3, help='Počet měření (bere se nejrychlejší)')
+    args = parser.parse_args()
+
+    failures = 0
+    for module in args.modules:
+        runs = [measure(module) for _ in range(args.repeat)]
+        result = min(runs, key=lambda run: run['ms'] if run['ms'] is not None else float('inf'))
+        budget = BUDGETS.get(module)
+
+        problems = []
+        if not result['ok']:
+            problems.append(f"import selhal: {result['error']}")
+        elif budget is not None and result['ms'] > budget:
+            problems.append(f"překročen limit {budget} ms")
+        if result['forbidden']:
+            problems.append(f"načteno: {', '.join(result['forbidden'])}")
+        if result['created']:
+            problems.append(f"I/O při importu: {', '.join(result['created'])}")
+
+        elapsed = f"{result['ms']:.1f} ms" if result['ms'] is not None else '-'
+        status = 'CHYBA' if problems else 'OK'
+        print(f"{status:5} {module:20} {elapsed:>10}  {'; '.join(problems)}")
+        failures += bool(problems)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
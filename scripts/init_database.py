@@ -9,6 +9,10 @@ import sys
 import yaml
 import time
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import get_pool, migrate, to_datetime
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -33,84 +37,82 @@ def init_database():
         db_exists = os.path.exists('data/trading_history.db')
         
         # Připojení k databázi s timeoutem
-        conn = sqlite3.connect('data/trading_history.db', timeout=60)
-        cursor = conn.cursor()
+        with get_pool().transaction() as conn:
+            cursor = conn.cursor()
 
-        # Tabulka pro obchody
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS trades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME NOT NULL,
-            symbol TEXT NOT NULL,
-            side TEXT NOT NULL,
-            amount REAL NOT NULL,
-            entry_price REAL NOT NULL,
-            exit_price REAL,
-            profit REAL,
-            status TEXT NOT NULL,
-            market_type TEXT NOT NULL DEFAULT 'spot'
-        )''')
+            # Tabulka pro obchody
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                side TEXT NOT NULL,
+                amount REAL NOT NULL,
+                entry_price REAL NOT NULL,
+                exit_price REAL,
+                profit REAL,
+                status TEXT NOT NULL,
+                market_type TEXT NOT NULL DEFAULT 'spot'
+            )''')
 
-        # Tabulka equity
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS equity (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME NOT NULL,
-            equity_value REAL NOT NULL,
-            market_type TEXT NOT NULL DEFAULT 'spot'
-        )''')
+            # Tabulka equity
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS equity (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                equity_value REAL NOT NULL,
+                market_type TEXT NOT NULL DEFAULT 'spot'
+            )''')
 
-        # Tabulka pro rozhodnutí
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS decisions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME NOT NULL,
-            symbol TEXT NOT NULL,
-            signal TEXT NOT NULL,
-            confidence REAL NOT NULL,
-            action_taken TEXT NOT NULL,
-            market_type TEXT NOT NULL DEFAULT 'spot'
-        )''')
+            # Tabulka pro rozhodnutí
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS decisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                signal TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                action_taken TEXT NOT NULL,
+                market_type TEXT NOT NULL DEFAULT 'spot'
+            )''')
         
-        # Tabulka pro aktivní pozice
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS active_positions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            symbol TEXT NOT NULL,
-            direction TEXT NOT NULL,
-            amount REAL NOT NULL,
-            entry_price REAL NOT NULL,
-            stop_loss REAL,
-            take_profit REAL,
-            timestamp DATETIME NOT NULL,
-            market_type TEXT NOT NULL DEFAULT 'spot'
-        )''')
+            # Tabulka pro aktivní pozice
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS active_positions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                symbol TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                amount REAL NOT NULL,
+                entry_price REAL NOT NULL,
+                stop_loss REAL,
+                take_profit REAL,
+                timestamp INTEGER NOT NULL,
+                market_type TEXT NOT NULL DEFAULT 'spot'
+            )''')
         
-        # Tabulka pro konfiguraci bota
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS bot_config (
-                id INTEGER PRIMARY KEY,
-                key TEXT UNIQUE NOT NULL,
-                value TEXT NOT NULL
-            )
-        """)
+            # Tabulka pro konfiguraci bota
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS bot_config (
+                    id INTEGER PRIMARY KEY,
+                    key TEXT UNIQUE NOT NULL,
+                    value TEXT NOT NULL
+                )
+            """)
         
-        cursor.execute("""
-            INSERT OR IGNORE INTO bot_config (id, key, value) VALUES 
-            (1, 'is_running', 'false')
-        """)
-        conn.commit()
+            cursor.execute("""
+                INSERT OR IGNORE INTO bot_config (id, key, value) VALUES 
+                (1, 'is_running', 'false')
+            """)
 
-        logger.info("Základní schéma databáze vytvořeno")
+            logger.info("Základní schéma databáze vytvořeno")
 
-        # Kontrola a aktualizace schématu
-        update_database_schema(conn)
+            # Kontrola a aktualizace schématu
+            update_database_schema(conn)
+            migrate(conn)
         
-        # Import testovacích dat pouze pokud databáze neexistovala
-        if not db_exists:
-            import_exchange_data(conn)
-            
-        conn.close()
+            # Import testovacích dat pouze pokud databáze neexistovala
+            if not db_exists:
+                import_exchange_data(conn)
         logger.info("Databáze úspěšně inicializována")
 
     except Exception as e:
@@ -125,9 +127,9 @@ def get_trade_history(limit=10):
     
     while attempt < max_attempts:
         try:
-            conn = sqlite3.connect('data/trading_history.db', timeout=60)
-            df = pd.read_sql(f"SELECT * FROM trades ORDER BY timestamp DESC LIMIT {limit}", conn)
-            conn.close()
+            with get_pool().connection() as conn:
+                df = pd.read_sql(f"SELECT * FROM trades ORDER BY timestamp DESC LIMIT {limit}", conn)
+            df['timestamp'] = to_datetime(df['timestamp'])
             return df.to_dict('records') if not df.empty else []
         except sqlite3.OperationalError as e:
             attempt += 1
@@ -143,14 +145,13 @@ def get_trade_history(limit=10):
 
 def update_database_schema(conn=None):
     """Aktualizuje schéma databáze pro novější verze"""
+    if conn is None:
+        with get_pool().connection() as conn:
+            return update_database_schema(conn)
+
     logger.info("Kontrola aktualizací schématu...")
     
     try:
-        should_close = False
-        if conn is None:
-            conn = sqlite3.connect('data/trading_history.db', timeout=60)
-            should_close = True
-        
         cursor = conn.cursor()
 
         # 1. Kontrola sloupce market_type v tabulce equity
@@ -189,21 +190,17 @@ def update_database_schema(conn=None):
         conn.commit()
         logger.info("Schéma databáze je aktuální")
 
-        if should_close:
-            conn.close()
-
     except Exception as e:
         logger.error(f"Chyba při aktualizaci schématu: {str(e)}")
         logger.error("Podrobnosti: ", exc_info=True)
 
 def import_exchange_data(conn=None):
     """Generuje testovací data pro všechny trhy"""
-    logger.info("Import historických dat...")
-    
-    should_close = False
     if conn is None:
-        conn = sqlite3.connect('data/trading_history.db', timeout=60)
-        should_close = True
+        with get_pool().connection() as conn:
+            return import_exchange_data(conn)
+
+    logger.info("Import historických dat...")
     
     try:
         config = load_config()
@@ -213,8 +210,6 @@ def import_exchange_data(conn=None):
         cursor.execute("SELECT COUNT(*) FROM equity")
         if cursor.fetchone()[0] > 0:
             logger.info("Data již existují, import přeskočen")
-            if should_close:
-                conn.close()
             return
 
         # Vygenerování equity dat
@@ -274,9 +269,6 @@ def import_exchange_data(conn=None):
     except Exception as e:
         logger.error(f"Chyba při importu dat: {str(e)}")
         logger.error("Podrobnosti: ", exc_info=True)
-    finally:
-        if should_close and conn:
-            conn.close()
 
 def calculate_profit(side, amount, entry_price):
     """Vypočítá náhodný profit pro testovací data"""
@@ -1,6 +1,24 @@
 # strategies/__init__.py
-from .base_strategy import BaseStrategy
-from .rsi_strategy import RSIStrategy
-from .ml_strategy import MLStrategy
+import importlib
+
+# Strategie se načítají až při prvním přístupu (PEP 562) - MLStrategy táhne TensorFlow
+_LAZY = {
+    'BaseStrategy': '.base_strategy',
+    'RSIStrategy': '.rsi_strategy',
+    'MLStrategy': '.ml_strategy',
+}
 
 __all__ = ['BaseStrategy', 'RSIStrategy', 'MLStrategy']
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 
 class BaseStrategy(ABC):
     @abstractmethod
-    def analyze(self, data):
+    def analyze(self, data, symbol=None):
         pass
 
     @abstractmethod
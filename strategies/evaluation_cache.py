@@ -0,0 +1,41 @@
+# strategies/evaluation_cache.py
+import threading
+
+
+class EvaluationCache:
+    """Cache výsledků analýzy platná do uzavření další svíčky
+
+    Pro každý (symbol, timeframe) drží jediný záznam s klíčem
+    (symbol, timeframe, časová značka poslední uzavřené svíčky, verze modelu).
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol, timeframe, candle_timestamp, model_version):
+        """Vrátí uložený report, pokud od jeho výpočtu nebyla uzavřena nová svíčka"""
+        key = (symbol, timeframe, candle_timestamp, model_version)
+        with self._lock:
+            entry = self._entries.get((symbol, timeframe))
+            if entry and entry[0] == key:
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+            return None
+
+    def put(self, symbol, timeframe, candle_timestamp, model_version, report):
+        """Uloží report pro poslední uzavřenou svíčku"""
+        key = (symbol, timeframe, candle_timestamp, model_version)
+        with self._lock:
+            self._entries[(symbol, timeframe)] = (key, dict(report))
+
+    def invalidate(self, symbol=None, timeframe=None):
+        """Zneplatní záznamy (všechny nebo pro daný symbol a timeframe)"""
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((symbol, timeframe), None)
@@ -2,11 +2,14 @@ import numpy as np
 import pandas as pd
 import logging
 import os
-import sqlite3
 import time
 from datetime import datetime
 from core.data_processor import DataProcessor
-from tensorflow.keras.models import load_model
+from core.database import get_pool
+from core.write_behind import get_writer
+from core.ring_buffer import CandleRingBuffer
+from core.timeframes import last_closed_timestamp
+from strategies.evaluation_cache import EvaluationCache
 
 class MLStrategy:
     def __init__(self, model_path: str, **kwargs):
@@ -26,6 +29,10 @@ class MLStrategy:
         self.lookback_window = self.config.get('lookback_window', 60)
         self.timeframe = self.config.get('timeframe', '15m')
         self.dynamic_threshold = self.config.get('dynamic_threshold', True)
+        self.intrabar_scoring = self.config.get('intrabar_scoring', False)
+        
+        # Cache výsledků do uzavření další svíčky
+        self.evaluation_cache = EvaluationCache()
         
         # Inicializace databáze pro ukládání predikci
         self._init_database()
@@ -34,27 +41,38 @@ class MLStrategy:
 
     def _init_database(self):
         """Inicializace databáze pro ukládání predikcí a signálů"""
-        conn = sqlite3.connect('data/trading_history.db')
-        cursor = conn.cursor()
+        with get_pool().transaction() as conn:
+            cursor = conn.cursor()
         
-        # Tabulka pro predikce modelu
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS model_predictions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME,
-            symbol TEXT,
-            prediction REAL,
-            confidence REAL,
-            signal TEXT
-        )
-        ''')
+            # Tabulka pro predikce modelu
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS model_predictions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER,
+                symbol TEXT,
+                prediction REAL,
+                confidence REAL,
+                signal TEXT
+            )
+            ''')
         
-        conn.commit()
-        conn.close()
+            # Tabulka rozhodnutí (zápisy jdou přes frontu, tabulka musí existovat předem)
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS decisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp INTEGER,
+                symbol TEXT,
+                signal TEXT,
+                confidence REAL,
+                action_taken TEXT
+            )
+            ''')
 
     def _load_model(self):
         """Načte model z disku"""
         try:
+            # TensorFlow se načítá až s modelem, ne při importu strategie
+            from tensorflow.keras.models import load_model
             model = load_model(self.model_path)
             self.model_version = os.path.getmtime(self.model_path)
             self.logger.info(f"Model {self.model_path} úspěšně načten")
@@ -63,24 +81,38 @@ class MLStrategy:
             self.logger.error(f"Chyba při načítání modelu: {str(e)}")
             raise
 
-    def analyze(self, data):
-        """Provede predikci a vrátí strukturovaný výsledek"""
+    def analyze(self, data, symbol=None):
+        """Provede predikci a vrátí strukturovaný výsledek
+
+        Predikce nad uzavřenými svíčkami se počítá jen jednou za svíčku,
+        mezi uzavřeními se vrací uložený výsledek. V režimu `intrabar_scoring`
+        se při každém ticku přepočítá pouze tvořící se svíčka.
+        """
         try:
-            if len(data) < 180:
-                return {
-                    'signal': 'HOLD',
-                    'confidence': 0.0,
-                    'error': 'Nedostatek dat pro analýzu: potřebováno 180 svíček'
-                }
-
-            processed_data = self.preprocess_data(data)
-            prediction = self.model.predict(processed_data)[0][0]
-            
-            return {
-                'signal': 'BUY' if prediction > 0.5 else 'SELL',
-                'confidence': abs(prediction - 0.5) * 2,
-                'error': None
-            }
+            symbol = symbol or 'UNKNOWN'
+            if isinstance(data, CandleRingBuffer):
+                data = data.latest()
+            closed_ts = last_closed_timestamp(data, self.timeframe)
+            # Tvořící se svíčky jsou jen na konci - řez funguje pro seznam i memmap pole bez kopie
+            closed_count = len(data)
+            while closed_count and (closed_ts is None or data[closed_count - 1][0] > closed_ts):
+                closed_count -= 1
+            closed_data = data[:closed_count]
+
+            report = self.evaluation_cache.get(symbol, self.timeframe, closed_ts, self.model_version)
+            if report is None:
+                report = self._evaluate(closed_data)
+                report['candle_timestamp'] = closed_ts
+                if report['error'] is None:
+                    self.evaluation_cache.put(symbol, self.timeframe, closed_ts, self.model_version, report)
+
+            if self.intrabar_scoring and report['error'] is None and len(closed_data) < len(data):
+                # Přepočet pouze tvořící se svíčky nad uloženým výsledkem uzavřených svíček
+                intrabar = self._evaluate(data)
+                if intrabar['error'] is None:
+                    report.update(signal=intrabar['signal'], confidence=intrabar['confidence'], intrabar=True)
+
+            return report
             
         except Exception as e:
             return {
@@ -89,10 +121,35 @@ class MLStrategy:
                 'error': f"Chyba v analýze: {str(e)}"
             }
 
+    def _evaluate(self, data):
+        """Spočítá predikci modelu pro dané svíčky"""
+        if len(data) < 180:
+            return {
+                'signal': 'HOLD',
+                'confidence': 0.0,
+                'error': 'Nedostatek dat pro analýzu: potřebováno 180 svíček'
+            }
+
+        # Jediný dopředný průchod nad posledním oknem
+        processed_data = self._preprocess_data(data)
+        if len(processed_data) == 0:
+            return {
+                'signal': 'HOLD',
+                'confidence': 0.0,
+                'error': 'Nepodařilo se připravit vstupní okno modelu'
+            }
+        prediction = float(self.model.predict(processed_data, verbose=0)[0][0])
+        
+        return {
+            'signal': 'BUY' if prediction > 0.5 else 'SELL',
+            'confidence': abs(prediction - 0.5) * 2,
+            'error': None
+        }
+
 
     def _preprocess_data(self, raw_data):
-        """Předzpracování dat pro predikční model"""
-        return self.data_processor.process_data(raw_data)
+        """Předzpracování posledního okna dat pro predikční model"""
+        return self.data_processor.process_latest(raw_data)
 
     def _interpret_prediction(self, prediction):
         """Interpretace hodnoty predikce na obchodní signál"""
@@ -108,15 +165,12 @@ class MLStrategy:
         return "HOLD"
 
     def _save_prediction(self, prediction, symbol=None):
-        """Uloží predikci do databáze"""
+        """Uloží predikci do databáze (odloženě přes frontu zápisu)"""
         if not symbol:
             symbol = "UNKNOWN"
             
         try:
-            conn = sqlite3.connect('data/trading_history.db')
-            cursor = conn.cursor()
-            
-            cursor.execute(
+            get_writer().put(
                 """
                 INSERT INTO model_predictions (timestamp, symbol, prediction, confidence, signal)
                 VALUES (?, ?, ?, ?, ?)
@@ -130,35 +184,16 @@ class MLStrategy:
                 )
             )
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             self.logger.error(f"Chyba při ukládání predikce: {str(e)}")
 
     def _save_decision(self, signal, prediction, symbol=None):
-        """Uloží rozhodnutí do databáze"""
+        """Uloží rozhodnutí do databáze (odloženě přes frontu zápisu)"""
         if not symbol:
             symbol = "UNKNOWN"
             
         try:
-            conn = sqlite3.connect('data/trading_history.db')
-            cursor = conn.cursor()
-            
-            # Kontrola, zda tabulka decisions existuje
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS decisions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME,
-                symbol TEXT,
-                signal TEXT,
-                confidence REAL,
-                action_taken TEXT
-            )
-            ''')
-            
-            # Uložení rozhodnutí
-            cursor.execute(
+            get_writer().put(
                 """
                 INSERT INTO decisions (timestamp, symbol, signal, confidence, action_taken)
                 VALUES (?, ?, ?, ?, ?)
@@ -172,9 +207,6 @@ class MLStrategy:
                 )
             )
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             self.logger.error(f"Chyba při ukládání rozhodnutí: {str(e)}")
 
@@ -202,7 +234,8 @@ class MLStrategy:
             'confidence_threshold': self.confidence_threshold,
             'timeframe': self.timeframe,
             'lookback_window': self.lookback_window,
-            'dynamic_threshold': self.dynamic_threshold
+            'dynamic_threshold': self.dynamic_threshold,
+            'intrabar_scoring': self.intrabar_scoring
         }
 
     def set_params(self, **params):
@@ -211,6 +244,9 @@ class MLStrategy:
             if hasattr(self, key):
                 setattr(self, key, value)
                 
+        # Uložené výsledky platí jen pro původní parametry
+        self.evaluation_cache.invalidate()
+                
         # Pokud se změnila cesta k modelu, znovu načteme model
         if 'model_path' in params:
             self._load_model()
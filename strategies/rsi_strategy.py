@@ -1,8 +1,9 @@
 # strategies/rsi_strategy.py
-import talib
 import numpy as np
 from strategies.base_strategy import BaseStrategy
 from core.data_processor import DataProcessor
+from core.indicators import IndicatorEngine
+from core.ring_buffer import CandleRingBuffer
 from ai.model_loader import ModelLoader
 
 class RSIStrategy(BaseStrategy):
@@ -20,61 +21,73 @@ class RSIStrategy(BaseStrategy):
         self.ai_confirmation = ai_confirmation
         self.ai_model = ModelLoader('ai/models/rsi_boost_model.h5').load() if ai_confirmation else None
         self.data_processor = DataProcessor()
+        self._engines = {}
 
-    def analyze(self, data):
-        df = self.data_processor.process_data(data)
-        
-        # Výpočet indikátorů
-        df['rsi'] = talib.RSI(df['close'], timeperiod=self.rsi_period)
-        df['ema_short'] = talib.EMA(df['close'], timeperiod=self.ema_short)
-        df['ema_long'] = talib.EMA(df['close'], timeperiod=self.ema_long)
-        df['volume_ma'] = talib.SMA(df['volume'], timeperiod=20)
-        
-        # Generování základních signálů
-        df['base_signal'] = 0
-        df.loc[
-            (df['rsi'] < 30) & 
-            (df['ema_short'] > df['ema_long']) & 
-            (df['volume'] > df['volume_ma'] * self.volume_threshold), 
-            'base_signal'
-        ] = 1  # Nákup
+    def analyze(self, data, symbol=None):
+        if isinstance(data, CandleRingBuffer):
+            data = data.latest()
+        # Inkrementální výpočet indikátorů - přepočítají se jen nové svíčky
+        latest = self._engine(symbol).ingest(data)
+        if latest is None:
+            return "HOLD"
+
+        rsi = latest['rsi']
+        ema_short = latest[f'ema_{self.ema_short}']
+        ema_long = latest[f'ema_{self.ema_long}']
+        volume_ma = latest['volume_sma']
         
-        df.loc[
-            (df['rsi'] > 70) & 
-            (df['ema_short'] < df['ema_long']), 
-            'base_signal'
-        ] = -1  # Prodej
+        # Generování základního signálu pro nejnovější svíčku
+        base_signal = 0
+        if rsi < 30 and ema_short > ema_long and latest['volume'] > volume_ma * self.volume_threshold:
+            base_signal = 1  # Nákup
+        elif rsi > 70 and ema_short < ema_long:
+            base_signal = -1  # Prodej
         
         # AI potvrzení signálů
-        if self.ai_confirmation:
-            df = self._apply_ai_filter(df)
+        latest_signal = base_signal
+        if self.ai_confirmation and base_signal != 0:
+            latest_signal = self._apply_ai_filter(symbol, latest, base_signal)
             
         # Rozhodovací logika
-        latest_signal = df['final_signal'].iloc[-1]
-        
         if latest_signal == 1:
             return "BUY"
         elif latest_signal == -1:
             return "SELL"
         return "HOLD"
 
-    def _apply_ai_filter(self, df):
-        # Příprava vstupních dat pro AI model
-        features = df[['close', 'volume', 'rsi', 'ema_short', 'ema_long']]
-        features = (features - features.mean()) / features.std()  # Normalizace
+    def warm_up(self, candle_store, symbol, timeframe, market_type='spot'):
+        """Obnoví stav indikátorů z lokálního úložiště svíček"""
+        self._engines[symbol] = IndicatorEngine.from_candle_store(
+            candle_store, symbol, timeframe, market_type, **self._engine_params()
+        )
+
+    def _engine_params(self):
+        return {
+            'rsi_period': self.rsi_period,
+            'ema_periods': (self.ema_short, self.ema_long),
+            'volume_sma_period': 20,
+        }
+
+    def _engine(self, symbol):
+        """Vrátí (případně vytvoří) indikátorový engine pro daný symbol"""
+        if symbol not in self._engines:
+            self._engines[symbol] = IndicatorEngine(**self._engine_params())
+        return self._engines[symbol]
+
+    def _apply_ai_filter(self, symbol, latest, base_signal):
+        # Příprava vstupních dat pro AI model (posledních 100 období + aktuální svíčka)
+        columns = ['close', 'volume', 'rsi', f'ema_{self.ema_short}', f'ema_{self.ema_long}']
+        rows = list(self._engine(symbol).history)
+        if not rows or rows[-1]['timestamp'] != latest['timestamp']:
+            rows.append(latest)
+        features = np.array([[row[col] for col in columns] for row in rows[-100:]], dtype=float)
+        features = (features - np.nanmean(features, axis=0)) / np.nanstd(features, axis=0, ddof=1)  # Normalizace
         
-        # Predikce
-        predictions = self.ai_model.predict(features.values[-100:])  # Použij posledních 100 období
-        df['ai_confidence'] = predictions
+        # Predikce pouze pro nejnovější svíčku
+        ai_confidence = float(self.ai_model.predict(features[-1:])[0][0])
         
         # Kombinace signálů
-        df['final_signal'] = np.where(
-            (df['base_signal'] != 0) & (df['ai_confidence'] > 0.65),
-            df['base_signal'],
-            0
-        )
-        
-        return df
+        return base_signal if ai_confidence > 0.65 else 0
 
     def get_params(self):
         return {
@@ -89,3 +102,5 @@ class RSIStrategy(BaseStrategy):
         for key, value in params.items():
             if hasattr(self, key):
                 setattr(self, key, value)
+        # Změna period vyžaduje nový výpočet indikátorů
+        self._engines.clear()
@@ -3,7 +3,8 @@ import dash
 from dash import dcc, html, Input, Output
 import plotly.express as px
 import pandas as pd
-import sqlite3
+from core.database import get_pool
+from core.queries import DAILY_ROLLUPS
 import logging
 
 # Konfigurace loggeru
@@ -46,10 +47,10 @@ def create_dashboard(app):
     def update_metrics(n):
         """Aktualizuje metriky výkonu"""
         try:
-            conn = sqlite3.connect('data/trading_history.db', timeout=30)
-            query = "SELECT timestamp, profit FROM trades ORDER BY timestamp ASC"
-            df = pd.read_sql(query, conn, parse_dates=['timestamp'])
-            conn.close()
+            with get_pool().connection() as conn:
+                # Denní souhrny místo všech obchodů (O(dní) řádků)
+                df = pd.read_sql(DAILY_ROLLUPS, conn)
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
 
             if df.empty:
                 logger.warning("Prázdná databáze")
@@ -93,10 +94,10 @@ def create_dashboard(app):
             return 0.0
 
     def calculate_win_rate(df):
-        """Vypočítá Win Rate na základě obchodů"""
+        """Vypočítá Win Rate na základě denních souhrnů obchodů"""
         try:
-            win_trades = len(df[df['profit'] > 0])
-            total_trades = len(df)
+            win_trades = df['wins'].sum()
+            total_trades = df['trades'].sum()
             return win_trades / total_trades if total_trades > 0 else 0.0
         except Exception as e:
             logger.error(f"Chyba při výpočtu Win Rate: {str(e)}")
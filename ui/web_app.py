@@ -1,6 +1,5 @@
 # ui/web_app.py
 import logging
-import threading
 logging.basicConfig(level=logging.INFO)
 from dash.exceptions import PreventUpdate
 import dash
@@ -8,13 +7,15 @@ from dash import ctx, dcc, html, Input, Output, State, callback_context
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
-import sqlite3
 import os
 from datetime import datetime, timedelta
 from flask_login import LoginManager, UserMixin, login_user, logout_user, current_user, login_required
 import flask
 from werkzeug.security import generate_password_hash, check_password_hash
 from core.exchange import BinanceConnector
+from core.candle_mmap import candles_to_frame
+from core.database import get_pool, migrate, to_datetime, to_epoch_ms, ms_ago, day_start_ms, day_bucket
+from core import queries
 import yaml
 import traceback
 import dash_bootstrap_components as dbc
@@ -97,36 +98,35 @@ def load_user(user_id):
 
 # Inicializace databáze
 def init_database():
-    conn = sqlite3.connect('data/trading_history.db')
-    cursor = conn.cursor()
+    with get_pool().transaction() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS trades (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp DATETIME,
-        symbol TEXT,
-        side TEXT,
-        amount REAL,
-        entry_price REAL,
-        exit_price REAL,
-        profit REAL,
-        status TEXT,
-        market_type TEXT
-    )''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER,
+            symbol TEXT,
+            side TEXT,
+            amount REAL,
+            entry_price REAL,
+            exit_price REAL,
+            profit REAL,
+            status TEXT,
+            market_type TEXT
+        )''')
     
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS decisions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp DATETIME,
-        symbol TEXT,
-        signal TEXT,
-        confidence REAL,
-        action_taken TEXT,
-        market_type TEXT
-    )''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS decisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER,
+            symbol TEXT,
+            signal TEXT,
+            confidence REAL,
+            action_taken TEXT,
+            market_type TEXT
+        )''')
     
-    conn.commit()
-    conn.close()
+        migrate(conn)
 
 #init_database()
 
@@ -891,35 +891,20 @@ def render_content(tab):
     elif tab == 'logs':
         return create_logs_layout()
 
-DB_POOL = {}
-
-def get_db_connection():
-    """Získá spojení z poolu nebo vytvoří nové"""
-    thread_id = threading.get_ident()
-    if thread_id not in DB_POOL:
-        DB_POOL[thread_id] = sqlite3.connect('data/trading_history.db', timeout=60)
-    return DB_POOL[thread_id]
-
 # Funkce pro získání obchodní historie z databáze
 def get_trade_history(limit=10):
     """Získá historii obchodů z databáze"""
-    conn = None
-
     try:
-        conn = get_db_connection()
-        query = """
-        SELECT timestamp, side, symbol, amount, entry_price, profit, market_type
-        FROM trades
-        ORDER BY timestamp DESC LIMIT ?"""
-        
-        df = pd.read_sql(query, conn, params=(limit,))
-        if conn:
-            conn.commit()
+        # Spojení ze sdíleného omezeného poolu (vrací se po dotazu)
+        with get_pool().connection() as conn:
+            df = pd.read_sql(queries.TRADE_HISTORY, conn, params=(limit,))
         
         # Kontrola prázdného DataFrame
         if df.empty:
             return []
-            
+        
+        # Epoch ms -> čas jedním vektorovým převodem
+        df['timestamp'] = to_datetime(df['timestamp'])
         return df.to_dict('records')
     except Exception as e:
         logger.error(f"Chyba při získávání obchodní historie: {str(e)}")
@@ -928,15 +913,9 @@ def get_trade_history(limit=10):
 # Funkce pro získání equity křivky z databáze
 def get_equity_data(days=7):
     try:
-        conn = get_db_connection()
-        query = """
-        SELECT timestamp, equity_value 
-        FROM equity 
-        WHERE timestamp >= datetime('now', '-{} days')
-        ORDER BY timestamp
-        """.format(days)
-        df = pd.read_sql(query, conn)
-        conn.close()
+        with get_pool().connection() as conn:
+            df = pd.read_sql(queries.EQUITY_RANGE, conn, params=(ms_ago(days=days),))
+        df['timestamp'] = to_datetime(df['timestamp'])
         
         # Pokud nemáme data, vytvoříme ukázková data
         if df.empty:
@@ -956,18 +935,16 @@ def get_equity_data(days=7):
             })
             
             # Uložíme vygenerovaná data do databáze
-            conn = sqlite3.connect('data/trading_history.db')
-            for i in range(len(df)):
-                try:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "INSERT INTO equity (timestamp, equity_value) VALUES (?, ?)",
-                        (df['timestamp'][i], df['equity_value'][i])
-                    )
-                except:
-                    pass  # Ignorujeme případné duplicity
-            conn.commit()
-            conn.close()
+            with get_pool().transaction() as conn:
+                for i in range(len(df)):
+                    try:
+                        cursor = conn.cursor()
+                        cursor.execute(
+                            "INSERT INTO equity (timestamp, equity_value) VALUES (?, ?)",
+                            (to_epoch_ms(df['timestamp'][i]), df['equity_value'][i])
+                        )
+                    except:
+                        pass  # Ignorujeme případné duplicity
         
         return df
     except Exception as e:
@@ -977,11 +954,10 @@ def get_equity_data(days=7):
 def create_equity_curve(market_type=None):
     """Vytvoří graf equity křivky na základě historických dat"""
     try:
-        conn = sqlite3.connect('data/trading_history.db')
-        # Odstraněn filtr podle market_type, který způsobuje chybu
-        query = "SELECT timestamp, equity_value FROM equity ORDER BY timestamp ASC"
-        df = pd.read_sql(query, conn, parse_dates=['timestamp'])
-        conn.close()
+        with get_pool().connection() as conn:
+            # Odstraněn filtr podle market_type, který způsobuje chybu
+            df = pd.read_sql(queries.EQUITY_CURVE, conn)
+        df['timestamp'] = to_datetime(df['timestamp'])
         
         if df.empty:
             fig = go.Figure()
@@ -1001,10 +977,9 @@ def create_equity_curve(market_type=None):
  
 def update_database_schema(conn=None):
     """Aktualizuje schéma databáze pro kompatibilitu s novějšími verzemi"""
-    should_close = False
     if conn is None:
-        conn = sqlite3.connect('data/trading_history.db')
-        should_close = True
+        with get_pool().connection() as conn:
+            return update_database_schema(conn)
     
     cursor = conn.cursor()
     
@@ -1016,23 +991,15 @@ def update_database_schema(conn=None):
         logger.info("Přidávám chybějící sloupec market_type do tabulky equity")
         cursor.execute("ALTER TABLE equity ADD COLUMN market_type TEXT DEFAULT 'spot'")
         conn.commit()
-    
-    if should_close:
-        conn.close()
 
 def create_performance_gauge(metrics=None):
     """Vytvoří gauge graf pro vizualizaci výkonnosti"""
     try:
         # Získání denní změny, pokud není v metrics
         if not metrics:
-            conn = sqlite3.connect('data/trading_history.db')
-            query = """
-            SELECT SUM(profit) as daily_profit
-            FROM trades
-            WHERE timestamp >= datetime('now', '-1 day')
-            """
-            df = pd.read_sql(query, conn)
-            conn.close()
+            query, params = queries.daily_profit_query(ms_ago(days=1))
+            with get_pool().connection() as conn:
+                df = pd.read_sql(query, conn, params=params)
             daily_profit = df['daily_profit'].values[0] if not pd.isna(df['daily_profit'].values[0]) else 0
         else:
             daily_profit = metrics.get('daily_profit', 0)
@@ -1092,14 +1059,8 @@ def generate_trade_history_table(trades):
     rows.append(header)
     
     for trade in trades:
-        timestamp = trade['timestamp']
-        if isinstance(timestamp, str):
-            timestamp = datetime.fromisoformat(trade['timestamp'])
-        else:
-            timestamp = datetime.strptime(trade['timestamp'], '%Y-%m-%dT%H:%M:%S.%f')
-            
         rows.append(html.Tr([
-            html.Td(timestamp),
+            html.Td(f"{trade['timestamp']:%Y-%m-%d %H:%M:%S}"),
             html.Td(trade['side'], style={'color': 'green' if trade['side'] == 'BUY' else 'red'}),
             html.Td(trade['symbol']),
             html.Td(f"{trade['amount']:.4f}"),
@@ -1129,18 +1090,12 @@ def generate_trade_table(trades):
 def calculate_performance_metrics(market_type=None):
     """Vypočítá výkonnostní metriky na základě historie obchodů"""
     try:
-        conn = sqlite3.connect('data/trading_history.db')
-        query = "SELECT profit FROM trades WHERE status = 'CLOSED'"
-        params = []
-        
-        if market_type:
-            query += " AND market_type = ?"
-            params.append(market_type)
-            
-        df = pd.read_sql(query, conn, params=params)
-        conn.close()
+        # Součty z denních souhrnů (O(dní) řádků místo všech obchodů)
+        query, params = queries.rollup_totals_query(market_type)
+        with get_pool().connection() as conn:
+            total_trades, win_trades, lose_trades, total_profit, gross_loss = conn.execute(query, params).fetchone()
         
-        total_trades = len(df)
+        total_trades = total_trades or 0
         
         if total_trades == 0:
             return {
@@ -1150,30 +1105,16 @@ def calculate_performance_metrics(market_type=None):
                 'daily_profit': 0
             }
             
-        win_trades = len(df[df['profit'] > 0])
-        
         win_rate = (win_trades / total_trades) * 100 if total_trades > 0 else 0
         
-        total_profit = df[df['profit'] > 0]['profit'].sum() if not df[df['profit'] > 0].empty else 0
-        total_loss = abs(df[df['profit'] <= 0]['profit'].sum()) if not df[df['profit'] <= 0].empty else 1
+        total_loss = gross_loss if lose_trades else 1
         
         profit_factor = total_profit / total_loss if total_loss > 0 else total_profit
         
-        # Pro gauge graf vypočítáme 24h profit
-        conn = sqlite3.connect('data/trading_history.db')
-        query = """
-        SELECT SUM(profit) as daily_profit
-        FROM trades
-        WHERE timestamp >= datetime('now', '-1 day')
-        """
-        if market_type:
-            query += " AND market_type = ?"
-            params = [market_type]
-        else:
-            params = []
-            
-        daily_df = pd.read_sql(query, conn, params=params)
-        conn.close()
+        # Pro gauge graf vypočítáme 24h profit (klouzavé okno - rozsah nad indexem)
+        query, params = queries.daily_profit_query(ms_ago(days=1), market_type)
+        with get_pool().connection() as conn:
+            daily_df = pd.read_sql(query, conn, params=params)
         
         daily_profit = daily_df['daily_profit'].values[0] if not pd.isna(daily_df['daily_profit'].values[0]) else 0
         
@@ -1197,11 +1138,13 @@ def update_charts(n, market_type):
     try:
         # Získání dat
         df = exchange.get_real_time_data('BTC/USDT')
-        equity_df = pd.read_sql(
-            "SELECT timestamp, equity_value FROM equity WHERE market_type = ?", 
-            sqlite3.connect('data/trading_history.db'),
-            params=[market_type]
-        )
+        with get_pool().connection() as conn:
+            equity_df = pd.read_sql(
+                queries.EQUITY_MARKET,
+                conn,
+                params=[market_type]
+            )
+        equity_df['timestamp'] = to_datetime(equity_df['timestamp'])
         
         # Vytvoření grafů
         price_fig = create_price_chart(df)
@@ -1282,16 +1225,12 @@ def update_dashboard(n_intervals, timeframe, asset, market_type, session_data):
         if None in (timeframe, asset, market_type):
             raise ValueError("Nebyly vybrány všechny parametry")
 
-        # Získání dat z API nebo databáze
-        raw_data = exchange.get_real_time_data(
+        # Svíčky ze sdíleného memmap souboru (bez parsování do seznamů)
+        df = candles_to_frame(exchange.get_timeframe(
             symbol=asset,
             timeframe=timeframe,
             market_type=market_type
-        )
-
-        # Zpracování dat
-        df = pd.DataFrame(raw_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        ))
 
         # Výpočet indikátorů
         df['sma20'] = df['close'].rolling(20).mean()
@@ -1300,7 +1239,7 @@ def update_dashboard(n_intervals, timeframe, asset, market_type, session_data):
         # Vytvoření grafu
         fig = go.Figure()
         fig.add_trace(go.Candlestick(
-            x=df['timestamp'],
+            x=df.index,
             open=df['open'],
             high=df['high'],
             low=df['low'],
@@ -1382,15 +1321,15 @@ def update_multi_charts(_, pairs, timeframe, market_type):
     
     charts = []
     
+    # Souběžná synchronizace základní 1m řady všech párů, vyšší timeframy se odvodí lokálně
+    exchange.get_real_time_data_many(
+        pairs, timeframe=config.get('resampling', {}).get('base_timeframe', '1m'), limit=2, market_type=market_type
+    )
+    
     for pair in pairs:
         try:
-            # Získání dat
-            raw_data = exchange.get_real_time_data(symbol=pair, timeframe=timeframe, market_type=market_type)
-            
-            # Zpracování dat
-            df = pd.DataFrame(raw_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
+            # Svíčky ze sdíleného memmap souboru
+            df = candles_to_frame(exchange.get_timeframe(pair, timeframe, market_type=market_type, sync=False))
             
             # Výpočet EMA
             df['ema20'] = df['close'].ewm(span=20, adjust=False).mean()
@@ -1465,23 +1404,20 @@ def update_performance_table(_, pairs, market_type):
         html.Th("Signal")
     ])]
     
+    # Jedno hromadné obnovení tickerů pro všechny páry
+    exchange.refresh_tickers(pairs, market_type)
+    
     for pair in pairs:
         try:
             current_price = exchange.get_current_price(pair, market_type=market_type)
             daily_change = exchange.get_24h_change(pair, market_type=market_type)
             
             # Získání posledního signálu z databáze
-            conn = sqlite3.connect('data/trading_history.db')
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT signal FROM decisions 
-                WHERE symbol = ? AND market_type = ?
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            """, (pair, market_type))
-            result = cursor.fetchone()
-            signal = result[0] if result else "HOLD"
-            conn.close()
+            with get_pool().connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(queries.LAST_SIGNAL, (pair, market_type))
+                result = cursor.fetchone()
+                signal = result[0] if result else "HOLD"
             
             # Barva pro signál
             signal_color = 'green' if signal == 'BUY' else ('red' if signal == 'SELL' else '#ffcc00')
@@ -1523,62 +1459,47 @@ def update_performance_table(_, pairs, market_type):
 )
 def update_performance_analytics(_, time_range, pair, market_type):
     try:
-        # Sestavení filtru SQL dotazu
-        conditions = []
-        params = []
-        
-        # Filtr podle času
+        # Filtr podle času (celé dny UTC, stejné jako klíč `day` souhrnů)
+        since = None
         if time_range == 'today':
-            conditions.append("timestamp >= date('now')")
+            since = day_start_ms()
         elif time_range == '7days':
-            conditions.append("timestamp >= date('now', '-7 days')")
+            since = day_start_ms(7)
         elif time_range == '30days':
-            conditions.append("timestamp >= date('now', '-30 days')")
-        
-        # Filtr podle páru
-        if pair != 'all':
-            conditions.append("symbol = ?")
-            params.append(pair)
-        
-        # Filtr podle typu trhu
-        if market_type != 'all':
-            conditions.append("market_type = ?")
-            params.append(market_type)
+            since = day_start_ms(30)
         
-        # Sestavení WHERE klauzule
-        where_clause = ""
-        if conditions:
-            where_clause = "WHERE " + " AND ".join(conditions)
-        
-        # Získání dat z databáze
-        conn = sqlite3.connect('data/trading_history.db')
+        # Souhrny filtrují podle dne, histogram podle času - oba jen uzavřené obchody
+        rollup_query, rollup_params, histogram_query, params = queries.performance_analytics_query(
+            since,
+            pair if pair != 'all' else None,
+            market_type if market_type != 'all' else None
+        )
         
-        # Získání seznamu obchodů
-        query = f"""
-        SELECT timestamp, symbol, side, amount, entry_price, exit_price, profit, market_type
-        FROM trades
-        {where_clause}
-        ORDER BY timestamp
-        """
-        trades_df = pd.read_sql(query, conn, params=params, parse_dates=['timestamp'])
+        # Získání dat z databáze (jen čtení)
+        with get_pool().connection() as conn:
+            # Denní souhrny uzavřených obchodů (den × pár × trh) místo všech obchodů
+            rollups_df = pd.read_sql(rollup_query, conn, params=rollup_params)
+            
+            # Pro histogram stačí sloupec profit (bez převodu časů)
+            profits = pd.read_sql(histogram_query, conn, params=params)['profit']
         
         # Pokud nemáme data, vytvoříme ukázková data
-        if trades_df.empty:
+        if rollups_df.empty:
             # Vytvoření ukázkových obchodů
             np.random.seed(42)  # Pro konzistenci
-            
+        
             start_date = datetime.now() - timedelta(days=30)
             dates = [start_date + timedelta(hours=i*8) for i in range(20)]
-            
+        
             symbols = [pair] if pair != 'all' else np.random.choice(['BNB/USDT', 'BTC/USDT', 'ETH/USDT'], 20)
             sides = np.random.choice(['BUY', 'SELL'], 20)
             amounts = np.random.uniform(0.1, 1.0, 20)
-            
+        
             entry_prices = np.random.uniform(100, 500, 20)
             exit_prices = [price * (1 + np.random.normal(0.01, 0.05)) for price in entry_prices]
             profits = [(exit_prices[i] - entry_prices[i]) * amounts[i] for i in range(20)]
             market_types = [market_type] if market_type != 'all' else np.random.choice(['spot', 'futures'], 20)
-            
+        
             trades_df = pd.DataFrame({
                 'timestamp': dates,
                 'symbol': symbols,
@@ -1589,45 +1510,56 @@ def update_performance_analytics(_, time_range, pair, market_type):
                 'profit': profits,
                 'market_type': market_types
             })
-            
-            # Uložení ukázkových dat do databáze
-            for _, trade in trades_df.iterrows():
-                try:
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                    INSERT INTO trades (timestamp, symbol, side, amount, entry_price, exit_price, profit, status, market_type)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        trade['timestamp'], 
-                        trade['symbol'], 
-                        trade['side'], 
-                        trade['amount'], 
-                        trade['entry_price'], 
-                        trade['exit_price'], 
-                        trade['profit'],
-                        'CLOSED',
-                        trade['market_type']
-                    ))
-                except:
-                    pass  # Ignorujeme duplicity
-            
-            conn.commit()
         
-        conn.close()
+            # Uložení ukázkových dat do databáze (samostatná zapisovací transakce)
+            with get_pool().transaction() as conn:
+                cursor = conn.cursor()
+                for _, trade in trades_df.iterrows():
+                    try:
+                        cursor.execute("""
+                        INSERT INTO trades (timestamp, symbol, side, amount, entry_price, exit_price, profit, status, market_type)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """, (
+                            to_epoch_ms(trade['timestamp']), 
+                            trade['symbol'], 
+                            trade['side'], 
+                            trade['amount'], 
+                            trade['entry_price'], 
+                            trade['exit_price'], 
+                            trade['profit'],
+                            'CLOSED',
+                            trade['market_type']
+                        ))
+                    except:
+                        pass  # Ignorujeme duplicity
+            
+            # Ukázková data ve stejném tvaru jako souhrny
+            rollups_df = pd.DataFrame({
+                'day': [day_bucket(to_epoch_ms(ts)) for ts in trades_df['timestamp']],
+                'symbol': trades_df['symbol'],
+                'trades': 1,
+                'wins': (trades_df['profit'] > 0).astype(int),
+                'losses': (trades_df['profit'] <= 0).astype(int),
+                'gross_profit': trades_df['profit'].clip(lower=0),
+                'gross_loss': (-trades_df['profit']).clip(lower=0)
+            })
+            profits = trades_df['profit']
         
-        # Výpočet kumulativního P&L
-        trades_df['cumulative_pnl'] = trades_df['profit'].cumsum()
+        # Denní P&L a kumulativní P&L (O(dní) bodů)
+        daily = rollups_df.groupby('day', sort=True)[['trades', 'wins', 'losses', 'gross_profit', 'gross_loss']].sum()
+        daily['pnl'] = daily['gross_profit'] - daily['gross_loss']
+        daily['cumulative_pnl'] = daily['pnl'].cumsum()
         
         # Vytvoření P&L grafu
         pnl_fig = go.Figure()
         
         pnl_fig.add_trace(go.Scatter(
-            x=trades_df['timestamp'],
-            y=trades_df['cumulative_pnl'],
+            x=pd.to_datetime(daily.index, unit='ms'),
+            y=daily['cumulative_pnl'],
             mode='lines',
             fill='tozeroy',
-            line=dict(color='#00ff88' if trades_df['cumulative_pnl'].iloc[-1] >= 0 else '#ff5555', width=2),
-            fillcolor='rgba(0, 255, 136, 0.1)' if trades_df['cumulative_pnl'].iloc[-1] >= 0 else 'rgba(255, 85, 85, 0.1)'
+            line=dict(color='#00ff88' if daily['cumulative_pnl'].iloc[-1] >= 0 else '#ff5555', width=2),
+            fillcolor='rgba(0, 255, 136, 0.1)' if daily['cumulative_pnl'].iloc[-1] >= 0 else 'rgba(255, 85, 85, 0.1)'
         ))
         
         pnl_fig.update_layout(
@@ -1640,29 +1572,22 @@ def update_performance_analytics(_, time_range, pair, market_type):
             margin=dict(l=20, r=20, t=40, b=20)
         )
         
-        # Výpočet metrik
-        total_profit = trades_df['profit'].sum()
-        win_trades = trades_df[trades_df['profit'] > 0]
-        lose_trades = trades_df[trades_df['profit'] <= 0]
-        
-        win_rate = len(win_trades) / len(trades_df) * 100 if len(trades_df) > 0 else 0
+        # Výpočet metrik ze souhrnů
+        total_profit = daily['pnl'].sum()
+        total_trades = daily['trades'].sum()
+        gross_profit = daily['gross_profit'].sum()
+        gross_loss = daily['gross_loss'].sum()
         
-        profit_factor = abs(win_trades['profit'].sum() / lose_trades['profit'].sum()) if len(lose_trades) > 0 and lose_trades['profit'].sum() != 0 else float('inf')
+        win_rate = daily['wins'].sum() / total_trades * 100 if total_trades > 0 else 0
         
-        # Výpočet maximálního drawdownu
-        cumulative = trades_df['cumulative_pnl'].values
-        max_drawdown = 0
-        peak = cumulative[0]
+        profit_factor = gross_profit / gross_loss if daily['losses'].sum() > 0 and gross_loss != 0 else float('inf')
         
-        for value in cumulative[1:]:
-            if value > peak:
-                peak = value
-            drawdown = peak - value
-            if drawdown > max_drawdown:
-                max_drawdown = drawdown
+        # Výpočet maximálního drawdownu (na denních uzávěrkách)
+        cumulative = daily['cumulative_pnl']
+        max_drawdown = max((cumulative.cummax() - cumulative).max(), 0)
         
         # Rozdělení obchodů podle symbolu
-        trade_distribution = trades_df['symbol'].value_counts()
+        trade_distribution = rollups_df.groupby('symbol')['trades'].sum().sort_values(ascending=False)
         
         trade_dist_fig = go.Figure()
         trade_dist_fig.add_trace(go.Bar(
@@ -1685,14 +1610,14 @@ def update_performance_analytics(_, time_range, pair, market_type):
         profit_bins = [-float('inf'), -50, -20, -5, 0, 5, 20, 50, float('inf')]
         profit_labels = ['< -50', '-50 to -20', '-20 to -5', '-5 to 0', '0 to 5', '5 to 20', '20 to 50', '> 50']
         
-        trades_df['profit_category'] = pd.cut(
-            trades_df['profit'], 
+        profit_category = pd.cut(
+            profits, 
             bins=profit_bins, 
             labels=profit_labels, 
             right=False
         )
         
-        profit_counts = trades_df['profit_category'].value_counts().reindex(profit_labels)
+        profit_counts = profit_category.value_counts().reindex(profit_labels)
         
         profit_dist_fig = go.Figure()
         
@@ -1810,17 +1735,12 @@ def update_logs(_, log_level, search_text, market_type):
 def update_active_positions(_, market_type):
     try:
         # Vytvoření SQL dotazu s filtrem podle typu trhu
-        query = "SELECT * FROM active_positions"
-        params = []
-        
-        if market_type != 'all':
-            query += " WHERE market_type = ?"
-            params.append(market_type)
+        query, params = queries.active_positions_query(market_type if market_type != 'all' else None)
             
         # Získání dat z databáze
-        conn = sqlite3.connect('data/trading_history.db')
-        active_positions = pd.read_sql(query, conn, params=params)
-        conn.close()
+        with get_pool().connection() as conn:
+            active_positions = pd.read_sql(query, conn, params=params)
+        active_positions['timestamp'] = to_datetime(active_positions['timestamp'])
         
         # Header tabulky
         table_rows = [html.Tr([
@@ -1839,6 +1759,10 @@ def update_active_positions(_, market_type):
             table_rows.append(html.Tr([html.Td("No active positions", colSpan=9)]))
             return table_rows
         
+        # Hromadné obnovení tickerů pro všechny otevřené pozice
+        for position_market, positions in active_positions.groupby('market_type'):
+            exchange.refresh_tickers(positions['symbol'].unique().tolist(), position_market)
+        
         # Přidání řádků do tabulky
         for _, position in active_positions.iterrows():
             # Získání aktuální ceny
@@ -1889,22 +1813,12 @@ def update_active_positions(_, market_type):
 def update_bot_decisions(_, market_type):
     try:
         # Sestavení SQL dotazu s filtrem podle typu trhu
-        query = """
-        SELECT timestamp, symbol, signal, confidence, action_taken, market_type 
-        FROM decisions 
-        """
-        
-        params = []
-        if market_type != 'all':
-            query += "WHERE market_type = ? "
-            params.append(market_type)
-            
-        query += "ORDER BY timestamp DESC LIMIT 10"
+        query, params = queries.bot_decisions_query(market_type if market_type != 'all' else None)
         
         # Získání dat z databáze
-        conn = sqlite3.connect('data/trading_history.db')
-        decisions = pd.read_sql(query, conn, params=params)
-        conn.close()
+        with get_pool().connection() as conn:
+            decisions = pd.read_sql(query, conn, params=params)
+        decisions['timestamp'] = to_datetime(decisions['timestamp'])
         
         # Header tabulky
         table_rows = [html.Tr([
@@ -2012,14 +1926,19 @@ def ensure_api_connection():
     
     try:
         # Test připojení
-        exchange.client.fetch_status()
+        exchange.clients.call(exchange.market_type, 'fetch_status')
         return True
     except Exception as e:
         logger.error(f"Ztraceno spojení s API: {str(e)}")
         
         # Pokus o obnovení připojení
         try:
-            exchange = BinanceConnector(load_config())
+            previous, exchange = exchange, BinanceConnector(load_config())
+            # Starý konektor by dál držel vlákna cenového indexu a streamy
+            try:
+                previous.close()
+            except Exception as close_error:
+                logger.warning(f"Chyba při uzavírání starého připojení: {str(close_error)}")
             logger.info("Připojení k API obnoveno")
             return True
         except Exception as reconnect_error: